@@ -0,0 +1,107 @@
+# api/batching.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from . import metrics
+
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+QUEUE_WAIT_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-image predictions into one forward pass.
+
+    Callers submit a preprocessed (224, 224, 3) array and get back a Future.
+    A single worker thread drains the queue: it takes the first pending
+    request, then keeps collecting for up to `max_delay_ms` or until
+    `max_batch_size` requests are gathered, runs `predict_fn` once on the
+    stacked batch and resolves every Future with its own row.
+    """
+
+    def __init__(self, predict_fn, *, max_batch_size=8, max_delay_ms=5, name="inference"):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._queue_depth = metrics.gauge(f"{name}.queue_depth")
+        self._batch_sizes = metrics.histogram(f"{name}.batch_size", BATCH_SIZE_BUCKETS)
+        self._queue_wait = metrics.histogram(f"{name}.queue_wait_ms", QUEUE_WAIT_BUCKETS_MS)
+        self._batches = metrics.counter(f"{name}.batches")
+        self._errors = metrics.counter(f"{name}.batch_errors")
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f"{self.name}-batcher",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def submit(self, x):
+        """Queue one image (HxWxC or 1xHxWxC) and return a Future of its softmax row."""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 4:
+            x = x[0]
+
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((x, future, time.perf_counter()))
+        self._queue_depth.set(self._queue.qsize())
+        return future
+
+    def predict(self, x, timeout=None):
+        return self.submit(x).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._queue_depth.set(self._queue.qsize())
+
+            started = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self._queue_wait.observe((started - enqueued_at) * 1000)
+            self._batch_sizes.observe(len(batch))
+            self._batches.inc()
+
+            try:
+                preds = np.asarray(self.predict_fn(np.stack([item[0] for item in batch])))
+            except Exception as exc:
+                self._errors.inc()
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            for row, (_, future, _) in zip(preds, batch):
+                future.set_result(row)
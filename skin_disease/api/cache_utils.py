@@ -0,0 +1,65 @@
+# api/cache_utils.py
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU with an optional per-entry TTL.
+    Entries are evicted when the cache exceeds `maxsize` (least recently
+    used first) or when they are older than `ttl` seconds on read.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        value, _ = self.get_with_age(key)
+        return default if value is _MISSING else value
+
+    def get_with_age(self, key):
+        """Return (value, age_seconds); value is a sentinel when missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING, None
+
+            value, stored_at = item
+            age = time.monotonic() - stored_at
+            if self.ttl is not None and age > self.ttl:
+                del self._data[key]
+                return _MISSING, None
+
+            self._data.move_to_end(key)
+            return value, age
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get_with_age(key)[0] is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+
+def is_missing(value):
+    return value is _MISSING
@@ -0,0 +1,118 @@
+# api/doctor_cache.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import metrics
+from .cache_utils import LRUCache, is_missing
+from .maps_client import get_maps_client
+
+logger = logging.getLogger(__name__)
+
+# Raw "<hospital> dermatologist" text-search results per hospital, keyed by
+# name + rounded coordinates. Entries are stored without any severity
+# scoring so one entry serves every request. Entries older than
+# DOCTOR_CACHE_FRESH are still served but trigger a background refresh
+# (stale-while-revalidate); entries older than DOCTOR_CACHE_TTL are dropped.
+
+_cache = None
+_cache_lock = threading.Lock()
+
+_refresh_pool = None
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+hits = metrics.counter("doctor_cache.hits")
+stale_hits = metrics.counter("doctor_cache.stale_hits")
+misses = metrics.counter("doctor_cache.misses")
+refreshes = metrics.counter("doctor_cache.refreshes")
+refresh_errors = metrics.counter("doctor_cache.refresh_errors")
+
+
+def _get_cache():
+    global _cache, _refresh_pool
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _refresh_pool = ThreadPoolExecutor(
+                    max_workers=settings.DOCTOR_CACHE_REFRESH_WORKERS,
+                    thread_name_prefix="doctor-refresh",
+                )
+                _cache = LRUCache(
+                    maxsize=settings.DOCTOR_CACHE_SIZE,
+                    ttl=settings.DOCTOR_CACHE_TTL,
+                )
+    return _cache
+
+
+def cache_key(hospital_name, lat, lon):
+    return hospital_name.casefold().strip(), round(float(lat), 4), round(float(lon), 4)
+
+
+def fetch_doctors(hospital_name, lat, lon, timeout=None):
+    """Query Places for doctors at a hospital and cache the raw results."""
+    res = get_maps_client().text_search(
+        query=f"{hospital_name} dermatologist",
+        lat=lat,
+        lon=lon,
+        radius=5000,
+        timeout=timeout,
+    )
+    results = [
+        {k: p[k] for k in ("place_id", "name", "rating") if k in p}
+        for p in res.get("results", [])
+    ]
+
+    # Only cache answers Google considered valid; errors should be retried.
+    if res.get("status") in (None, "OK", "ZERO_RESULTS"):
+        _get_cache().set(cache_key(hospital_name, lat, lon), results)
+
+    return results
+
+
+def _refresh(key, hospital_name, lat, lon):
+    try:
+        fetch_doctors(hospital_name, lat, lon, timeout=settings.HOSPITAL_DOCTOR_LOOKUP_TIMEOUT)
+        refreshes.inc()
+    except Exception:
+        refresh_errors.inc()
+        logger.warning("Doctor refresh failed for %r, keeping stale entry", hospital_name, exc_info=True)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+
+def cached_doctors(hospital_name, lat, lon):
+    """
+    Raw cached results for a hospital, or None on a miss. Never waits on
+    the network: a stale entry is returned as-is and refreshed in the
+    background (at most one refresh per hospital at a time).
+    """
+    key = cache_key(hospital_name, lat, lon)
+    results, age = _get_cache().get_with_age(key)
+
+    if is_missing(results):
+        misses.inc()
+        return None
+
+    if age <= settings.DOCTOR_CACHE_FRESH:
+        hits.inc()
+        return results
+
+    stale_hits.inc()
+    with _refreshing_lock:
+        if key in _refreshing:
+            return results
+        _refreshing.add(key)
+    _refresh_pool.submit(_refresh, key, hospital_name, lat, lon)
+    return results
+
+
+def get_doctors(hospital_name, lat, lon, timeout=None):
+    """Raw doctor results for a hospital, from the cache when possible."""
+    results = cached_doctors(hospital_name, lat, lon)
+    if results is None:
+        results = fetch_doctors(hospital_name, lat, lon, timeout=timeout)
+    return results
@@ -0,0 +1,79 @@
+# api/exports.py
+import csv
+import io
+import zipfile
+
+from django.core.files.storage import default_storage
+
+from . import pdf_cache
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ZipSink(io.RawIOBase):
+    """
+    Write-only, non-seekable target for ZipFile. Whatever zipfile writes is
+    held until the next `drain()`, so the archive can be streamed out piece
+    by piece (zipfile falls back to data descriptors when it cannot seek).
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def report_filename(scan):
+    return f"scan_{scan.id}_{scan.created_at:%Y-%m-%d}.pdf"
+
+
+def iter_scan_reports_zip(scans):
+    """
+    Yield a zip archive of the PDF reports for `scans` (an iterable, ideally
+    a queryset .iterator()) in chunks. Cached reports are copied from
+    storage; missing ones are rendered and cached on the way. Memory stays
+    at roughly one CHUNK_SIZE plus one report render, however many scans
+    there are. A manifest.csv is appended at the end.
+    """
+    sink = _ZipSink()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["id", "created_at", "diagnosis", "confidence", "severity", "file"])
+
+    # PDFs are already compressed; deflating them again only costs CPU.
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for scan in scans:
+            path = pdf_cache.render_report(scan)
+            name = report_filename(scan)
+
+            with default_storage.open(path, "rb") as src, zf.open(name, mode="w", force_zip64=True) as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    if data := sink.drain():
+                        yield data
+
+            writer.writerow([
+                scan.id, scan.created_at.isoformat(), scan.diagnosis,
+                scan.confidence, scan.severity, name,
+            ])
+            if data := sink.drain():
+                yield data
+
+        zf.writestr("manifest.csv", manifest.getvalue())
+
+    yield sink.drain()
@@ -1,15 +1,69 @@
-from .models import DoctorFeedback
+from django.db import transaction
+from django.db.models import Count, Q, Sum
 
-def get_feedback_score(hospital_name, disease):
-    feedbacks = DoctorFeedback.objects.filter(
-        hospital_name=hospital_name,
-        disease=disease
-    )
+from .models import DoctorFeedback, DoctorFeedbackStats
+
+NEUTRAL_SCORE = 0.5
+
+# Above this many names it is cheaper (and stays under the database's
+# parameter limit) to read every row for the disease and filter in Python.
+MAX_IN_NAMES = 500
 
-    if not feedbacks.exists():
-        return 0.5  # neutral
 
-    avg_rating = sum(f.rating for f in feedbacks) / (5 * feedbacks.count())
-    success_rate = sum(1 for f in feedbacks if f.successful) / feedbacks.count()
+def score_from_stats(count, rating_sum, success_count):
+    if not count:
+        return NEUTRAL_SCORE  # neutral
+
+    avg_rating = rating_sum / (5 * count)
+    success_rate = success_count / count
 
     return round((avg_rating * 0.6 + success_rate * 0.4), 2)
+
+
+def get_feedback_scores(hospital_names, disease):
+    """
+    {hospital_name: score} for every name in `hospital_names`, in one query.
+    Hospitals without feedback for `disease` get the neutral score.
+    """
+    hospital_names = set(hospital_names)
+    scores = dict.fromkeys(hospital_names, NEUTRAL_SCORE)
+    if not hospital_names:
+        return scores
+
+    rows = DoctorFeedbackStats.objects.filter(disease=disease)
+    if len(hospital_names) <= MAX_IN_NAMES:
+        rows = rows.filter(hospital_name__in=hospital_names)
+
+    for hospital_name, count, rating_sum, success_count in rows.values_list(
+        "hospital_name", "count", "rating_sum", "success_count"
+    ):
+        if hospital_name in scores:
+            scores[hospital_name] = score_from_stats(count, rating_sum, success_count)
+    return scores
+
+
+def get_feedback_score(hospital_name, disease):
+    return get_feedback_scores([hospital_name], disease)[hospital_name]
+
+
+def rebuild_feedback_stats(**filters):
+    """
+    Recompute DoctorFeedbackStats from DoctorFeedback, for every group or
+    only those matching `filters` (hospital_name=..., disease=...).
+    """
+    rows = (
+        DoctorFeedback.objects.filter(**filters)
+        .values("hospital_name", "disease")
+        .annotate(
+            count=Count("id"),
+            rating_sum=Sum("rating"),
+            success_count=Count("id", filter=Q(successful=True)),
+        )
+    )
+
+    with transaction.atomic():
+        DoctorFeedbackStats.objects.filter(**filters).delete()
+        DoctorFeedbackStats.objects.bulk_create(
+            [DoctorFeedbackStats(**row) for row in rows],
+            batch_size=1000,
+        )
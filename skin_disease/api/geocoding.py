@@ -0,0 +1,102 @@
+# api/geocoding.py
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .cache_utils import LRUCache
+from .maps_client import get_maps_client
+from .models import GeocodeCache
+
+logger = logging.getLogger(__name__)
+
+# City -> (lat, lon). An in-memory LRU sits in front of the GeocodeCache
+# table; rows older than GEOCODE_CACHE_TTL_DAYS are refreshed from Google on
+# the next lookup (falling back to the stale row if the refresh fails).
+
+_memory = None
+_memory_lock = threading.Lock()
+
+memory_hits = metrics.counter("geocode_cache.memory_hits")
+db_hits = metrics.counter("geocode_cache.db_hits")
+misses = metrics.counter("geocode_cache.misses")
+
+
+def _get_memory():
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = LRUCache(
+                    maxsize=settings.GEOCODE_CACHE_SIZE,
+                    ttl=settings.GEOCODE_CACHE_TTL_DAYS * 24 * 60 * 60,
+                )
+    return _memory
+
+
+def normalize_city(city):
+    """'  new   Delhi, ' -> 'new delhi'"""
+    city = re.sub(r"\s+", " ", str(city)).strip(" ,.")
+    return city.casefold()
+
+
+def _fetch(query):
+    geo_res = get_maps_client().geocode(query)
+    if not geo_res.get("results"):
+        return None
+
+    loc = geo_res["results"][0]["geometry"]["location"]
+    return loc["lat"], loc["lng"]
+
+
+def _store(query, coords):
+    GeocodeCache.objects.update_or_create(
+        query=query,
+        defaults={"lat": coords[0], "lon": coords[1]},
+    )
+    _get_memory().set(query, coords)
+
+
+def geocode_city(city, refresh=False):
+    """
+    Return (lat, lon) for a city name, or None if Google does not know it.
+    Cache hits never touch the network.
+    """
+    query = normalize_city(city)
+    if not query:
+        return None
+
+    memory = _get_memory()
+    if not refresh:
+        coords = memory.get(query)
+        if coords is not None:
+            memory_hits.inc()
+            return coords
+
+    row = GeocodeCache.objects.filter(query=query).first()
+    max_age = timedelta(days=settings.GEOCODE_CACHE_TTL_DAYS)
+
+    if row is not None and not refresh and timezone.now() - row.updated_at < max_age:
+        db_hits.inc()
+        coords = (row.lat, row.lon)
+        memory.set(query, coords)
+        return coords
+
+    misses.inc()
+    try:
+        coords = _fetch(query)
+    except Exception:
+        if row is None:
+            raise
+        logger.warning("Geocode refresh failed for %r, serving stale entry", query, exc_info=True)
+        return row.lat, row.lon
+
+    if coords is None:
+        return None
+
+    _store(query, coords)
+    return coords
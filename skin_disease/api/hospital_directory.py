@@ -0,0 +1,223 @@
+# api/hospital_directory.py
+import hashlib
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import metrics
+from .geo import haversine_km
+from .hospital_ranking import Candidates
+from .models import Hospital, HospitalCoverage
+from .places_cache import geohash
+
+hits = metrics.counter("hospital_directory.hits")
+fallbacks = metrics.counter("hospital_directory.fallbacks")
+
+
+def _split_keywords(value):
+    return frozenset(k for k in value.split("|") if k)
+
+
+class GridIndex:
+    """
+    In-memory spatial index over Hospital rows.
+
+    Hospitals are bucketed into fixed-size lat/lon cells (`cell_km` on a
+    side at the equator). A radius query only visits the cells overlapping
+    the query's bounding box and computes exact haversine distances for the
+    candidates in them with NumPy.
+    """
+
+    def __init__(self, hospitals, cell_km, coverage=()):
+        self.cell_deg = cell_km / 111.32
+        self.hospitals = list(hospitals)
+        self.lats = np.array([h["lat"] for h in self.hospitals], dtype=np.float64)
+        self.lons = np.array([h["lon"] for h in self.hospitals], dtype=np.float64)
+        self.ratings = np.array([h["rating"] for h in self.hospitals], dtype=np.float64)
+        self.keywords = [_split_keywords(h["keywords"]) for h in self.hospitals]
+        self.built_at = time.monotonic()
+        # (places cell, keyword) -> (radius_m, fetched_at)
+        self.coverage = {(c["cell"], c["keyword"]): (c["radius_m"], c["fetched_at"]) for c in coverage}
+
+        cells = {}
+        for i, (h_lat, h_lon) in enumerate(zip(self.lats, self.lons)):
+            cells.setdefault(self._cell(h_lat, h_lon), []).append(i)
+        self.cells = {key: np.array(idx, dtype=np.int64) for key, idx in cells.items()}
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def __len__(self):
+        return len(self.hospitals)
+
+    def query(self, lat, lon, radius_km, keyword=None):
+        """Return (indices, distances_km) of hospitals within radius, unsorted."""
+        dlat = radius_km / 111.32
+        dlon = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        lat_lo, lon_lo = self._cell(lat - dlat, lon - dlon)
+        lat_hi, lon_hi = self._cell(lat + dlat, lon + dlon)
+
+        buckets = [
+            self.cells[(i, j)]
+            for i in range(lat_lo, lat_hi + 1)
+            for j in range(lon_lo, lon_hi + 1)
+            if (i, j) in self.cells
+        ]
+        if not buckets:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        idx = np.concatenate(buckets)
+        if keyword:
+            idx = idx[[not self.keywords[i] or keyword in self.keywords[i] for i in idx]]
+
+        distances = haversine_km(lat, lon, self.lats[idx], self.lons[idx])
+        within = distances <= radius_km
+        return idx[within], distances[within]
+
+    def covers(self, lat, lon, keyword, radius_m):
+        """Whether Places was searched for this point's cell and keyword recently enough."""
+        cell = geohash(lat, lon, settings.PLACES_CACHE_GEOHASH_PRECISION)
+        radius, fetched_at = self.coverage.get((cell, keyword), (0, None))
+        if fetched_at is None or radius < radius_m:
+            return False
+        return (timezone.now() - fetched_at).total_seconds() <= settings.HOSPITAL_COVERAGE_TTL
+
+    def as_place(self, i):
+        """Hospital i in the shape of a Places nearby-search result."""
+        h = self.hospitals[i]
+        return {
+            "place_id": h["place_id"],
+            "name": h["name"],
+            "vicinity": h["address"],
+            "rating": h["rating"],
+            "geometry": {"location": {"lat": h["lat"], "lng": h["lon"]}},
+        }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    The process-wide index, rebuilt from the database every
+    HOSPITAL_INDEX_REFRESH seconds or after this process ingests hospitals.
+    """
+    global _index
+    index = _index
+    if index is None or time.monotonic() - index.built_at > settings.HOSPITAL_INDEX_REFRESH:
+        with _index_lock:
+            if _index is index:
+                rows = Hospital.objects.values("place_id", "name", "address", "lat", "lon", "rating", "keywords")
+                coverage = HospitalCoverage.objects.values("cell", "keyword", "radius_m", "fetched_at")
+                _index = GridIndex(rows, settings.HOSPITAL_INDEX_CELL_KM, coverage)
+            index = _index
+    return index
+
+
+def invalidate_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def search(lat, lon, keyword, radius_m=5000):
+    """
+    Hospitals within `radius_m` of (lat, lon) from the local directory as
+    ranking Candidates, or None when the caller should ask the Places API
+    instead: the directory only answers once the point's Places cache cell
+    has been searched for `keyword` within HOSPITAL_COVERAGE_TTL, since
+    rows ingested for neighbouring cells say nothing about this one.
+    """
+    if not settings.HOSPITAL_DIRECTORY_ENABLED:
+        return None
+
+    index = get_index()
+    if not index.covers(lat, lon, keyword, radius_m):
+        fallbacks.inc()
+        return None
+
+    idx, _ = index.query(lat, lon, radius_m / 1000, keyword)
+    hits.inc()
+    return Candidates(
+        [index.hospitals[i]["name"] for i in idx],
+        index.lats[idx],
+        index.lons[idx],
+        index.ratings[idx],
+        lambda i: index.as_place(idx[i]),
+    )
+
+
+def _merge_keywords(existing, keyword):
+    if not existing:
+        # Curated rows match everything; keep them that way.
+        return existing
+    keywords = _split_keywords(existing) | {keyword}
+    return "|" + "|".join(sorted(keywords)) + "|"
+
+
+def upsert_hospitals(rows, source):
+    """
+    Insert or update Hospital rows keyed by place_id. Each row is a dict
+    with place_id, name, address, lat, lon, rating, keywords.
+    """
+    if not rows:
+        return 0
+
+    Hospital.objects.bulk_create(
+        [Hospital(source=source, **row) for row in rows],
+        update_conflicts=True,
+        unique_fields=["place_id"],
+        update_fields=["name", "address", "lat", "lon", "rating", "keywords", "source", "updated_at"],
+        batch_size=500,
+    )
+    invalidate_index()
+    return len(rows)
+
+
+def record_coverage(cell, keyword, radius_m):
+    HospitalCoverage.objects.update_or_create(
+        cell=cell,
+        keyword=keyword,
+        defaults={"radius_m": radius_m, "fetched_at": timezone.now()},
+    )
+    invalidate_index()
+
+
+def ingest_places(results, keyword, cell, radius_m):
+    """
+    Accumulate raw Places nearby-search results into the directory and mark
+    `cell` as covered for `keyword` (even when the search came back empty).
+    """
+    results = [p for p in results if p.get("place_id") and p.get("geometry")]
+    existing = dict(
+        Hospital.objects.filter(place_id__in=[p["place_id"] for p in results])
+        .values_list("place_id", "keywords")
+    )
+
+    rows = []
+    for p in results:
+        loc = p["geometry"]["location"]
+        current = existing.get(p["place_id"])
+        rows.append({
+            "place_id": p["place_id"],
+            "name": p.get("name", ""),
+            "address": p.get("vicinity") or "",
+            "lat": loc["lat"],
+            "lon": loc["lng"],
+            "rating": p.get("rating", 0),
+            "keywords": f"|{keyword}|" if current is None else _merge_keywords(current, keyword),
+        })
+
+    count = upsert_hospitals(rows, source="places")
+    record_coverage(cell, keyword, radius_m)
+    return count
+
+
+def synthetic_place_id(name, lat, lon):
+    digest = hashlib.sha1(f"{name}|{lat:.6f}|{lon:.6f}".encode()).hexdigest()[:16]
+    return f"import-{digest}"
@@ -0,0 +1,147 @@
+# api/hospital_ranking.py
+import numpy as np
+from django.conf import settings
+
+from .explanation import generate_hospital_explanation
+from .feedback_utils import NEUTRAL_SCORE, get_feedback_scores
+from .geo import haversine_km
+from .ml_hospital_predictor import predict_suitability_batch
+from .scoring_weights import SEVERITY_WEIGHTS
+
+
+class Candidates:
+    """
+    Column view of candidate hospitals: name/lat/lon/rating columns for
+    scoring plus `place(i)`, which returns the i-th candidate as a Places result
+    dict and is only called for the hospitals that make the cut.
+    """
+
+    def __init__(self, names, lats, lons, ratings, place):
+        self.names = names
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        self.place = place
+
+    def __len__(self):
+        return len(self.lats)
+
+    @classmethod
+    def from_places(cls, places):
+        places = list(places)
+        return cls(
+            [p.get("name", "") for p in places],
+            [p["geometry"]["location"]["lat"] for p in places],
+            [p["geometry"]["location"]["lng"] for p in places],
+            [p.get("rating", 0) for p in places],
+            places.__getitem__,
+        )
+
+
+def feedback_scores(candidates, disease):
+    """DoctorFeedback score per candidate, fetched in a single query."""
+    by_name = get_feedback_scores(candidates.names, disease)
+    return np.array([by_name[name] for name in candidates.names], dtype=np.float64)
+
+
+def score(candidates, lat, lon, severity, disease=None):
+    """
+    Return (distance_km, ml_score, feedback_score, final_score) arrays for
+    all candidates. Feedback is only looked up when `disease` is given, and
+    only counts toward final_score with HOSPITAL_FEEDBACK_RANKING_ENABLED.
+    """
+    weights = SEVERITY_WEIGHTS.get(severity, SEVERITY_WEIGHTS["Low"])
+
+    distances = np.round(haversine_km(lat, lon, candidates.lats, candidates.lons), 3)
+
+    if disease:
+        feedback = feedback_scores(candidates, disease)
+    else:
+        feedback = np.full(len(candidates), NEUTRAL_SCORE)
+
+    if settings.HOSPITAL_FEEDBACK_RANKING_ENABLED:
+        ranking_feedback = feedback
+    else:
+        ranking_feedback = np.full(len(candidates), NEUTRAL_SCORE)
+
+    try:
+        ml_scores = predict_suitability_batch(
+            ratings=candidates.ratings,
+            distances=distances,
+            severity=severity,
+            disease=disease,
+        )
+    except Exception:
+        ml_scores = np.full(len(candidates), 0.5)
+
+    # Feedback is centred on the neutral score, so hospitals nobody has
+    # rated yet keep the score they would have without it.
+    final_scores = (
+        candidates.ratings * weights["rating"]
+        + ml_scores * weights["ml"]
+        - distances * weights["distance"]
+        + (ranking_feedback - NEUTRAL_SCORE) * weights["feedback"]
+    )
+    return distances, ml_scores, feedback, final_scores
+
+
+def top_k(values, k):
+    """
+    Indices of the k largest values, largest first. Equal values keep their
+    input order, including at the cut-off, so the result is the first k of
+    a stable descending sort.
+    """
+    if len(values) > k:
+        kth = -np.partition(-values, k - 1)[k - 1]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        idx = np.sort(np.concatenate([above, ties]))
+    else:
+        idx = np.arange(len(values))
+    return idx[np.argsort(-values[idx], kind="stable")]
+
+
+def rank_hospitals(candidates, lat, lon, severity, limit, disease=None):
+    """
+    Score every candidate at once and build response entries (explanation,
+    maps link, ...) for the best `limit` only, best first. Returns
+    (hospitals, locations) where locations[i] is (lat, lon) of hospitals[i].
+    """
+    if not len(candidates):
+        return [], []
+
+    distances, ml_scores, feedback, final_scores = score(candidates, lat, lon, severity, disease)
+    # Rank on the score the response shows, so hospitals listed with the
+    # same final_score stay in candidate order.
+    final_scores = np.round(final_scores, 2)
+
+    hospitals = []
+    locations = []
+    for i in top_k(final_scores, limit):
+        p = candidates.place(i)
+        h_lat = p["geometry"]["location"]["lat"]
+        h_lon = p["geometry"]["location"]["lng"]
+        rating = p.get("rating", 0)
+        distance = float(distances[i])
+        ml_score = float(ml_scores[i])
+
+        hospitals.append({
+            "name": p.get("name", ""),
+            "address": p.get("vicinity"),
+            "rating": rating,
+            "distance_km": distance,
+            "ml_score": ml_score,
+            "feedback_score": float(feedback[i]),
+            "final_score": float(final_scores[i]),
+            "why_recommended": generate_hospital_explanation(
+                severity=severity,
+                rating=rating,
+                distance=distance,
+                ml_score=ml_score,
+            ),
+            "top_doctors": [],
+            "maps_url": f"https://www.google.com/maps/dir/?api=1&destination={h_lat},{h_lon}",
+        })
+        locations.append((h_lat, h_lon))
+
+    return hospitals, locations
@@ -0,0 +1,31 @@
+import glob
+import os
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def find_images(directory):
+    return sorted(
+        p for p in glob.glob(os.path.join(directory, "*"))
+        if p.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, ru_maxrss elsewhere)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
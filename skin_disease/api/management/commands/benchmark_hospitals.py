@@ -0,0 +1,132 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from api import hospital_directory, metrics
+from api.maps_client import MapsClient, set_maps_client
+from api.maps_stub import FakeMapsServer
+from api.views import nearby_hospitals, nearby_hospitals_stream
+
+from ._utils import percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure end-to-end latency of nearby_hospitals against a local fake "
+        "Google Maps server with configurable per-endpoint latency. Runs in a "
+        "transaction that is rolled back, so the fake hospitals the view "
+        "ingests never reach the directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=10)
+        parser.add_argument("--hospitals", type=int, default=20)
+        parser.add_argument("--nearby-latency", type=float, default=0.1, help="seconds")
+        parser.add_argument("--doctor-latency", type=float, default=0.1, help="seconds")
+        parser.add_argument(
+            "--slow-fraction",
+            type=float,
+            default=0.0,
+            help="Fraction of doctor lookups that hang (to exercise the deadline)",
+        )
+        parser.add_argument("--city", help="Search by city (geocode) instead of coordinates")
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Use the streaming endpoint and also report time to the first event",
+        )
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        user = User(email="bench@example.com")
+
+        server = FakeMapsServer(
+            hospitals=options["hospitals"],
+            latency={
+                "nearbysearch": options["nearby_latency"],
+                "textsearch": options["doctor_latency"],
+            },
+            slow_fraction=options["slow_fraction"],
+        )
+
+        # The view adds whatever "Places" returns to the Hospital directory;
+        # roll that back so real searches are not answered from stub rows.
+        with server, transaction.atomic():
+            previous = set_maps_client(MapsClient(base_url=server.base_url, api_key="stub"))
+            latencies = []
+            first_event = []
+            empty = 0
+            for i in range(options["requests"]):
+                payload = {"diagnosis": "Melanoma", "severity": "High"}
+                if options["city"]:
+                    payload["city"] = options["city"]
+                else:
+                    payload.update({"lat": 18.52 + i * 0.001, "lon": 73.85})
+
+                request = factory.post("/api/nearby-hospitals/", payload, format="json")
+                force_authenticate(request, user=user)
+
+                started = time.perf_counter()
+                if options["stream"]:
+                    response = nearby_hospitals_stream(request)
+                    events = []
+                    for chunk in response.streaming_content:
+                        if not events:
+                            first_event.append((time.perf_counter() - started) * 1000)
+                        events.append(json.loads(chunk))
+                else:
+                    response = nearby_hospitals(request)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+                if response.status_code != 200:
+                    self.stderr.write(f"request {i}: HTTP {response.status_code} {response.data}")
+                    continue
+                if options["stream"]:
+                    empty += sum(1 for e in events if e["event"] == "doctors" and not e["top_doctors"])
+                else:
+                    empty += sum(1 for h in response.data["hospitals"] if not h["top_doctors"])
+
+            set_maps_client(previous)
+            transaction.set_rollback(True)
+
+        hospital_directory.invalidate_index()
+
+        self.stdout.write(
+            f"{options['requests']} requests, {options['hospitals']} hospitals each, "
+            f"nearby {options['nearby_latency'] * 1000:.0f} ms, "
+            f"doctor lookup {options['doctor_latency'] * 1000:.0f} ms"
+        )
+        self.stdout.write(
+            f"latency ms: mean {statistics.mean(latencies):.1f}  "
+            f"p50 {percentile(latencies, 50):.1f}  "
+            f"p95 {percentile(latencies, 95):.1f}  "
+            f"max {max(latencies):.1f}"
+        )
+        if first_event:
+            self.stdout.write(
+                f"first event ms: mean {statistics.mean(first_event):.1f}  "
+                f"p50 {percentile(first_event, 50):.1f}  "
+                f"p95 {percentile(first_event, 95):.1f}"
+            )
+        self.stdout.write(f"hospitals returned without doctors: {empty}")
+        self.stdout.write("upstream calls: " + ", ".join(f"{k}={v}" for k, v in server.calls.items()))
+
+        snapshot = metrics.snapshot()
+        self.stdout.write(
+            f"places cache: hit rate {snapshot.get('places_cache.hit_rate', 0):.0%}, "
+            f"nearby-search calls saved {snapshot.get('places_cache.hits', 0)}"
+        )
+        self.stdout.write(
+            f"hospital directory: {snapshot.get('hospital_directory.hits', 0)} hits, "
+            f"{snapshot.get('hospital_directory.fallbacks', 0)} fallbacks to Places"
+        )
+        self.stdout.write(
+            f"doctor cache: {snapshot.get('doctor_cache.hits', 0)} hits, "
+            f"{snapshot.get('doctor_cache.stale_hits', 0)} stale, "
+            f"{snapshot.get('doctor_cache.misses', 0)} misses"
+        )
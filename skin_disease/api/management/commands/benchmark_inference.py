@@ -0,0 +1,135 @@
+import os
+import statistics
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ml_utils
+from api.ml_backends import BACKENDS, create_backend
+
+from ._utils import current_rss_mb, find_images, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark inference on the sample images: per-call latency of model.predict, "
+        "model(x) and the traced function, then latency / throughput / memory per backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--images",
+            default=os.path.join(settings.MEDIA_ROOT, "scans"),
+            help="Directory of sample images (default: MEDIA_ROOT/scans)",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=8,
+            help="Batch size used for the throughput measurement",
+        )
+        parser.add_argument(
+            "--backends",
+            nargs="+",
+            choices=BACKENDS,
+            help="Backends to compare (default: every backend whose artifact exists). "
+                 "RSS deltas are most meaningful when a single backend is benchmarked per run.",
+        )
+
+    def _time(self, fn, inputs, iterations, warmup):
+        for i in range(warmup):
+            fn(inputs[i % len(inputs)])
+
+        samples = []
+        for i in range(iterations):
+            x = inputs[i % len(inputs)]
+            started = time.perf_counter()
+            fn(x)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def handle(self, *args, **options):
+        paths = find_images(options["images"])
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+
+        inputs = []
+        for path in paths:
+            with open(path, "rb") as f:
+                inputs.append(ml_utils.preprocess_image_from_file(f))
+
+        iterations, warmup = options["iterations"], options["warmup"]
+        self.stdout.write(f"{len(paths)} images, {iterations} calls per measurement\n")
+
+        names = options["backends"] or [
+            name for name in BACKENDS
+            if os.path.exists(create_backend(name, settings.ML_MODEL_PATH).artifact_path)
+        ]
+
+        backends = {}
+        memory = {}
+        for name in names:
+            backend = create_backend(name, settings.ML_MODEL_PATH, settings.ML_TFLITE_NUM_THREADS)
+            rss_before = current_rss_mb()
+            backend.import_runtime()
+            backend.load()
+            backend.predict(inputs[0])
+            memory[name] = current_rss_mb() - rss_before
+            backends[name] = backend
+
+        if "keras" in backends:
+            keras = backends["keras"]
+            methods = {
+                "model.predict": lambda x: keras.model.predict(x, verbose=0),
+                "model(x, training=False)": lambda x: np.asarray(keras.model(x, training=False)),
+                "traced fn": keras.predict,
+            }
+            reference = [keras.model.predict(x, verbose=0) for x in inputs]
+
+            self.stdout.write("Keras call modes (batch=1)")
+            self.stdout.write(f"{'method':<28}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max diff':>12}")
+
+            for name, fn in methods.items():
+                samples = self._time(fn, inputs, iterations, warmup)
+                max_diff = max(
+                    float(np.max(np.abs(np.asarray(fn(x)) - ref)))
+                    for x, ref in zip(inputs, reference)
+                )
+                self.stdout.write(
+                    f"{name:<28}"
+                    f"{statistics.mean(samples):>10.2f}"
+                    f"{percentile(samples, 50):>10.2f}"
+                    f"{percentile(samples, 95):>10.2f}"
+                    f"{max_diff:>12.2e}"
+                )
+            self.stdout.write("")
+
+        batch_size = options["batch_size"]
+        batches = [
+            np.concatenate([inputs[(i + j) % len(inputs)] for j in range(batch_size)])
+            for i in range(len(inputs))
+        ]
+
+        self.stdout.write(f"Backends (latency at batch=1, throughput at batch={batch_size})")
+        self.stdout.write(
+            f"{'backend':<14}{'p50 ms':>10}{'p95 ms':>10}{'img/s':>10}{'RSS +MB':>10}{'size MB':>10}"
+        )
+
+        for name, backend in backends.items():
+            samples = self._time(backend.predict, inputs, iterations, warmup)
+            batch_samples = self._time(backend.predict, batches, max(1, iterations // batch_size), 1)
+            throughput = batch_size / (statistics.mean(batch_samples) / 1000)
+            size_mb = os.path.getsize(backend.artifact_path) / (1024 * 1024)
+
+            self.stdout.write(
+                f"{name:<14}"
+                f"{percentile(samples, 50):>10.2f}"
+                f"{percentile(samples, 95):>10.2f}"
+                f"{throughput:>10.1f}"
+                f"{memory[name]:>10.1f}"
+                f"{size_mb:>10.1f}"
+            )
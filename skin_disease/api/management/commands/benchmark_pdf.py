@@ -0,0 +1,105 @@
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Scan
+from api.pdf import ReportTemplate, build_scan_pdf, get_report_template
+from api.renditions import make_pdf_rendition
+
+from ._utils import find_images, percentile
+
+
+def sample_scans(n):
+    return [
+        Scan(
+            id=i + 1,
+            diagnosis="Melanoma" if i % 2 else "Melanocytic Nevi",
+            confidence=f"{80 + i % 20}.5",
+            severity="High" if i % 2 else "Low",
+            advice="Consult a dermatologist within a week.\nAvoid sun exposure.\nMonitor for changes.",
+            is_safe=bool(i % 2 == 0),
+        )
+        for i in range(n)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark api.pdf report builds: reports/sec and memory per report, with a "
+        "fresh ReportTemplate per report (the old behaviour) vs the shared one. "
+        "Use --max-ms to fail when the shared-template build regresses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reports", type=int, default=50)
+        parser.add_argument(
+            "--images",
+            default=os.path.join(settings.MEDIA_ROOT, "scans"),
+            help="Directory of sample images (default: MEDIA_ROOT/scans)",
+        )
+        parser.add_argument("--no-image", action="store_true", help="Build reports without a scan image")
+        parser.add_argument(
+            "--max-ms",
+            type=float,
+            help="Exit with an error if the mean shared-template build time exceeds this",
+        )
+
+    def measure(self, scans, image, template_factory):
+        timings = []
+        for scan in scans:
+            started = time.perf_counter()
+            build_scan_pdf(scan, image=image, template=template_factory())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # Memory is measured in a separate pass; tracemalloc slows builds down.
+        peaks = []
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for scan in scans[:10]:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            build_scan_pdf(scan, image=image, template=template_factory())
+            peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+        gc.collect()
+        retained = (tracemalloc.get_traced_memory()[0] - baseline) / 1024
+        tracemalloc.stop()
+
+        return timings, peaks, retained
+
+    def handle(self, *args, **options):
+        image = None
+        if not options["no_image"]:
+            paths = find_images(options["images"])
+            if not paths:
+                raise CommandError(f"No images found in {options['images']} (or pass --no-image)")
+            with open(paths[0], "rb") as f:
+                image = make_pdf_rendition(f)
+
+        scans = sample_scans(options["reports"])
+
+        # Warm up imports, fonts and the shared template.
+        build_scan_pdf(scans[0], image=image)
+
+        self.stdout.write(
+            f"{'template':10}{'reports/s':>11}{'mean ms':>10}{'p95 ms':>10}"
+            f"{'peak KB/report':>16}{'retained KB':>13}"
+        )
+        results = {}
+        for name, factory in (("fresh", ReportTemplate), ("shared", get_report_template)):
+            timings, peaks, retained = self.measure(scans, image, factory)
+            results[name] = statistics.mean(timings)
+            self.stdout.write(
+                f"{name:10}{1000 / statistics.mean(timings):>11.1f}{statistics.mean(timings):>10.2f}"
+                f"{percentile(timings, 95):>10.2f}{statistics.mean(peaks):>16.0f}{retained:>13.0f}"
+            )
+
+        if options["max_ms"] is not None and results["shared"] > options["max_ms"]:
+            raise CommandError(
+                f"Mean report build {results['shared']:.2f} ms exceeds --max-ms {options['max_ms']}"
+            )
@@ -0,0 +1,86 @@
+import os
+import statistics
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Scan
+from api.pdf import build_scan_pdf
+from api.renditions import make_pdf_rendition
+
+from ._utils import current_rss_mb, find_images
+from .benchmark_preprocess import upscale_jpeg
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare PDF size and build time when embedding the original scan "
+        "image vs its downscaled PDF rendition."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--images",
+            default=os.path.join(settings.MEDIA_ROOT, "scans"),
+            help="Directory of sample images (default: MEDIA_ROOT/scans)",
+        )
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument(
+            "--megapixels",
+            type=float,
+            default=0,
+            help="Upscale each sample to a JPEG of this many MP first, to mimic phone uploads",
+        )
+
+    def handle(self, *args, **options):
+        paths = find_images(options["images"])
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+
+        originals = []
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            if options["megapixels"]:
+                data = upscale_jpeg(data, options["megapixels"])
+            originals.append(data)
+
+        scan = Scan(
+            id=0,
+            diagnosis="Melanoma",
+            confidence="92.4",
+            severity="High",
+            advice="Consult a dermatologist.\nAvoid sun exposure.",
+            is_safe=False,
+        )
+
+        rendition_ms = []
+        renditions = []
+        for data in originals:
+            started = time.perf_counter()
+            renditions.append(make_pdf_rendition(BytesIO(data)))
+            rendition_ms.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(
+            f"{len(originals)} images, avg source {statistics.mean(map(len, originals)) / 1024:.0f} KB, "
+            f"rendition at {settings.PDF_IMAGE_DPI} dpi / q{settings.PDF_IMAGE_QUALITY}: "
+            f"avg {statistics.mean(map(len, renditions)) / 1024:.0f} KB, "
+            f"built once in {statistics.mean(rendition_ms):.1f} ms"
+        )
+        self.stdout.write(f"{'embedded image':16}{'pdf KB':>10}{'build ms':>10}{'rss MB':>10}")
+
+        for name, images in (("original", originals), ("rendition", renditions)):
+            sizes, timings = [], []
+            for _ in range(options["iterations"]):
+                for image in images:
+                    started = time.perf_counter()
+                    pdf = build_scan_pdf(scan, image=image)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    sizes.append(len(pdf))
+
+            self.stdout.write(
+                f"{name:16}{statistics.mean(sizes) / 1024:>10.1f}"
+                f"{statistics.mean(timings):>10.1f}{current_rss_mb():>10.0f}"
+            )
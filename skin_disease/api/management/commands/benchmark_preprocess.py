@@ -0,0 +1,122 @@
+import os
+import statistics
+import time
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from api import ml_state, ml_utils
+
+from ._utils import find_images, percentile
+
+
+def legacy_preprocess(file_obj):
+    """The original path: full-resolution decode, img_to_array, preprocess_input."""
+    from tensorflow.keras.applications.efficientnet import preprocess_input
+    from tensorflow.keras.preprocessing.image import img_to_array
+
+    file_obj.seek(0)
+    raw = file_obj.read()
+    img = Image.open(BytesIO(raw)).convert("RGB")
+    img = img.resize(ml_utils.IMAGE_SIZE)
+    x = img_to_array(img)
+    x = np.expand_dims(x, axis=0)
+    return preprocess_input(x)
+
+
+def upscale_jpeg(data, megapixels):
+    """Re-encode a sample as a JPEG of roughly `megapixels` MP (phone-photo sized)."""
+    img = Image.open(BytesIO(data)).convert("RGB")
+    scale = (megapixels * 1_000_000 / (img.width * img.height)) ** 0.5
+    img = img.resize((int(img.width * scale), int(img.height * scale)), Image.BICUBIC)
+
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Compare the legacy and fast image preprocessing paths for speed and prediction parity."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--images",
+            default=os.path.join(settings.MEDIA_ROOT, "scans"),
+            help="Directory of sample images (default: MEDIA_ROOT/scans)",
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument(
+            "--megapixels",
+            type=float,
+            default=0,
+            help="Upscale each sample to a JPEG of this many MP first, to mimic phone uploads",
+        )
+        parser.add_argument(
+            "--no-model",
+            action="store_true",
+            help="Skip the top-1 parity check (pixel differences are still reported)",
+        )
+
+    def handle(self, *args, **options):
+        paths = find_images(options["images"])
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+
+        samples = []
+        for path in paths:
+            with open(path, "rb") as f:
+                data = f.read()
+            if options["megapixels"]:
+                data = upscale_jpeg(data, options["megapixels"])
+            samples.append(data)
+
+        paths_fns = {"legacy": legacy_preprocess, "fast": ml_utils.preprocess_image_from_file}
+        timings = {}
+        outputs = {}
+
+        for name, fn in paths_fns.items():
+            fn(BytesIO(samples[0]))  # import / first-call overhead
+
+            elapsed = []
+            for _ in range(options["iterations"]):
+                for data in samples:
+                    buf = BytesIO(data)
+                    started = time.perf_counter()
+                    fn(buf)
+                    elapsed.append((time.perf_counter() - started) * 1000)
+
+            timings[name] = elapsed
+            outputs[name] = np.concatenate([fn(BytesIO(data)) for data in samples])
+
+        size = Image.open(BytesIO(samples[0])).size
+        self.stdout.write(f"{len(samples)} images (first is {size[0]}x{size[1]}), "
+                          f"{options['iterations']} passes each\n")
+        self.stdout.write(f"{'path':<10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, elapsed in timings.items():
+            self.stdout.write(
+                f"{name:<10}"
+                f"{statistics.mean(elapsed):>10.2f}"
+                f"{percentile(elapsed, 50):>10.2f}"
+                f"{percentile(elapsed, 95):>10.2f}"
+            )
+
+        speedup = statistics.mean(timings["legacy"]) / statistics.mean(timings["fast"])
+        pixel_diff = np.abs(outputs["legacy"] - outputs["fast"])
+        self.stdout.write(
+            f"\nspeedup {speedup:.2f}x, mean |pixel diff| {pixel_diff.mean():.2f}, "
+            f"max {pixel_diff.max():.0f} (0-255 scale)"
+        )
+
+        if options["no_model"]:
+            return
+
+        infer = ml_state.get_infer_fn()
+        legacy_top1 = np.argmax(infer(outputs["legacy"]), axis=1)
+        fast_top1 = np.argmax(infer(outputs["fast"]), axis=1)
+        agreement = float(np.mean(legacy_top1 == fast_top1))
+
+        line = f"top-1 agreement legacy vs fast: {agreement:.1%}"
+        self.stdout.write(self.style.SUCCESS(line) if agreement == 1 else self.style.WARNING(line))
@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.ml_features import extract_features
+from api.ml_hospital_predictor import handcoded_suitability_batch, predict_suitability
+from api.suitability_model import DEFAULT_HOSPITAL_TYPE, SuitabilityModel, get_model
+
+from ._utils import percentile
+
+
+def synthetic_rows(n, rng):
+    return [
+        extract_features(
+            disease=rng.choice(["Melanoma", "Eczema", "Psoriasis"]),
+            severity=rng.choice(["Low", "Moderate", "High"]),
+            hospital_type=DEFAULT_HOSPITAL_TYPE,
+            rating=rng.uniform(2, 5),
+            distance=rng.uniform(0, 10),
+            feedback_score=rng.uniform(0, 1),
+        )
+        for _ in range(n)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Latency of scoring N candidate hospitals: per-hospital loop vs one "
+        "vectorized call, for the hand-coded formula and the trained model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 2000])
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def timed(self, fn, repeat):
+        fn()  # warm up
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        model = get_model()
+        if model is None:
+            self.stdout.write("No trained artifact; benchmarking a model fit on synthetic rows.")
+            rows = synthetic_rows(500, rng)
+            model = SuitabilityModel.fit(rows, [int(rng.random() < 0.6) for _ in rows], epochs=50)
+
+        self.stdout.write(f"{'candidates':>10}  {'scorer':28}{'p50 ms':>10}{'p95 ms':>10}")
+        for n in options["sizes"]:
+            ratings = np.array([rng.uniform(2, 5) for _ in range(n)])
+            distances = np.array([rng.uniform(0, 10) for _ in range(n)])
+            feedback = np.array([rng.uniform(0, 1) for _ in range(n)])
+
+            def handcoded_loop():
+                return [
+                    predict_suitability(rating=r, distance=d, severity="High")
+                    for r, d in zip(ratings, distances)
+                ]
+
+            def handcoded_batch():
+                return handcoded_suitability_batch(ratings, distances, "High")
+
+            def model_loop():
+                return [
+                    model.predict_proba(model.encode([extract_features(
+                        disease="Melanoma", severity="High", hospital_type=DEFAULT_HOSPITAL_TYPE,
+                        rating=r, distance=d, feedback_score=f,
+                    )]))[0, 1]
+                    for r, d, f in zip(ratings, distances, feedback)
+                ]
+
+            def model_batch():
+                X = model.encode_columns(
+                    n,
+                    {"disease": "Melanoma", "severity": "High", "hospital_type": DEFAULT_HOSPITAL_TYPE},
+                    {"rating": ratings},
+                )
+                return model.predict_proba(X)[:, 1]
+
+            for name, fn in (
+                ("hand-coded, per hospital", handcoded_loop),
+                ("hand-coded, vectorized", handcoded_batch),
+                ("model, per hospital", model_loop),
+                ("model, vectorized", model_batch),
+            ):
+                # The per-hospital model loop is slow enough to cap its repeats.
+                repeat = options["repeat"] if "vectorized" in name or n <= 100 else max(3, options["repeat"] // 10)
+                samples = self.timed(fn, repeat)
+                self.stdout.write(
+                    f"{n:>10}  {name:28}{statistics.median(samples):>10.3f}{percentile(samples, 95):>10.3f}"
+                )
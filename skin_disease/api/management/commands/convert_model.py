@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ml_utils
+from api.ml_backends import (
+    TFLITE_VARIANTS,
+    KerasBackend,
+    TFLiteBackend,
+    convert_to_tflite,
+)
+
+from ._utils import find_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert the Keras skin disease model to TFLite (fp16 / int8 dynamic-range) "
+        "and check top-1 agreement with the Keras backend on a held-out image set."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--variants",
+            nargs="+",
+            choices=TFLITE_VARIANTS,
+            default=list(TFLITE_VARIANTS),
+        )
+        parser.add_argument(
+            "--validate-dir",
+            default=os.path.join(settings.MEDIA_ROOT, "scans"),
+            help="Held-out images used for the agreement check (default: MEDIA_ROOT/scans)",
+        )
+        parser.add_argument(
+            "--min-agreement",
+            type=float,
+            default=0.95,
+            help="Fail if top-1 agreement with Keras drops below this fraction",
+        )
+
+    def validate(self, backend, batch, reference, n_images, min_agreement):
+        if batch is None:
+            return True
+
+        backend.import_runtime()
+        backend.load()
+        preds = backend.predict(batch)
+
+        agreement = float(np.mean(np.argmax(preds, axis=1) == np.argmax(reference, axis=1)))
+        max_diff = float(np.max(np.abs(preds - reference)))
+        line = (
+            f"{backend.name}: top-1 agreement {agreement:.1%} on {n_images} images, "
+            f"max |p - p_keras| {max_diff:.4f}"
+        )
+
+        if agreement < min_agreement:
+            self.stdout.write(self.style.ERROR(line))
+            return False
+
+        self.stdout.write(self.style.SUCCESS(line))
+        return True
+
+    def handle(self, *args, **options):
+        keras_backend = KerasBackend(settings.ML_MODEL_PATH)
+        keras_backend.import_runtime()
+        keras_backend.load()
+
+        paths = find_images(options["validate_dir"])
+        if not paths:
+            self.stdout.write(self.style.WARNING(
+                f"No images in {options['validate_dir']}; skipping agreement check"
+            ))
+
+        batch = None
+        reference = None
+        if paths:
+            rows = []
+            for path in paths:
+                with open(path, "rb") as f:
+                    rows.append(ml_utils.preprocess_image_from_file(f)[0])
+            batch = np.stack(rows)
+            reference = keras_backend.predict(batch)
+
+        failures = []
+        for variant in options["variants"]:
+            # Convert next to the served artifact and only move it into place
+            # once it passes the agreement check; a bad conversion must not
+            # replace a working model (or change the prediction cache version).
+            target = TFLiteBackend(settings.ML_MODEL_PATH, variant).artifact_path
+            tmp_path = f"{target}.tmp"
+            backend = TFLiteBackend(settings.ML_MODEL_PATH, variant, artifact_path=tmp_path)
+
+            with open(tmp_path, "wb") as f:
+                f.write(convert_to_tflite(keras_backend.model, variant))
+
+            try:
+                passed = self.validate(backend, batch, reference, len(paths), options["min_agreement"])
+                if passed:
+                    os.replace(tmp_path, target)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            if not passed:
+                failures.append(backend.name)
+                self.stdout.write(f"{backend.name}: kept existing {target}")
+                continue
+
+            size_mb = os.path.getsize(target) / (1024 * 1024)
+            self.stdout.write(f"{backend.name}: wrote {target} ({size_mb:.1f} MB)")
+
+        if failures:
+            raise CommandError(
+                f"Top-1 agreement below {options['min_agreement']:.0%} for: {', '.join(failures)}"
+            )
@@ -0,0 +1,109 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.hospital_directory import synthetic_place_id, upsert_hospitals
+
+
+def _keywords(value):
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value or "").replace(",", "|").split("|")
+    items = sorted({k.strip() for k in items if k.strip()})
+    return "|" + "|".join(items) + "|" if items else ""
+
+
+def _row(name, address, lat, lon, rating=0, place_id=None, keywords=""):
+    lat, lon = float(lat), float(lon)
+    return {
+        "place_id": place_id or synthetic_place_id(name, lat, lon),
+        "name": name,
+        "address": address or "",
+        "lat": lat,
+        "lon": lon,
+        "rating": float(rating or 0),
+        "keywords": _keywords(keywords),
+    }
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for rec in csv.DictReader(f):
+            yield _row(
+                rec["name"], rec.get("address"), rec["lat"], rec["lon"],
+                rec.get("rating"), rec.get("place_id"), rec.get("keywords"),
+            )
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    # GeoJSON FeatureCollection of Point features
+    if isinstance(data, dict) and data.get("type") == "FeatureCollection":
+        for feature in data["features"]:
+            lon, lat = feature["geometry"]["coordinates"][:2]
+            props = feature.get("properties") or {}
+            yield _row(
+                props.get("name", ""), props.get("address"), lat, lon,
+                props.get("rating"), props.get("place_id"), props.get("keywords"),
+            )
+        return
+
+    # Places nearby-search response(s), or a bare list of results
+    if isinstance(data, dict):
+        data = data.get("results", [])
+    for p in data:
+        loc = p["geometry"]["location"]
+        yield _row(
+            p.get("name", ""), p.get("vicinity") or p.get("formatted_address"),
+            loc["lat"], loc["lng"], p.get("rating"), p.get("place_id"), p.get("keywords"),
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        "Load hospitals into the local directory from a CSV "
+        "(name,address,lat,lon[,rating,place_id,keywords]), a GeoJSON "
+        "FeatureCollection or a dump of Places nearby-search results."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument(
+            "--keywords",
+            default="",
+            help="'|'-separated keywords to tag rows without their own; "
+                 "untagged rows match every search",
+        )
+
+    def handle(self, *args, **options):
+        default_keywords = _keywords(options["keywords"])
+        total = 0
+
+        for path in options["paths"]:
+            suffix = Path(path).suffix.lower()
+            if suffix == ".csv":
+                reader = read_csv
+            elif suffix in (".json", ".geojson"):
+                reader = read_json
+            else:
+                raise CommandError(f"{path}: expected .csv, .json or .geojson")
+
+            try:
+                rows = list(reader(path))
+            except (KeyError, ValueError) as exc:
+                raise CommandError(f"{path}: {exc}")
+
+            for row in rows:
+                row["keywords"] = row["keywords"] or default_keywords
+
+            # The same place can appear twice in a dump; keep the last one.
+            rows = list({row["place_id"]: row for row in rows}.values())
+            total += upsert_hospitals(rows, source="import")
+            self.stdout.write(f"{path}: {len(rows)} hospitals")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} hospitals"))
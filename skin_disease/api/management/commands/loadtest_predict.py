@@ -0,0 +1,98 @@
+import asyncio
+import os
+import statistics
+import time
+import uuid
+from collections import Counter
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ._utils import find_images, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent uploads at a prediction endpoint and report requests/sec and "
+        "latency percentiles. Run it against the same app served under WSGI and ASGI "
+        "with the same worker count, e.g.\n"
+        "  gunicorn skin_disease.wsgi -w 2 --threads 8\n"
+        "  uvicorn skin_disease.asgi:application --workers 2\n"
+        "then compare /api/predict/skin-disease/ with /api/predict/skin-disease/async/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Full endpoint URL, e.g. http://127.0.0.1:8000/api/predict/skin-disease/")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--images",
+            default=os.path.join(settings.MEDIA_ROOT, "scans"),
+            help="Directory of images to upload (default: MEDIA_ROOT/scans)",
+        )
+        parser.add_argument(
+            "--unique",
+            action="store_true",
+            help="Append random trailing bytes to every upload so the prediction cache never hits",
+        )
+        parser.add_argument("--timeout", type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        paths = find_images(options["images"])
+        if not paths:
+            raise CommandError(f"No images found in {options['images']}")
+
+        payloads = []
+        for path in paths:
+            with open(path, "rb") as f:
+                payloads.append((os.path.basename(path), f.read()))
+
+        latencies, statuses, elapsed = asyncio.run(self._run(payloads, options))
+
+        self.stdout.write(f"{options['url']}")
+        self.stdout.write(
+            f"{options['requests']} requests, concurrency {options['concurrency']}, "
+            f"{elapsed:.2f}s total"
+        )
+        self.stdout.write(f"throughput: {options['requests'] / elapsed:.1f} req/s")
+        if latencies:
+            self.stdout.write(
+                f"latency ms: mean {statistics.mean(latencies):.1f}  "
+                f"p50 {percentile(latencies, 50):.1f}  "
+                f"p95 {percentile(latencies, 95):.1f}  "
+                f"p99 {percentile(latencies, 99):.1f}  "
+                f"max {max(latencies):.1f}"
+            )
+        self.stdout.write("status codes: " + ", ".join(
+            f"{code}={count}" for code, count in sorted(statuses.items(), key=str)
+        ))
+
+    async def _run(self, payloads, options):
+        latencies = []
+        statuses = Counter()
+        counter = iter(range(options["requests"]))
+
+        async def worker(client):
+            for i in counter:
+                name, data = payloads[i % len(payloads)]
+                if options["unique"]:
+                    # Bytes after the JPEG/PNG end marker are ignored by decoders.
+                    data = data + uuid.uuid4().bytes
+
+                started = time.perf_counter()
+                try:
+                    response = await client.post(options["url"], files={"image": (name, data)})
+                    statuses[response.status_code] += 1
+                    if response.status_code == 200:
+                        latencies.append((time.perf_counter() - started) * 1000)
+                except httpx.HTTPError as exc:
+                    statuses[type(exc).__name__] += 1
+
+        limits = httpx.Limits(max_connections=options["concurrency"])
+        async with httpx.AsyncClient(timeout=options["timeout"], limits=limits) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(options["concurrency"])))
+            elapsed = time.perf_counter() - started
+
+        return latencies, statuses, elapsed
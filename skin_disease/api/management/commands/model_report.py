@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ml_state
+
+
+class Command(BaseCommand):
+    help = "Load the skin disease model and print the import/load/warmup time breakdown."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            ml_state.load()
+        except ml_state.ModelUnavailable as exc:
+            raise CommandError(str(exc))
+        total = time.perf_counter() - started
+
+        report = ml_state.startup_report
+        self.stdout.write(f"policy:   {report['policy']}")
+        self.stdout.write(f"backend:  {report['backend']}")
+        self.stdout.write(f"path:     {ml_state.get_backend().artifact_path}")
+        self.stdout.write(f"import:   {report['import_seconds']:.3f}s")
+        self.stdout.write(f"load:     {report['load_seconds']:.3f}s")
+        self.stdout.write(f"warmup:   {report['warmup_seconds']:.3f}s")
+        self.stdout.write(f"total:    {total:.3f}s")
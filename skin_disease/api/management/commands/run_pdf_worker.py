@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import pdf_jobs
+
+
+class Command(BaseCommand):
+    help = "Render queued scan PDF reports (PdfRenderJob rows). Run one or more alongside the web workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of polling forever",
+        )
+        parser.add_argument("--max-jobs", type=int, default=0, help="Exit after this many jobs (0 = no limit)")
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        last_requeue = 0.0
+
+        try:
+            while True:
+                if time.monotonic() - last_requeue > 30:
+                    requeued = pdf_jobs.requeue_stale()
+                    if requeued:
+                        self.stderr.write(f"requeued {requeued} stale job(s)")
+                    pruned = pdf_jobs.prune_finished()
+                    if pruned:
+                        self.stdout.write(f"pruned {pruned} finished job(s)")
+                    last_requeue = time.monotonic()
+
+                job = pdf_jobs.claim()
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                if pdf_jobs.run(job):
+                    processed += 1
+                    self.stdout.write(f"scan {job.scan_id}: {job.render_ms:.0f} ms")
+                else:
+                    failed += 1
+                    self.stderr.write(f"scan {job.scan_id}: {job.error} (attempt {job.attempts})")
+
+                if options["max_jobs"] and processed + failed >= options["max_jobs"]:
+                    break
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{processed} rendered, {failed} failed"))
@@ -0,0 +1,134 @@
+import random
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg
+
+from api.feedback_utils import NEUTRAL_SCORE
+from api.ml_features import extract_features
+from api.ml_hospital_predictor import predict_suitability
+from api.models import DoctorFeedback, Hospital
+from api.suitability_model import (
+    DEFAULT_HOSPITAL_TYPE,
+    SuitabilityModel,
+    evaluate,
+    score_metrics,
+)
+
+# DoctorFeedback records no distance. The model does not use one, but the
+# hand-coded baseline needs a value to be compared against it.
+BASELINE_DISTANCE_KM = 2.5
+
+
+def build_dataset():
+    """
+    (rows, labels) from DoctorFeedback: one extract_features() dict per
+    feedback row, labelled with `successful`.
+
+    The hospital rating comes from the hospital directory (mean directory
+    rating when the hospital is unknown). distance and feedback_score are
+    filled with placeholders; the model ignores them (see
+    suitability_model.NUMERIC).
+    """
+    ratings = dict(Hospital.objects.values_list("name", "rating"))
+    default_rating = Hospital.objects.aggregate(avg=Avg("rating"))["avg"] or 4.0
+
+    rows, labels = [], []
+    for fb in DoctorFeedback.objects.all().iterator():
+        rows.append(extract_features(
+            disease=fb.disease,
+            severity=fb.severity,
+            hospital_type=DEFAULT_HOSPITAL_TYPE,
+            rating=ratings.get(fb.hospital_name, default_rating),
+            distance=BASELINE_DISTANCE_KM,
+            feedback_score=NEUTRAL_SCORE,
+        ))
+        labels.append(int(fb.successful))
+
+    return rows, labels
+
+
+def handcoded_scores(rows):
+    scores = []
+    for r in rows:
+        try:
+            scores.append(predict_suitability(
+                rating=r["rating"], distance=r["distance"], severity=r["severity"],
+            ))
+        except Exception:
+            scores.append(0.5)
+    return np.array(scores)
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the hospital suitability model (logistic regression) from "
+        "DoctorFeedback, report held-out metrics against the hand-coded "
+        "formula and save it to HOSPITAL_SUITABILITY_MODEL_PATH."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=str(settings.HOSPITAL_SUITABILITY_MODEL_PATH))
+        parser.add_argument("--test-size", type=float, default=0.2)
+        parser.add_argument("--l2", type=float, default=1e-2)
+        parser.add_argument("--epochs", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--min-samples",
+            type=int,
+            default=50,
+            help="Refuse to train on fewer feedback rows than this",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Evaluate only; do not write the artifact",
+        )
+
+    def handle(self, *args, **options):
+        rows, labels = build_dataset()
+        if len(rows) < options["min_samples"]:
+            raise CommandError(
+                f"Only {len(rows)} feedback rows (need {options['min_samples']}); "
+                "ranking keeps using the hand-coded formula."
+            )
+        if len(set(labels)) < 2:
+            raise CommandError("Feedback has only one outcome class; nothing to learn.")
+
+        order = list(range(len(rows)))
+        random.Random(options["seed"]).shuffle(order)
+        n_test = max(1, int(len(rows) * options["test_size"]))
+        test, train = order[:n_test], order[n_test:]
+
+        fit_kwargs = {"l2": options["l2"], "epochs": options["epochs"]}
+        started = time.perf_counter()
+        model = SuitabilityModel.fit([rows[i] for i in train], [labels[i] for i in train], **fit_kwargs)
+        fit_seconds = time.perf_counter() - started
+
+        test_rows = [rows[i] for i in test]
+        test_labels = [labels[i] for i in test]
+        holdout = evaluate(model, test_rows, test_labels)
+        baseline = score_metrics(handcoded_scores(test_rows), test_labels)
+
+        self.stdout.write(f"samples: {len(train)} train / {len(test)} held out, fit {fit_seconds:.2f}s")
+        self.stdout.write(f"{'':12}{'accuracy':>10}{'log loss':>10}{'auc':>8}")
+        for name, m in (("model", holdout), ("hand-coded", baseline)):
+            auc = f"{m['auc']:.3f}" if m["auc"] is not None else "n/a"
+            self.stdout.write(f"{name:12}{m['accuracy']:>10.3f}{m['log_loss']:>10.3f}{auc:>8}")
+
+        if options["dry_run"]:
+            return
+
+        # Ship a model trained on everything; the held-out numbers above
+        # are the estimate of how it generalises.
+        model = SuitabilityModel.fit(rows, labels, **fit_kwargs)
+        model.info.update({
+            "samples": len(rows),
+            "holdout": holdout,
+            "baseline_holdout": baseline,
+            "imputed": {"hospital_type": DEFAULT_HOSPITAL_TYPE},
+        })
+        model.save(options["output"])
+        self.stdout.write(self.style.SUCCESS(f"Saved {options['output']}"))
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import User
+from api.geocoding import geocode_city, normalize_city
+
+
+class Command(BaseCommand):
+    help = "Pre-warm the geocode cache from the distinct cities on user profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Re-geocode every city even if a fresh cache row exists",
+        )
+        parser.add_argument(
+            "--delay",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between geocode API calls",
+        )
+
+    def handle(self, *args, **options):
+        cities = {
+            normalize_city(city)
+            for city in User.objects.exclude(city="").values_list("city", flat=True).distinct()
+        }
+        cities.discard("")
+
+        resolved = failed = 0
+        for city in sorted(cities):
+            try:
+                coords = geocode_city(city, refresh=options["refresh"])
+            except Exception as exc:
+                self.stderr.write(f"{city}: {exc}")
+                failed += 1
+                continue
+
+            if coords is None:
+                self.stderr.write(f"{city}: not found")
+                failed += 1
+            else:
+                resolved += 1
+
+            if options["delay"]:
+                time.sleep(options["delay"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(cities)} distinct cities: {resolved} cached, {failed} failed"
+        ))
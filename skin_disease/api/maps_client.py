@@ -0,0 +1,145 @@
+# api/maps_client.py
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class MapsClient:
+    """
+    Shared Google Maps web-service client.
+
+    Uses one pooled keep-alive `requests.Session`, so geocode / nearby /
+    text searches reuse TCP+TLS connections instead of opening one per
+    call. HTTP 5xx responses (and one failed connect) are retried by
+    urllib3 with exponential backoff; OVER_QUERY_LIMIT answers (returned
+    with HTTP 200) are retried here with the same backoff. Read timeouts
+    are never retried.
+
+    The call's `timeout` is a deadline only for the OVER_QUERY_LIMIT
+    retries done here: each one gets what is left of it. The urllib3
+    retries happen inside a single session.get() and every attempt gets
+    the full `timeout`, so a failing upstream can cost up to
+    (max_retries + 1) timeouts plus backoff. Callers with a hard budget
+    (the doctor-lookup deadline in views) enforce it themselves. Latency, call and
+    error counters are kept per endpoint under `maps.<endpoint>.*`.
+
+    Point `base_url` at api.maps_stub.FakeMapsServer to run without the
+    network, and install it with set_maps_client().
+    """
+
+    def __init__(self, *, base_url, api_key, pool_size=20, max_retries=2, backoff=0.2, timeout=5):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            connect=min(max_retries, 1),
+            read=False,
+            status=max_retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET"],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, endpoint, params, timeout=None):
+        """GET <base_url>/<endpoint>/json and return the decoded payload."""
+        name = endpoint.rsplit("/", 1)[-1]
+        url = f"{self.base_url}/{endpoint}/json"
+        params = {**params, "key": self.api_key}
+
+        metrics.counter(f"maps.{name}.calls").inc()
+        latency = metrics.histogram(f"maps.{name}.latency_ms", metrics.LATENCY_BUCKETS_MS)
+
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+                response.raise_for_status()
+                data = response.json()
+            except (requests.RequestException, ValueError):
+                metrics.counter(f"maps.{name}.errors").inc()
+                raise
+            finally:
+                latency.observe((time.perf_counter() - started) * 1000)
+
+            if data.get("status") != "OVER_QUERY_LIMIT" or attempt == self.max_retries:
+                break
+
+            delay = self.backoff * (2 ** attempt)
+            timeout = deadline - time.monotonic() - delay
+            if timeout <= 0:
+                break
+
+            metrics.counter(f"maps.{name}.retries").inc()
+            time.sleep(delay)
+
+        if data.get("status") not in (None, "OK", "ZERO_RESULTS"):
+            metrics.counter(f"maps.{name}.errors").inc()
+
+        return data
+
+    def geocode(self, address):
+        return self.get("geocode", {"address": address})
+
+    def nearby_search(self, *, lat, lon, radius, keyword, place_type="hospital"):
+        return self.get("place/nearbysearch", {
+            "location": f"{lat},{lon}",
+            "radius": radius,
+            "keyword": keyword,
+            "type": place_type,
+        })
+
+    def text_search(self, *, query, lat, lon, radius, timeout=None):
+        return self.get("place/textsearch", {
+            "query": query,
+            "location": f"{lat},{lon}",
+            "radius": radius,
+        }, timeout=timeout)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_maps_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MapsClient(
+                    base_url=settings.GOOGLE_MAPS_API_BASE,
+                    api_key=settings.GOOGLE_MAPS_API_KEY,
+                    pool_size=settings.GOOGLE_MAPS_POOL_SIZE,
+                    max_retries=settings.GOOGLE_MAPS_MAX_RETRIES,
+                    backoff=settings.GOOGLE_MAPS_RETRY_BACKOFF,
+                    timeout=settings.GOOGLE_MAPS_TIMEOUT,
+                )
+    return _client
+
+
+def set_maps_client(client):
+    """Swap the shared client (e.g. for a stub-backed one); returns the previous client."""
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
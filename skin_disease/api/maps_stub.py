@@ -0,0 +1,144 @@
+# api/maps_stub.py
+"""
+A tiny local stand-in for the Google Maps geocode / Places endpoints used by
+nearby_hospitals, so the hospital pipeline can be benchmarked without the
+network. Install a client pointed at it with
+`set_maps_client(MapsClient(base_url=server.base_url, api_key="stub"))`.
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _offset(lat, lon, rng, max_km=5):
+    distance = rng.uniform(0.2, max_km)
+    bearing = rng.uniform(0, 2 * math.pi)
+    dlat = distance / 111.0 * math.cos(bearing)
+    dlon = distance / (111.0 * max(math.cos(math.radians(lat)), 0.01)) * math.sin(bearing)
+    return lat + dlat, lon + dlon
+
+
+class FakeMapsServer:
+    """
+    Threaded HTTP server answering /geocode/json, /place/nearbysearch/json and
+    /place/textsearch/json with deterministic fake data.
+
+    `latency` maps endpoint name ("geocode", "nearbysearch", "textsearch") to
+    seconds of artificial delay. `slow_fraction` of textsearch calls sleep
+    `slow_latency` instead, to exercise deadlines; `slow_calls` counts them.
+    `calls` counts requests per endpoint.
+    """
+
+    def __init__(self, *, hospitals=20, latency=None, slow_fraction=0.0, slow_latency=10.0, seed=0):
+        self.hospitals = hospitals
+        self.latency = {"geocode": 0.05, "nearbysearch": 0.1, "textsearch": 0.1, **(latency or {})}
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.seed = seed
+        self.calls = {"geocode": 0, "nearbysearch": 0, "textsearch": 0}
+        self.slow_calls = 0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                endpoint = url.path.strip("/").split("/")[-2]
+                body = json.dumps(stub.respond(endpoint, params)).encode()
+
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, endpoint, params):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+        delay = self.latency.get(endpoint, 0)
+        if endpoint == "textsearch" and random.random() < self.slow_fraction:
+            delay = self.slow_latency
+            with self._lock:
+                self.slow_calls += 1
+        time.sleep(delay)
+
+        if endpoint == "geocode":
+            rng = random.Random(f"{self.seed}:{params.get('address', '')}")
+            return {
+                "status": "OK",
+                "results": [{"geometry": {"location": {
+                    "lat": rng.uniform(8, 30),
+                    "lng": rng.uniform(70, 88),
+                }}}],
+            }
+
+        lat, lon = (float(v) for v in params.get("location", "0,0").split(","))
+        rng = random.Random(f"{self.seed}:{endpoint}:{params.get('location')}:{params.get('query', '')}")
+
+        if endpoint == "nearbysearch":
+            results = []
+            for i in range(self.hospitals):
+                h_lat, h_lon = _offset(lat, lon, rng)
+                results.append({
+                    "place_id": f"hospital-{rng.getrandbits(48):x}",
+                    "name": f"Hospital {i}",
+                    "vicinity": f"{i} Stub Road",
+                    "rating": round(rng.uniform(3.0, 5.0), 1),
+                    "geometry": {"location": {"lat": h_lat, "lng": h_lon}},
+                })
+            return {"status": "OK", "results": results}
+
+        if endpoint == "textsearch":
+            results = []
+            for i in range(5):
+                d_lat, d_lon = _offset(lat, lon, rng, max_km=1)
+                results.append({
+                    "place_id": f"doctor-{rng.getrandbits(48):x}",
+                    "name": f"Dr. Stub {i}",
+                    "rating": round(rng.uniform(3.5, 5.0), 1),
+                    "geometry": {"location": {"lat": d_lat, "lng": d_lon}},
+                })
+            return {"status": "OK", "results": results}
+
+        return {"status": "INVALID_REQUEST", "results": []}
@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_geocodecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hospital',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('place_id', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('address', models.CharField(blank=True, max_length=500)),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('rating', models.FloatField(default=0)),
+                ('keywords', models.TextField(blank=True)),
+                ('source', models.CharField(default='places', max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lat', 'lon'], name='api_hospita_lat_b34be5_idx')],
+            },
+        ),
+    ]
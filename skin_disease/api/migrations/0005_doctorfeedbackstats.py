@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_hospital'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorFeedbackStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hospital_name', models.CharField(max_length=255)),
+                ('disease', models.CharField(max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('success_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='doctorfeedback',
+            index=models.Index(fields=['hospital_name', 'disease'], name='api_doctorf_hospita_1250a3_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='doctorfeedbackstats',
+            constraint=models.UniqueConstraint(fields=('hospital_name', 'disease'), name='unique_feedback_stats'),
+        ),
+    ]
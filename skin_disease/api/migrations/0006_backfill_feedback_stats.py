@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 13:10
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    DoctorFeedback = apps.get_model("api", "DoctorFeedback")
+    DoctorFeedbackStats = apps.get_model("api", "DoctorFeedbackStats")
+
+    rows = (
+        DoctorFeedback.objects.values("hospital_name", "disease")
+        .annotate(
+            count=Count("id"),
+            rating_sum=Sum("rating"),
+            success_count=Count("id", filter=Q(successful=True)),
+        )
+    )
+    DoctorFeedbackStats.objects.all().delete()
+    DoctorFeedbackStats.objects.bulk_create(
+        [DoctorFeedbackStats(**row) for row in rows],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_doctorfeedbackstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
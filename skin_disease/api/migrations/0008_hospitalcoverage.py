@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HospitalCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12)),
+                ('keyword', models.CharField(max_length=100)),
+                ('radius_m', models.PositiveIntegerField()),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('cell', 'keyword'), name='hospital_coverage_cell_keyword')],
+            },
+        ),
+    ]
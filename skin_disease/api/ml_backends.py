@@ -0,0 +1,176 @@
+# api/ml_backends.py
+import os
+import threading
+
+import numpy as np
+
+INPUT_SHAPE = (224, 224, 3)
+
+TFLITE_VARIANTS = ("fp16", "int8")
+
+
+def tflite_artifact_path(keras_path, variant):
+    """ml_models/skin_disease_final.keras -> ml_models/skin_disease_final_<variant>.tflite"""
+    stem, _ = os.path.splitext(str(keras_path))
+    return f"{stem}_{variant}.tflite"
+
+
+class InferenceBackend:
+    """
+    Common interface for everything that can turn a float32 Nx224x224x3
+    batch into an NxC softmax array. ml_state times each stage separately:
+    import_runtime() -> load() -> predict() on a warmup batch.
+    """
+
+    name = None
+
+    def __init__(self, keras_path):
+        self.keras_path = os.path.normpath(str(keras_path))
+        self.model = None
+
+    @property
+    def artifact_path(self):
+        return self.keras_path
+
+    def fingerprint(self):
+        """Backend name, size and mtime of the artifact as it is on disk now."""
+        stat = os.stat(self.artifact_path)
+        return f"{self.name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def import_runtime(self):
+        raise NotImplementedError
+
+    def load(self):
+        raise NotImplementedError
+
+    def predict(self, x):
+        raise NotImplementedError
+
+
+class KerasBackend(InferenceBackend):
+    name = "keras"
+
+    def import_runtime(self):
+        import tensorflow as tf
+        self._tf = tf
+
+    def load(self):
+        tf = self._tf
+        keras_model = tf.keras.models.load_model(self.artifact_path)
+
+        # `model.predict` builds a data adapter, callbacks and an iterator
+        # on every call, which dominates the cost of a single-image request.
+        # The traced function has a fixed input signature with a variable
+        # batch dimension, so it is traced once for every batch size.
+        @tf.function(
+            input_signature=[tf.TensorSpec(shape=(None, *INPUT_SHAPE), dtype=tf.float32)],
+            reduce_retracing=True,
+        )
+        def _traced(x):
+            return keras_model(x, training=False)
+
+        self.model = keras_model
+        self._traced = _traced
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        return self._traced(self._tf.convert_to_tensor(x)).numpy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    Runs a converted .tflite artifact (see `manage.py convert_model`).
+    Prefers the standalone LiteRT / tflite_runtime interpreters, which avoid
+    loading the full TensorFlow runtime, and falls back to tf.lite.
+    """
+
+    def __init__(self, keras_path, variant, num_threads=None, artifact_path=None):
+        super().__init__(keras_path)
+        self.variant = variant
+        # Overridden by convert_model to validate a freshly converted file
+        # before it replaces the one being served.
+        self._artifact_path = artifact_path
+        self.name = f"tflite-{variant}"
+        self.num_threads = num_threads
+        # The interpreter is stateful (input/output tensors), so calls are
+        # serialised; the micro-batcher already funnels work to one thread.
+        self._lock = threading.Lock()
+        self._batch_size = None
+
+    @property
+    def artifact_path(self):
+        return self._artifact_path or tflite_artifact_path(self.keras_path, self.variant)
+
+    def import_runtime(self):
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tflite_runtime.interpreter import Interpreter
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter
+        self._interpreter_cls = Interpreter
+
+    def load(self):
+        if not os.path.exists(self.artifact_path):
+            raise FileNotFoundError(
+                f"{self.artifact_path} not found; run `manage.py convert_model --variants {self.variant}`"
+            )
+
+        interpreter = self._interpreter_cls(
+            model_path=self.artifact_path,
+            num_threads=self.num_threads,
+        )
+        interpreter.allocate_tensors()
+        self.model = interpreter
+        self._input_index = interpreter.get_input_details()[0]["index"]
+        self._output_index = interpreter.get_output_details()[0]["index"]
+        self._batch_size = 1
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+
+        with self._lock:
+            if x.shape[0] != self._batch_size:
+                self.model.resize_tensor_input(self._input_index, list(x.shape))
+                self.model.allocate_tensors()
+                self._batch_size = x.shape[0]
+
+            self.model.set_tensor(self._input_index, x)
+            self.model.invoke()
+            return self.model.get_tensor(self._output_index).copy()
+
+
+BACKENDS = ("keras",) + tuple(f"tflite-{v}" for v in TFLITE_VARIANTS)
+
+
+def create_backend(name, keras_path, num_threads=None):
+    if name == "keras":
+        return KerasBackend(keras_path)
+
+    if name.startswith("tflite-") and name[len("tflite-"):] in TFLITE_VARIANTS:
+        return TFLiteBackend(keras_path, name[len("tflite-"):], num_threads=num_threads)
+
+    raise ValueError(f"Unknown inference backend {name!r}; expected one of {BACKENDS}")
+
+
+def convert_to_tflite(keras_model, variant):
+    """
+    Convert a loaded Keras model to TFLite bytes.
+
+    fp16: weights stored as float16, computation in float32.
+    int8: dynamic-range quantisation, int8 weights with float activations;
+          no representative dataset needed.
+    """
+    import tensorflow as tf
+
+    if variant not in TFLITE_VARIANTS:
+        raise ValueError(f"Unknown TFLite variant {variant!r}; expected one of {TFLITE_VARIANTS}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if variant == "fp16":
+        converter.target_spec.supported_types = [tf.float16]
+
+    return converter.convert()
@@ -1,20 +1,54 @@
-def predict_suitability(*, rating, distance, severity):
+import numpy as np
+
+from .suitability_model import DEFAULT_HOSPITAL_TYPE, get_model
+
+
+SEVERITY_BOOST = {
+    "Low": 0.2,
+    "Moderate": 0.4,
+    "High": 0.6,
+}
+
+
+def handcoded_suitability_batch(ratings, distances, severity):
     """
     This will later become:
     model.predict_proba(X)[1]
     """
-
-    severity_boost = {
-        "Low": 0.2,
-        "Moderate": 0.4,
-        "High": 0.6,
-    }[severity]
-
     score = (
-        rating * 0.15
-        - distance * 0.03
-        + severity_boost
+        np.asarray(ratings, dtype=np.float64) * 0.15
+        - np.asarray(distances, dtype=np.float64) * 0.03
+        + SEVERITY_BOOST[severity]
     )
 
     # Clamp to [0, 1]
-    return round(max(0, min(score, 1)), 2)
+    return np.clip(score, 0, 1)
+
+
+def predict_suitability(*, rating, distance, severity):
+    """The hand-coded formula for a single hospital."""
+    return round(float(handcoded_suitability_batch([rating], [distance], severity)[0]), 2)
+
+
+def predict_suitability_batch(*, ratings, distances, severity, disease=None):
+    """
+    Suitability for many hospitals at once. Uses the trained model
+    (`manage.py train_suitability_model`) in a single predict_proba call
+    when its artifact exists, else the hand-coded formula above. The model
+    does not use distance (see suitability_model.NUMERIC).
+    """
+    model = get_model()
+    if model is None:
+        return np.round(handcoded_suitability_batch(ratings, distances, severity), 2)
+
+    n = len(ratings)
+    X = model.encode_columns(
+        n,
+        {
+            "disease": disease or "",
+            "severity": severity,
+            "hospital_type": DEFAULT_HOSPITAL_TYPE,
+        },
+        {"rating": ratings},
+    )
+    return np.round(model.predict_proba(X)[:, 1], 2)
@@ -0,0 +1,113 @@
+# api/ml_pipeline.py
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import metrics, ml_state, ml_utils
+
+
+class PipelineBusy(RuntimeError):
+    """Raised when too many images are already being decoded or queued for the model."""
+
+
+class PredictionPipeline:
+    """
+    Two-stage pipeline: decode/resize on a bounded thread pool, then hand the
+    array to the model queue (the micro-batcher when batching is enabled).
+
+    PIL releases the GIL while decoding, so decode of request N+1 overlaps
+    with inference of request N. At most `max_pending` images may be in
+    flight across both stages; beyond that submit() raises PipelineBusy
+    instead of letting decoded arrays pile up in memory.
+    """
+
+    def __init__(self, *, workers, max_pending, admit_timeout_ms=0):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preprocess")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.admit_timeout = admit_timeout_ms / 1000.0
+
+        self._in_flight = metrics.gauge("pipeline.in_flight")
+        self._rejected = metrics.counter("pipeline.rejected")
+        self._infer_ms = metrics.histogram("pipeline.infer_ms", metrics.LATENCY_BUCKETS_MS)
+        self._count = 0
+        self._count_lock = threading.Lock()
+
+    def _admit(self, wait=True):
+        if not self._slots.acquire(timeout=self.admit_timeout if wait else 0):
+            self._rejected.inc()
+            raise PipelineBusy("Prediction queue is full, retry shortly")
+        self._adjust(1)
+
+    def _release(self):
+        self._adjust(-1)
+        self._slots.release()
+
+    def _adjust(self, delta):
+        with self._count_lock:
+            self._count += delta
+            self._in_flight.set(self._count)
+
+    def preprocess(self, file_obj):
+        """Future of the 1x224x224x3 array for one upload (decode stage only)."""
+        self._admit()
+        future = self._pool.submit(ml_utils.preprocess_image_from_file, file_obj)
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def submit(self, file_obj, wait=True):
+        """
+        Future of (preprocessed 1x224x224x3 array, softmax row) for one
+        upload (decode + inference). Pass wait=False from an event loop so admission never blocks it.
+        """
+        self._admit(wait)
+        outer = Future()
+
+        def _finish(inner, x, started):
+            self._infer_ms.observe((time.perf_counter() - started) * 1000)
+            self._release()
+            exc = inner.exception()
+            if exc is not None:
+                outer.set_exception(exc)
+            else:
+                outer.set_result((x, inner.result()))
+
+        def _run():
+            try:
+                x = ml_utils.preprocess_image_from_file(file_obj)
+            except Exception as exc:
+                self._release()
+                outer.set_exception(exc)
+                return
+
+            started = time.perf_counter()
+            if settings.ML_BATCHING_ENABLED:
+                inner = ml_state.get_batcher().submit(x)
+            else:
+                inner = Future()
+                try:
+                    inner.set_result(ml_state.get_infer_fn()(x)[0])
+                except Exception as exc:
+                    inner.set_exception(exc)
+            inner.add_done_callback(lambda f: _finish(f, x, started))
+
+        self._pool.submit(_run)
+        return outer
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = PredictionPipeline(
+                    workers=settings.ML_PREPROCESS_WORKERS,
+                    max_pending=settings.ML_PIPELINE_MAX_PENDING,
+                    admit_timeout_ms=settings.ML_PIPELINE_ADMIT_TIMEOUT_MS,
+                )
+    return _pipeline
@@ -1,22 +1,205 @@
 # api/ml_state.py
+import logging
 import os
+import sys
+import threading
+import time
 
-model = None  # This ensures: Model loads once, No reload on every request, Much faster API
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .ml_backends import BACKENDS, INPUT_SHAPE, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Single registry for the skin disease model. Everything that needs the model
+# (apps.ready, views, benchmarks) goes through load()/get_model() so it is
+# imported and loaded exactly once per process.
+backend = None
+model = None
+infer_fn = None
+# Fingerprint of the artifact that was actually loaded (see
+# InferenceBackend.fingerprint); the prediction cache keys on it.
+model_fingerprint = None
+
+LOAD_POLICIES = ("eager", "lazy", "disabled")
+
+# Management commands that serve requests and should honour the "eager" policy.
+SERVING_COMMANDS = {"runserver"}
+
+startup_report = {
+    "policy": None,
+    "backend": None,
+    "status": "not_loaded",
+    "import_seconds": None,
+    "load_seconds": None,
+    "warmup_seconds": None,
+    "error": None,
+}
+
+_model_lock = threading.Lock()
+
+
+class ModelUnavailable(RuntimeError):
+    pass
+
+
+def get_load_policy():
+    policy = getattr(settings, "ML_MODEL_LOAD_POLICY", "eager")
+    if policy not in LOAD_POLICIES:
+        raise ValueError(f"ML_MODEL_LOAD_POLICY must be one of {LOAD_POLICIES}, got {policy!r}")
+    return policy
+
+
+def get_model_path():
+    return os.path.normpath(str(settings.ML_MODEL_PATH))
+
+
+def get_backend_name():
+    name = getattr(settings, "ML_INFERENCE_BACKEND", "keras")
+    if name not in BACKENDS:
+        raise ValueError(f"ML_INFERENCE_BACKEND must be one of {BACKENDS}, got {name!r}")
+    return name
+
+
+def running_command():
+    """
+    Name of the management command this process was started with, or None
+    outside of one (gunicorn, uvicorn, ...). Looks for Django's
+    ManagementUtility.execute on the stack, so manage.py, django-admin and
+    `python -m django` are all recognised; apps.ready runs inside it.
+    """
+    from django.core.management import ManagementUtility
+
+    execute_code = ManagementUtility.execute.__code__
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is execute_code:
+            argv = frame.f_locals["self"].argv
+            return argv[1] if len(argv) > 1 else "help"
+        frame = frame.f_back
+    return None
+
+
+def is_management_command():
+    """True when running a management command other than a serving one."""
+    command = running_command()
+    return command is not None and command not in SERVING_COMMANDS
+
+
+def should_load_at_startup():
+    return get_load_policy() == "eager" and not is_management_command()
+
+
+def _record(stage, seconds):
+    startup_report[stage] = round(seconds, 3)
+    metrics.gauge(f"model.{stage}").set(startup_report[stage])
+
+
+def load():
+    """
+    Import the configured backend's runtime, load the model and warm up the
+    inference function. Safe to call from many threads; only the first call
+    does any work.
+    """
+    global backend, model, infer_fn, model_fingerprint
+
+    if infer_fn is not None:
+        return
+
+    with _model_lock:
+        if infer_fn is not None:
+            return
+
+        startup_report["policy"] = get_load_policy()
+        startup_report["backend"] = get_backend_name()
+        if startup_report["policy"] == "disabled":
+            startup_report["status"] = "disabled"
+            raise ModelUnavailable("Model loading is disabled (ML_MODEL_LOAD_POLICY=disabled)")
+
+        try:
+            candidate = create_backend(
+                get_backend_name(),
+                get_model_path(),
+                num_threads=getattr(settings, "ML_TFLITE_NUM_THREADS", None),
+            )
+
+            started = time.perf_counter()
+            candidate.import_runtime()
+            _record("import_seconds", time.perf_counter() - started)
+
+            # Taken before loading: if the file is swapped mid-load this names
+            # the older artifact, which only costs cache misses later.
+            fingerprint = candidate.fingerprint()
+            started = time.perf_counter()
+            candidate.load()
+            _record("load_seconds", time.perf_counter() - started)
+
+            started = time.perf_counter()
+            candidate.predict(np.zeros((1, *INPUT_SHAPE), dtype=np.float32))
+            _record("warmup_seconds", time.perf_counter() - started)
+        except Exception as exc:
+            startup_report["status"] = "failed"
+            startup_report["error"] = str(exc)
+            raise
+
+        backend = candidate
+        model = candidate.model
+        model_fingerprint = fingerprint
+        infer_fn = candidate.predict
+        startup_report["status"] = "loaded"
+
+        logger.info(
+            "Skin disease model loaded (policy=%s, backend=%s): import %.2fs, load %.2fs, warmup %.2fs",
+            startup_report["policy"],
+            startup_report["backend"],
+            startup_report["import_seconds"],
+            startup_report["load_seconds"],
+            startup_report["warmup_seconds"],
+        )
+
+
+def get_backend():
+    """Return the active InferenceBackend, loading it on first use."""
+    load()
+    return backend
 
 
 def get_model():
-	"""Lazily load and return the ML model. Falls back to standalone `keras` if
-	`tensorflow.keras` is not available.
-	"""
-	global model
-	if model is None:
-		try:
-			from tensorflow.keras.models import load_model as _load_model
-		except Exception:
-			from keras.models import load_model as _load_model
-
-		model_path = os.path.join(os.path.dirname(__file__), '..', 'ml_models', 'skin_disease_final.keras')
-		model_path = os.path.normpath(model_path)
-		model = _load_model(model_path)
-
-	return model
+    """
+    Return the backend's underlying model object (a Keras model, or a TFLite
+    interpreter for the tflite-* backends), loading it on first use.
+    """
+    load()
+    return model
+
+
+def get_infer_fn():
+    """
+    Return the active backend's inference callable: float32 Nx224x224x3 in,
+    softmax NxC numpy array out.
+    """
+    load()
+    return infer_fn
+
+
+batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Return the process-wide micro-batcher sitting in front of the model."""
+    global batcher
+    if batcher is None:
+        with _batcher_lock:
+            if batcher is None:
+                from .batching import MicroBatcher
+
+                batcher = MicroBatcher(
+                    lambda x: get_infer_fn()(x),
+                    max_batch_size=settings.ML_BATCH_MAX_SIZE,
+                    max_delay_ms=settings.ML_BATCH_MAX_DELAY_MS,
+                )
+
+    return batcher
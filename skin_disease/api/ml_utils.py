@@ -16,35 +16,188 @@ CLASS_FULL_FORMS = {
 }
 
 
+import asyncio
+from concurrent.futures import as_completed
+
 import numpy as np
-from io import BytesIO
 from PIL import Image
+from django.conf import settings
 
-try:
-    from tensorflow.keras.applications.efficientnet import preprocess_input
-    from tensorflow.keras.preprocessing.image import load_img, img_to_array
-except Exception:
-    from keras.applications.efficientnet import preprocess_input
-    from keras.preprocessing.image import load_img, img_to_array
+from . import metrics, prediction_cache
 
 IMAGE_SIZE = (224, 224)
 
+# Images at least this many times larger than IMAGE_SIZE are first shrunk
+# with Image.reduce (box filter over whole pixel blocks) before the bicubic
+# resize; see Pillow's `reducing_gap`.
+RESIZE_REDUCING_GAP = 3.0
+
+
+def decode_image(file_obj):
+    """
+    Open an upload and decode it to RGB at the smallest size that is still
+    >= IMAGE_SIZE. For JPEGs, `draft` lets libjpeg scale by 1/2, 1/4 or 1/8
+    while decoding, so a 12 MP phone photo never gets fully decoded.
+    """
+    # Image.open only parses the header; pixels are decoded by convert().
+    with metrics.timer("pipeline.read_ms"):
+        file_obj.seek(0)
+        img = Image.open(file_obj)
+
+        if img.format == "JPEG":
+            img.draft("RGB", IMAGE_SIZE)
+
+    with metrics.timer("pipeline.decode_ms"):
+        return img.convert("RGB")
+
+
 def preprocess_image_from_file(file_obj):
-    
-    file_obj.seek(0)
-    raw = file_obj.read()
-    img = Image.open(BytesIO(raw)).convert("RGB")
-    img = img.resize(IMAGE_SIZE)
-    x = img_to_array(img)
-    x = np.expand_dims(x, axis=0)
-    x = preprocess_input(x)
-    return x
+    img = decode_image(file_obj)
+
+    with metrics.timer("pipeline.resize_ms"):
+        img = img.resize(IMAGE_SIZE, reducing_gap=RESIZE_REDUCING_GAP)
+
+    # EfficientNet's `preprocess_input` is a pass-through (rescaling is part
+    # of the model), so the uint8 pixels go straight to a float32 batch.
+    with metrics.timer("pipeline.normalize_ms"):
+        return np.asarray(img, dtype=np.float32)[np.newaxis]
 
 
 def predict_skin_disease_from_file(model, file_obj):
-    x = preprocess_image_from_file(file_obj)
+    """
+    Predict one upload. Decoding runs on the shared preprocessing pool and
+    inference on the model queue (see ml_pipeline); raises
+    ml_pipeline.PipelineBusy when the pipeline is saturated.
+    """
+    from .ml_pipeline import get_pipeline
+
+    cache_key = None
+    if prediction_cache.is_enabled():
+        cache_key, cached = prediction_cache.lookup(file_obj)
+        if cached is not None:
+            return cached
+
+    x, preds = get_pipeline().submit(file_obj).result()
+    preds = apply_tta(x, preds[np.newaxis])[0]
+    return _finish_prediction(preds, cache_key)
+
+
+async def apredict_skin_disease_from_file(file_obj):
+    """
+    Async twin of predict_skin_disease_from_file for ASGI views: the event
+    loop only awaits the pipeline future, so no thread is held while the
+    image is decoded or waits for its turn in the model batch.
+    """
+    from asgiref.sync import sync_to_async
+    from .ml_pipeline import get_pipeline
+
+    cache_key = None
+    if prediction_cache.is_enabled():
+        # Hashing and the optional shared cache tier are blocking.
+        cache_key, cached = await sync_to_async(
+            prediction_cache.lookup, thread_sensitive=False
+        )(file_obj)
+        if cached is not None:
+            return cached
+
+    x, preds = await asyncio.wrap_future(get_pipeline().submit(file_obj, wait=False))
+    if needs_tta(preds):
+        # The augmented views go through the model; keep that off the loop.
+        preds = (await sync_to_async(apply_tta, thread_sensitive=False)(x, preds[np.newaxis]))[0]
+    else:
+        # Nothing to augment, so this returns at once; it still counts the
+        # prediction in tta.checked like the sync path does.
+        preds = apply_tta(x, preds[np.newaxis])[0]
+    result = _finish_prediction(preds, None)
+
+    if cache_key is not None:
+        await sync_to_async(prediction_cache.store, thread_sensitive=False)(cache_key, result)
+
+    return result
+
+
+def _finish_prediction(preds, cache_key):
+    with metrics.timer("pipeline.postprocess_ms"):
+        result = format_prediction(preds)
+
+    if cache_key is not None:
+        prediction_cache.store(cache_key, result)
+
+    return result
+
+
+def _center_crop(x, fraction=0.875):
+    h, w = x.shape[:2]
+    ch, cw = int(h * fraction), int(w * fraction)
+    top, left = (h - ch) // 2, (w - cw) // 2
+    crop = Image.fromarray(x[top:top + ch, left:left + cw].astype(np.uint8))
+    return np.asarray(crop.resize(IMAGE_SIZE, Image.BICUBIC), dtype=np.float32)
+
+
+def augment_views(x):
+    """Test-time augmentation views of one HxWxC image (the original excluded)."""
+    return [
+        np.fliplr(x),
+        np.flipud(x),
+        np.rot90(x, 1),
+        np.rot90(x, 3),
+        _center_crop(x),
+    ]
 
-    preds = model.predict(x)[0]
+
+def infer_rows(xs):
+    """
+    Softmax rows for a float32 NxHxWxC batch. With ML_BATCHING_ENABLED the
+    rows go through the shared micro-batcher like single predictions do, so
+    TTA views and batch uploads share its forward passes and show up in its
+    batch-size and queue metrics instead of racing it for the model.
+    """
+    from . import ml_state
+
+    if not settings.ML_BATCHING_ENABLED:
+        return ml_state.get_infer_fn()(xs)
+
+    batcher = ml_state.get_batcher()
+    futures = [batcher.submit(x) for x in xs]
+    return np.stack([future.result() for future in futures])
+
+
+def needs_tta(preds):
+    return settings.ML_TTA_ENABLED and float(np.max(preds)) < settings.ML_TTA_CONFIDENCE_CUTOFF
+
+
+def apply_tta(xs, preds):
+    """
+    Adaptive test-time augmentation. Rows of `preds` (NxC) whose top
+    confidence is below ML_TTA_CONFIDENCE_CUTOFF are replaced by the mean
+    softmax over the original pass plus its augmented views; all augmented
+    views of all low-confidence images are submitted together (infer_rows).
+    Confident predictions are returned untouched, so the average cost stays
+    close to a single forward pass.
+    """
+    if not settings.ML_TTA_ENABLED:
+        return preds
+
+    metrics.counter("tta.checked").inc(len(preds))
+    low = [i for i, row in enumerate(preds) if needs_tta(row)]
+    if not low:
+        return preds
+
+    with metrics.timer("tta.latency_ms"):
+        views = [augment_views(xs[i]) for i in low]
+        n_views = len(views[0])
+        view_preds = infer_rows(np.stack([v for group in views for v in group]))
+        view_preds = view_preds.reshape(len(low), n_views, -1)
+
+        preds = np.array(preds, copy=True)
+        preds[low] = (preds[low] + view_preds.sum(axis=1)) / (n_views + 1)
+
+    metrics.counter("tta.fired").inc(len(low))
+    return preds
+
+
+def format_prediction(preds):
+    """Turn one softmax row into the prediction dict returned by the API."""
     idx = int(np.argmax(preds))
 
     label_code = CLASS_NAMES[idx]
@@ -58,3 +211,61 @@ def predict_skin_disease_from_file(model, file_obj):
         "confidence_percent": round(confidence * 100, 2),
         "explanation": f"The model predicts {full_form} with {confidence*100:.2f}% confidence."
     }
+
+
+def iter_batch_predictions(file_objs):
+    """
+    Predict several uploads together through infer_rows.
+
+    Cache lookups and admission to the preprocessing pool happen eagerly,
+    so ml_pipeline.PipelineBusy is raised by this call rather than midway
+    through iteration. The returned iterator yields (index, result, error)
+    tuples as soon as they are known: cache hits first, then decode
+    failures as they happen, then every decoded image from one batched
+    model call.
+    """
+    from .ml_pipeline import get_pipeline
+
+    cached_results = []
+    pending = {}
+    for i, file_obj in enumerate(file_objs):
+        cache_key = None
+        if prediction_cache.is_enabled():
+            cache_key, cached = prediction_cache.lookup(file_obj)
+            if cached is not None:
+                cached_results.append((i, cached, None))
+                continue
+        pending[i] = cache_key
+
+    pipeline = get_pipeline()
+    futures = {pipeline.preprocess(file_objs[i]): i for i in pending}
+
+    return _iter_batch_results(cached_results, futures, pending)
+
+
+def _iter_batch_results(cached_results, futures, pending):
+    yield from cached_results
+
+    decoded = {}
+    for future in as_completed(futures):
+        i = futures[future]
+        try:
+            decoded[i] = future.result()
+        except Exception as exc:
+            yield i, None, exc
+
+    if not decoded:
+        return
+
+    order = sorted(decoded)
+    xs = np.concatenate([decoded[i] for i in order])
+    with metrics.timer("pipeline.infer_ms"):
+        preds = infer_rows(xs)
+    preds = apply_tta(xs, preds)
+
+    for i, row in zip(order, preds):
+        with metrics.timer("pipeline.postprocess_ms"):
+            result = format_prediction(row)
+        if pending[i] is not None:
+            prediction_cache.store(pending[i], result)
+        yield i, result, None
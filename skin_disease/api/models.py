@@ -31,3 +31,96 @@ class DoctorFeedback(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["hospital_name", "disease"])]
+
+
+# Per-(hospital, disease) feedback aggregates, kept in sync by api.signals
+class DoctorFeedbackStats(models.Model):
+    hospital_name = models.CharField(max_length=255)
+    disease = models.CharField(max_length=255)
+    count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    success_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hospital_name", "disease"], name="unique_feedback_stats"),
+        ]
+
+    def __str__(self):
+        return f"{self.hospital_name} / {self.disease} ({self.count})"
+
+
+# Geocode cache: normalised city string -> coordinates
+class GeocodeCache(models.Model):
+    query = models.CharField(max_length=255, unique=True)
+    lat = models.FloatField()
+    lon = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.query} ({self.lat}, {self.lon})"
+
+
+# Local hospital directory (imported dumps + accumulated Places results)
+class Hospital(models.Model):
+    place_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    address = models.CharField(max_length=500, blank=True)
+    lat = models.FloatField()
+    lon = models.FloatField()
+    rating = models.FloatField(default=0)
+    # "|"-separated Places keywords this hospital was returned for; empty
+    # means it matches every keyword (e.g. rows from a curated import).
+    keywords = models.TextField(blank=True)
+    source = models.CharField(max_length=20, default="places")  # places | import
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["lat", "lon"])]
+
+    def __str__(self):
+        return self.name
+
+
+# Places nearby searches already run per (geohash cell, keyword); the
+# directory only answers for cells with a fresh row here.
+class HospitalCoverage(models.Model):
+    cell = models.CharField(max_length=12)
+    keyword = models.CharField(max_length=100)
+    radius_m = models.PositiveIntegerField()
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cell", "keyword"], name="hospital_coverage_cell_keyword"),
+        ]
+
+    def __str__(self):
+        return f"{self.cell} / {self.keyword}"
+
+
+# DB-backed queue of PDF report renders, drained by `manage.py run_pdf_worker`
+class PdfRenderJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(s, s) for s in (PENDING, RUNNING, DONE, FAILED)]
+
+    scan = models.ForeignKey(Scan, on_delete=models.CASCADE, related_name="pdf_jobs")
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    render_ms = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Scan {self.scan_id} PDF ({self.status})"
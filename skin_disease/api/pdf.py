@@ -5,15 +5,152 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.graphics.barcode import qr
 from reportlab.graphics.shapes import Drawing
 from reportlab.lib.units import inch
-from django.http import HttpResponse
+import threading
 from io import BytesIO
-import os
+from types import SimpleNamespace
+from .renditions import RenditionError, get_pdf_rendition
 
-def generate_scan_pdf(scan):
+# Bump whenever the report layout changes so cached PDFs (api.pdf_cache)
+# are re-rendered.
+PDF_TEMPLATE_VERSION = 2
+
+_RENDITION = object()
+
+
+class DegradedReport(Exception):
+    """
+    Raised by build_scan_pdf(strict=True) when the scan has an image that
+    could not be embedded. `pdf` is the report rendered with a placeholder
+    instead, for callers that still want to serve it.
+    """
+
+    def __init__(self, reason, pdf):
+        super().__init__(reason)
+        self.pdf = pdf
+
+
+class ReportTemplate:
     """
-    Generates a professional, interactive PDF using ReportLab Platypus.
+    Everything in the scan report that does not depend on the scan:
+    stylesheet, paragraph and table styles, and the static flowables
+    (header, labels, section titles, signature block). Built once per
+    process by get_report_template(); build_scan_pdf only adds the
+    scan-specific paragraphs, image and QR code.
+
+    Styles are shared read-only. Flowables keep layout state while a
+    document is built, so each thread gets its own copy (`flowables()`).
     """
-    # 1. Setup the response and buffer
+
+    def __init__(self):
+        # 2. Prepare Styles
+        self.styles = getSampleStyleSheet()
+
+        # Custom Header Style
+        self.title_style = ParagraphStyle(
+            'TitleStyle',
+            parent=self.styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor("#2C3E50"),
+            spaceAfter=20
+        )
+
+        # Custom Body Style
+        self.body_style = ParagraphStyle(
+            'BodyStyle',
+            parent=self.styles['Normal'],
+            fontSize=11,
+            leading=16
+        )
+
+        # A. Clickable Hyperlinks
+        self.link_style = ParagraphStyle(
+            'LinkStyle',
+            parent=self.body_style,
+            textColor=colors.blue,
+            underline=True
+        )
+
+        self.text_table_style = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('TEXTCOLOR', (0,0), (0,-1), colors.grey),
+        ])
+        self.main_table_style = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('ALIGN', (1,0), (1,0), 'CENTER'), # Center image
+            ('LINEBELOW', (0,0), (-1,-1), 1, colors.lightgrey), # Divider line
+            ('BOTTOMPADDING', (0,0), (-1,-1), 20),
+        ])
+        self.footer_table_style = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('ALIGN', (1,0), (1,0), 'RIGHT'),
+        ])
+
+        self._local = threading.local()
+
+    def _build_flowables(self):
+        body = self.body_style
+
+        # Signature Block (shown next to the QR code)
+        signature_text = """
+        <b>Dr. John Smith, MD</b><br/>
+        Board Certified Dermatologist<br/>
+        <i>Dermacare AI Analysis</i>
+        """
+
+        return SimpleNamespace(
+            title=Paragraph("DERMACARE AI", self.title_style),
+            subtitle=Paragraph("<b>Skin Diagnosis Report</b>", self.styles['Heading2']),
+            diagnosis_label=Paragraph("<b>Diagnosis:</b>", body),
+            confidence_label=Paragraph("<b>Confidence:</b>", body),
+            severity_label=Paragraph("<b>Severity:</b>", body),
+            status_label=Paragraph("<b>Status:</b>", body),
+            status_safe=Paragraph("<b>SAFE</b>", body),
+            status_attention=Paragraph("<b>ATTENTION REQUIRED</b>", body),
+            no_image=Paragraph("[No Image Available]", body),
+            image_error=Paragraph("[Image Error]", body),
+            advice_title=Paragraph("Medical Advice & Analysis", self.styles['Heading3']),
+            signature=Paragraph(signature_text, body),
+        )
+
+    def flowables(self):
+        """This thread's copy of the static flowables."""
+        flowables = getattr(self._local, "flowables", None)
+        if flowables is None:
+            flowables = self._local.flowables = self._build_flowables()
+        return flowables
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def get_report_template():
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = ReportTemplate()
+    return _template
+
+
+def build_scan_pdf(scan, image=_RENDITION, template=None, strict=False):
+    """
+    Generates a professional, interactive PDF using ReportLab Platypus and
+    returns it as bytes. The scan is embedded from its downscaled PDF
+    rendition (api.renditions); pass `image` (bytes, or None for no image)
+    to embed something else. `template` defaults to the shared
+    per-process ReportTemplate.
+
+    When the scan's image file is missing or cannot be decoded, the report
+    shows a placeholder; with `strict` that raises DegradedReport instead
+    of returning, so the result is not mistaken for the real report.
+    Storage errors propagate.
+    """
+    template = template or get_report_template()
+    static = template.flowables()
+    body_style = template.body_style
+
+    # 1. Setup the buffer
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -23,87 +160,70 @@ def generate_scan_pdf(scan):
         title=f"Scan Report {scan.id}"
     )
 
-    # 2. Prepare Styles
-    styles = getSampleStyleSheet()
-    
-    # Custom Header Style
-    title_style = ParagraphStyle(
-        'TitleStyle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor("#2C3E50"),
-        spaceAfter=20
-    )
-    
-    # Custom Body Style
-    body_style = ParagraphStyle(
-        'BodyStyle',
-        parent=styles['Normal'],
-        fontSize=11,
-        leading=16
-    )
-
     # Elements list to hold the flowables
     elements = []
 
     # --- SECTION 1: HEADER & WATERMARK EFFECT ---
     # Note: Platypus handles flow, but we can add a logo/title
-    elements.append(Paragraph("DERMACARE AI", title_style))
-    elements.append(Paragraph("<b>Skin Diagnosis Report</b>", styles['Heading2']))
+    elements.append(static.title)
+    elements.append(static.subtitle)
     elements.append(Spacer(1, 10))
-    elements.append(Paragraph(f"Report ID: #{scan.id} | Date: 2024-05-20", styles['Normal'])) # Replace date with scan.created_at
+    elements.append(Paragraph(f"Report ID: #{scan.id} | Date: 2024-05-20", template.styles['Normal'])) # Replace date with scan.created_at
     elements.append(Spacer(1, 20))
 
     # --- SECTION 2: DIAGNOSIS & IMAGE GRID ---
-    
+
     # Determine Color for Severity
     severity_color = colors.green if scan.is_safe else colors.red
-    
+
     # Left Column: Text Data
     diagnosis_data = [
-        [Paragraph("<b>Diagnosis:</b>", body_style), Paragraph(str(scan.diagnosis), body_style)],
-        [Paragraph("<b>Confidence:</b>", body_style), f"{scan.confidence}%"],
-        [Paragraph("<b>Severity:</b>", body_style), Paragraph(f'<font color="{severity_color}">{scan.severity}</font>', body_style)],
-        [Paragraph("<b>Status:</b>", body_style), Paragraph(f"<b>{'SAFE' if scan.is_safe else 'ATTENTION REQUIRED'}</b>", body_style)],
+        [static.diagnosis_label, Paragraph(str(scan.diagnosis), body_style)],
+        [static.confidence_label, f"{scan.confidence}%"],
+        [static.severity_label, Paragraph(f'<font color="{severity_color}">{scan.severity}</font>', body_style)],
+        [static.status_label, static.status_safe if scan.is_safe else static.status_attention],
     ]
 
     # Right Column: Image Processing
     scan_img = None
-    if scan.image and hasattr(scan.image, 'path') and os.path.exists(scan.image.path):
-        try:
+    degraded = None
+    try:
+        if image is _RENDITION:
+            image = get_pdf_rendition(scan)
+            if image is None and scan.image:
+                degraded = f"image file {scan.image.name} is missing"
+
+        if image is None:
+            scan_img = static.no_image
+        else:
             # Constrain image to 2 inches width, maintain aspect ratio
-            scan_img = Image(scan.image.path, width=2*inch, height=2*inch)
+            scan_img = Image(BytesIO(image), width=2*inch, height=2*inch)
             scan_img.hAlign = 'CENTER'
-        except Exception:
-            scan_img = Paragraph("[Image Error]", body_style)
-    else:
-        scan_img = Paragraph("[No Image Available]", body_style)
+    except FileNotFoundError:
+        # Removed between the existence check and the read.
+        scan_img = static.no_image
+        degraded = f"image file {scan.image.name} is missing"
+    except RenditionError as exc:
+        scan_img = static.image_error
+        degraded = f"image could not be decoded: {exc}"
 
     # Combine into a Master Table (2 Columns)
     # Col 1: Diagnosis Table, Col 2: The Image
-    
+
     # Create an inner table for the text stats to format them nicely
     text_table = Table(diagnosis_data, colWidths=[80, 150])
-    text_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('TEXTCOLOR', (0,0), (0,-1), colors.grey),
-    ]))
+    text_table.setStyle(template.text_table_style)
 
     main_table_data = [[text_table, scan_img]]
     main_table = Table(main_table_data, colWidths=[250, 200])
-    main_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('ALIGN', (1,0), (1,0), 'CENTER'), # Center image
-        ('LINEBELOW', (0,0), (-1,-1), 1, colors.lightgrey), # Divider line
-        ('BOTTOMPADDING', (0,0), (-1,-1), 20),
-    ]))
-    
+    main_table.setStyle(template.main_table_style)
+
     elements.append(main_table)
     elements.append(Spacer(1, 20))
 
     # --- SECTION 3: MEDICAL ADVICE (Text Wrapping) ---
-    elements.append(Paragraph("Medical Advice & Analysis", styles['Heading3']))
-    
+    elements.append(static.advice_title)
+
     # Paragraph handles newline splitting and wrapping automatically
     # We replace pure newlines with <br/> for HTML-like rendering in ReportLab
     formatted_advice = scan.advice.replace('\n', '<br/>')
@@ -111,15 +231,7 @@ def generate_scan_pdf(scan):
     elements.append(Spacer(1, 30))
 
     # --- SECTION 4: INTERACTIVE ELEMENTS (Links & QR) ---
-    
-    # A. Clickable Hyperlinks
-    link_style = ParagraphStyle(
-        'LinkStyle',
-        parent=body_style,
-        textColor=colors.blue,
-        underline=True
-    )
-    
+
     # Hypothetical URLs based on ID
     booking_url = f"https://dermacare-ai.com/book/{scan.id}"
     details_url = f"https://dermacare-ai.com/report/{scan.id}"
@@ -137,36 +249,24 @@ def generate_scan_pdf(scan):
     qr_code = qr.QrCodeWidget(details_url)
     qr_code.barWidth = 35
     qr_code.barHeight = 35
-    
+
     # Drawing wrapper for the QR code
     d = Drawing(100, 100)
     d.add(qr_code)
-    
+
     # Signature Block + QR Code Side-by-Side
-    signature_text = """
-    <b>Dr. John Smith, MD</b><br/>
-    Board Certified Dermatologist<br/>
-    <i>Dermacare AI Analysis</i>
-    """
-    
-    footer_data = [[Paragraph(signature_text, body_style), d]]
+    footer_data = [[static.signature, d]]
     footer_table = Table(footer_data, colWidths=[350, 100])
-    footer_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('ALIGN', (1,0), (1,0), 'RIGHT'),
-    ]))
-    
+    footer_table.setStyle(template.footer_table_style)
+
     elements.append(footer_table)
 
     # 3. Build the PDF
     doc.build(elements)
 
-    # 4. Return HTTP Response
     pdf_data = buffer.getvalue()
     buffer.close()
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="scan_report_{scan.id}.pdf"'
-    response.write(pdf_data)
-    
-    return response
\ No newline at end of file
+
+    if strict and degraded:
+        raise DegradedReport(degraded, pdf_data)
+    return pdf_data
@@ -0,0 +1,105 @@
+# api/pdf_cache.py
+import hashlib
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from . import metrics
+from .pdf import PDF_TEMPLATE_VERSION, DegradedReport, build_scan_pdf
+
+logger = logging.getLogger(__name__)
+
+# Rendered scan reports live in default_storage under PDF_REPORTS_DIR as
+# <scan id>/<fingerprint>.pdf. The fingerprint covers every scan field the
+# report shows, PDF_TEMPLATE_VERSION and the image rendition settings, so
+# editing a scan or changing the template simply produces a new name; older
+# renditions of the same scan are removed when the new one is written. One
+# directory per scan keeps that cleanup to a listing of the scan's own files.
+# A report whose image could not be embedded is stored as
+# <fingerprint>.degraded.pdf so it can be served, but never counts as cached.
+
+hits = metrics.counter("pdf_cache.hits")
+misses = metrics.counter("pdf_cache.misses")
+degraded = metrics.counter("pdf_cache.degraded")
+
+
+def scan_fingerprint(scan):
+    parts = [
+        PDF_TEMPLATE_VERSION,
+        settings.PDF_IMAGE_DPI,
+        settings.PDF_IMAGE_QUALITY,
+        scan.id,
+        scan.diagnosis,
+        scan.confidence,
+        scan.severity,
+        scan.advice,
+        scan.is_safe,
+        scan.image.name if scan.image else "",
+    ]
+    return hashlib.sha256("\x1f".join(map(str, parts)).encode()).hexdigest()[:20]
+
+
+def _scan_dir(scan):
+    return posixpath.join(settings.PDF_REPORTS_DIR, str(scan.id))
+
+
+def report_path(scan, fingerprint=None):
+    fingerprint = fingerprint or scan_fingerprint(scan)
+    return posixpath.join(_scan_dir(scan), f"{fingerprint}.pdf")
+
+
+def cached_report(scan):
+    """Storage path of the current rendered report, or None if not rendered yet."""
+    path = report_path(scan)
+    return path if default_storage.exists(path) else None
+
+
+def render_report(scan):
+    """
+    Render the scan's report into storage (if needed) and return its path.
+    A render without the scan image is written to a degraded path and
+    rendered again next time.
+    """
+    path = report_path(scan)
+    if default_storage.exists(path):
+        hits.inc()
+        return path
+
+    misses.inc()
+    try:
+        with metrics.timer("pdf.render_ms"):
+            pdf_data = build_scan_pdf(scan, strict=True)
+    except DegradedReport as exc:
+        degraded.inc()
+        logger.warning("Report for scan %s rendered without its image (%s); not caching it", scan.id, exc)
+        path = path.removesuffix(".pdf") + ".degraded.pdf"
+        default_storage.delete(path)
+        return default_storage.save(path, ContentFile(exc.pdf))
+
+    saved = default_storage.save(path, ContentFile(pdf_data))
+    if saved != path:
+        # Another worker rendered the same report meanwhile; keep theirs.
+        default_storage.delete(saved)
+
+    delete_reports(scan, keep=path)
+    return path
+
+
+def delete_reports(scan, keep=None):
+    """Remove rendered reports for a scan (all, or all but `keep`)."""
+    try:
+        _, files = default_storage.listdir(_scan_dir(scan))
+    except FileNotFoundError:
+        return
+
+    for name in files:
+        path = posixpath.join(_scan_dir(scan), name)
+        if path == keep:
+            continue
+        try:
+            default_storage.delete(path)
+        except Exception:
+            logger.warning("Could not delete stale report %s", path, exc_info=True)
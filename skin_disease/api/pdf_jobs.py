@@ -0,0 +1,134 @@
+# api/pdf_jobs.py
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from . import pdf_cache
+from .models import PdfRenderJob
+
+logger = logging.getLogger(__name__)
+
+# PDF reports are rendered off the request path: enqueue() inserts a
+# PdfRenderJob row, `manage.py run_pdf_worker` claims and renders them.
+# Claiming is a conditional UPDATE (status pending -> running), so any
+# number of workers can share the table without a broker or row locks.
+
+
+def enqueue(scan):
+    """
+    Queue a render of the scan's current report unless one is already
+    rendered or queued. Returns the job (existing or new), or None when
+    the report is already in storage. A job that has failed for good is
+    put back in the queue with a fresh set of attempts; its `error` is
+    kept until a render succeeds, so the caller can tell the client.
+    """
+    if pdf_cache.cached_report(scan):
+        return None
+
+    fingerprint = pdf_cache.scan_fingerprint(scan)
+    job = (
+        PdfRenderJob.objects.filter(scan=scan, fingerprint=fingerprint)
+        .order_by("-created_at", "-pk")
+        .first()
+    )
+    if job is None or job.status == PdfRenderJob.DONE:
+        # DONE without a stored report means the file was removed since.
+        job = PdfRenderJob.objects.create(scan=scan, fingerprint=fingerprint)
+    elif job.status == PdfRenderJob.FAILED:
+        PdfRenderJob.objects.filter(pk=job.pk, status=PdfRenderJob.FAILED).update(
+            status=PdfRenderJob.PENDING, attempts=0, started_at=None, finished_at=None,
+        )
+        job.refresh_from_db()
+    return job
+
+
+def requeue_stale():
+    """Put jobs back in the queue whose worker died mid-render."""
+    cutoff = timezone.now() - timedelta(seconds=settings.PDF_RENDER_JOB_TIMEOUT)
+    return PdfRenderJob.objects.filter(
+        status=PdfRenderJob.RUNNING,
+        started_at__lt=cutoff,
+    ).update(status=PdfRenderJob.PENDING, started_at=None)
+
+
+def prune_finished():
+    """Delete done and failed jobs older than PDF_RENDER_JOB_RETENTION."""
+    cutoff = timezone.now() - timedelta(seconds=settings.PDF_RENDER_JOB_RETENTION)
+    deleted, _ = PdfRenderJob.objects.filter(
+        status__in=[PdfRenderJob.DONE, PdfRenderJob.FAILED],
+        finished_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def claim():
+    """Atomically take the oldest pending job, or return None."""
+    candidates = (
+        PdfRenderJob.objects.filter(status=PdfRenderJob.PENDING)
+        .order_by("created_at")
+        .values_list("pk", flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = PdfRenderJob.objects.filter(pk=pk, status=PdfRenderJob.PENDING).update(
+            status=PdfRenderJob.RUNNING,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return PdfRenderJob.objects.select_related("scan").get(pk=pk)
+    return None
+
+
+def run(job):
+    """Render a claimed job and record the outcome on its row."""
+    started = time.perf_counter()
+    try:
+        pdf_cache.render_report(job.scan)
+    except Exception as exc:
+        logger.exception("PDF render failed for scan %s", job.scan_id)
+        job.attempts += 1
+        job.error = str(exc)
+        if job.attempts >= settings.PDF_RENDER_MAX_ATTEMPTS:
+            job.status = PdfRenderJob.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.status = PdfRenderJob.PENDING
+            job.started_at = None
+        job.save(update_fields=["attempts", "error", "status", "started_at", "finished_at"])
+        return False
+
+    job.attempts += 1
+    job.status = PdfRenderJob.DONE
+    job.render_ms = (time.perf_counter() - started) * 1000
+    job.finished_at = timezone.now()
+    job.error = ""
+    job.save(update_fields=["attempts", "status", "render_ms", "finished_at", "error"])
+    return True
+
+
+def queue_stats():
+    """
+    Queue depth and render times straight from the job table, so they are
+    correct however many worker processes there are.
+    """
+    since = timezone.now() - timedelta(hours=1)
+    stats = PdfRenderJob.objects.aggregate(
+        pending=Count("pk", filter=Q(status=PdfRenderJob.PENDING)),
+        running=Count("pk", filter=Q(status=PdfRenderJob.RUNNING)),
+        failed=Count("pk", filter=Q(status=PdfRenderJob.FAILED)),
+        done_last_hour=Count("pk", filter=Q(status=PdfRenderJob.DONE, finished_at__gte=since)),
+        render_ms_avg=Avg("render_ms", filter=Q(finished_at__gte=since)),
+        render_ms_max=Max("render_ms", filter=Q(finished_at__gte=since)),
+    )
+
+    oldest = (
+        PdfRenderJob.objects.filter(status=PdfRenderJob.PENDING)
+        .order_by("created_at")
+        .values_list("created_at", flat=True)
+        .first()
+    )
+    stats["oldest_pending_s"] = (timezone.now() - oldest).total_seconds() if oldest else 0
+    return {f"pdf_queue.{k}": v for k, v in stats.items()}
@@ -0,0 +1,132 @@
+# api/places_cache.py
+import math
+import threading
+
+from django.conf import settings
+
+from . import metrics
+from .cache_utils import LRUCache
+from .geo import haversine_km
+from .maps_client import get_maps_client
+
+# Nearby-search results are cached per (geohash cell, keyword). The API is
+# queried from the cell centre with the radius widened by the cell's
+# half-diagonal, so the cached results cover the search radius for any user
+# inside the cell; each lookup then keeps only the results within the radius
+# of the user's exact position.
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+hits = metrics.counter("places_cache.hits")
+misses = metrics.counter("places_cache.misses")
+hit_rate = metrics.gauge("places_cache.hit_rate")
+
+
+def geohash_bounds(lat, lon, precision):
+    """Return (geohash, (lat_min, lat_max), (lon_min, lon_max)) for a point."""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if coord >= mid:
+            value = (value << 1) | 1
+            rng[0] = mid
+        else:
+            value <<= 1
+            rng[1] = mid
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+
+    return "".join(chars), tuple(lat_range), tuple(lon_range)
+
+
+def geohash(lat, lon, precision):
+    return geohash_bounds(lat, lon, precision)[0]
+
+
+def _half_diagonal_m(lat_range, lon_range):
+    mid_lat = math.radians((lat_range[0] + lat_range[1]) / 2)
+    height = (lat_range[1] - lat_range[0]) * 111_320
+    width = (lon_range[1] - lon_range[0]) * 111_320 * math.cos(mid_lat)
+    return math.hypot(height, width) / 2
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LRUCache(
+                    maxsize=settings.PLACES_CACHE_SIZE,
+                    ttl=settings.PLACES_CACHE_TTL,
+                )
+    return _cache
+
+
+def _update_hit_rate():
+    total = hits.value + misses.value
+    hit_rate.set(round(hits.value / total, 4) if total else 0)
+
+
+def _within(results, lat, lon, radius):
+    """The results no farther than `radius` metres from (lat, lon)."""
+    if not results:
+        return results
+
+    distances = haversine_km(
+        lat, lon,
+        [p["geometry"]["location"]["lat"] for p in results],
+        [p["geometry"]["location"]["lng"] for p in results],
+    )
+    return [p for p, d in zip(results, distances) if d * 1000 <= radius]
+
+
+def nearby_hospitals(lat, lon, keyword, radius=5000, on_fetch=None):
+    """
+    Raw Places nearby-search results for hospitals within `radius` metres
+    of (lat, lon), served from the cell cache when possible. Every hit is
+    one API call saved (`places_cache.hits`). `on_fetch(results, keyword,
+    cell, radius)` is called only for results that actually came from the
+    API, with everything the cell search returned.
+    """
+    cell, lat_range, lon_range = geohash_bounds(lat, lon, settings.PLACES_CACHE_GEOHASH_PRECISION)
+    key = (cell, keyword, radius)
+    cache = _get_cache()
+
+    results = cache.get(key)
+    if results is not None:
+        hits.inc()
+        _update_hit_rate()
+        return _within(results, lat, lon, radius)
+
+    misses.inc()
+    _update_hit_rate()
+
+    places_res = get_maps_client().nearby_search(
+        lat=(lat_range[0] + lat_range[1]) / 2,
+        lon=(lon_range[0] + lon_range[1]) / 2,
+        radius=int(radius + _half_diagonal_m(lat_range, lon_range)),
+        keyword=keyword,
+    )
+    results = places_res.get("results", [])
+
+    # Only cache answers Google considered valid; errors should be retried.
+    if places_res.get("status") in (None, "OK", "ZERO_RESULTS"):
+        cache.set(key, results)
+        if on_fetch is not None:
+            on_fetch(results, keyword, cell, radius)
+
+    return _within(results, lat, lon, radius)
@@ -0,0 +1,111 @@
+# api/prediction_cache.py
+import hashlib
+import threading
+
+from django.conf import settings
+
+from . import metrics
+from .cache_utils import LRUCache
+
+# Two tiers: a per-process LRU, then (optionally) a shared Django cache so
+# other workers benefit from each other's predictions. Keys contain the
+# version of the loaded model, so serving a new model orphans every old
+# entry.
+
+_local = None
+_local_lock = threading.Lock()
+_local_version = None
+
+hits = metrics.counter("prediction_cache.hits")
+shared_hits = metrics.counter("prediction_cache.shared_hits")
+misses = metrics.counter("prediction_cache.misses")
+
+
+def is_enabled():
+    return settings.ML_PREDICTION_CACHE_ENABLED
+
+
+def model_version():
+    """
+    Fingerprint of the model this process is serving (recorded by
+    ml_state.load() from the artifact it loaded) plus the TTA settings,
+    which also change results. Replacing the model file on disk does not
+    change it until the process loads the new model, so predictions are
+    never stored under a version they did not come from.
+    """
+    from . import ml_state
+
+    ml_state.load()
+    tta = f"tta{settings.ML_TTA_CONFIDENCE_CUTOFF}" if settings.ML_TTA_ENABLED else "notta"
+    return f"{ml_state.model_fingerprint}:{tta}"
+
+
+def hash_upload(file_obj):
+    """sha256 of the upload, read in chunks without copying it into memory."""
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+
+    if hasattr(file_obj, "chunks"):
+        for chunk in file_obj.chunks():
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: file_obj.read(64 * 1024), b""):
+            digest.update(chunk)
+
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def _get_local(version):
+    global _local, _local_version
+
+    with _local_lock:
+        if _local is None or _local_version != version:
+            _local = LRUCache(
+                maxsize=settings.ML_PREDICTION_CACHE_SIZE,
+                ttl=settings.ML_PREDICTION_CACHE_TTL,
+            )
+            _local_version = version
+        return _local
+
+
+def _get_shared():
+    alias = settings.ML_PREDICTION_CACHE_ALIAS
+    if not alias:
+        return None
+
+    from django.core.cache import caches
+    return caches[alias]
+
+
+def lookup(file_obj):
+    """Return (key, cached result or None) for an upload."""
+    version = model_version()
+    key = f"prediction:{version}:{hash_upload(file_obj)}"
+    local = _get_local(version)
+
+    result = local.get(key)
+    if result is not None:
+        hits.inc()
+        return key, dict(result)
+
+    shared = _get_shared()
+    if shared is not None:
+        result = shared.get(key)
+        if result is not None:
+            shared_hits.inc()
+            local.set(key, result)
+            return key, dict(result)
+
+    misses.inc()
+    return key, None
+
+
+def store(key, result):
+    # If the model changed between lookup() and store(), the key still
+    # carries the old version and can never be hit again, so this is safe.
+    _get_local(_local_version).set(key, dict(result))
+
+    shared = _get_shared()
+    if shared is not None:
+        shared.set(key, dict(result), timeout=settings.ML_PREDICTION_CACHE_TTL)
@@ -0,0 +1,109 @@
+# api/renditions.py
+import hashlib
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Derived images for PDF reports. The report draws the scan at
+# PDF_IMAGE_BOX_INCHES square, so anything above PDF_IMAGE_DPI at that size
+# is wasted bytes and decode time. Each scan's rendition is produced once
+# and stored in default_storage under PDF_RENDITIONS_DIR/<scan id>/; the
+# name encodes the source image and the rendition settings, so changing
+# either yields a fresh file.
+
+PDF_IMAGE_BOX_INCHES = 2
+
+hits = metrics.counter("renditions.hits")
+misses = metrics.counter("renditions.misses")
+
+
+class RenditionError(Exception):
+    """The source image could not be decoded into a rendition."""
+
+
+def _target_px():
+    return int(PDF_IMAGE_BOX_INCHES * settings.PDF_IMAGE_DPI)
+
+
+def make_pdf_rendition(file_obj):
+    """
+    JPEG bytes of an image scaled to fit the PDF image box at PDF_IMAGE_DPI.
+    Raises RenditionError when the image cannot be decoded.
+    """
+    target = (_target_px(), _target_px())
+
+    file_obj.seek(0)
+    try:
+        img = Image.open(file_obj)
+        if img.format == "JPEG":
+            # Let libjpeg do most of the downscaling while decoding.
+            img.draft("RGB", target)
+        img = img.convert("RGB")
+        img.thumbnail(target, reducing_gap=3.0)
+    except (OSError, Image.DecompressionBombError) as exc:
+        # PIL reports unknown formats (UnidentifiedImageError) and truncated
+        # or corrupt data as OSError.
+        raise RenditionError(str(exc)) from exc
+
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=settings.PDF_IMAGE_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _scan_dir(scan):
+    return posixpath.join(settings.PDF_RENDITIONS_DIR, str(scan.id))
+
+
+def rendition_path(scan):
+    source = hashlib.sha1(scan.image.name.encode()).hexdigest()[:12]
+    variant = f"{settings.PDF_IMAGE_DPI}dpi_q{settings.PDF_IMAGE_QUALITY}"
+    return posixpath.join(_scan_dir(scan), f"{source}_{variant}.jpg")
+
+
+def get_pdf_rendition(scan):
+    """
+    The scan's PDF rendition as JPEG bytes, created on first use. Returns
+    None when the scan has no image file and raises RenditionError when it
+    cannot be decoded; storage errors propagate.
+    """
+    if not scan.image or not scan.image.storage.exists(scan.image.name):
+        return None
+
+    path = rendition_path(scan)
+    if default_storage.exists(path):
+        hits.inc()
+        with default_storage.open(path, "rb") as f:
+            return f.read()
+
+    misses.inc()
+    with metrics.timer("renditions.build_ms"):
+        with scan.image.storage.open(scan.image.name, "rb") as f:
+            data = make_pdf_rendition(f)
+
+    saved = default_storage.save(path, ContentFile(data))
+    if saved != path:
+        # Another worker produced it meanwhile; keep theirs.
+        default_storage.delete(saved)
+    return data
+
+
+def delete_renditions(scan):
+    try:
+        _, files = default_storage.listdir(_scan_dir(scan))
+    except FileNotFoundError:
+        return
+
+    for name in files:
+        try:
+            default_storage.delete(posixpath.join(_scan_dir(scan), name))
+        except Exception:
+            logger.warning("Could not delete rendition %s", name, exc_info=True)
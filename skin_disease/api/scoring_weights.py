@@ -3,15 +3,18 @@ SEVERITY_WEIGHTS = {
         "rating": 2.0,
         "ml": 2.0,
         "distance": 0.1,
+        "feedback": 1.0,
     },
     "Moderate": {
         "rating": 2.5,
         "ml": 3.0,
         "distance": 0.2,
+        "feedback": 1.5,
     },
     "High": {
         "rating": 3.0,
         "ml": 4.0,
         "distance": 0.4,
+        "feedback": 2.0,
     },
 }
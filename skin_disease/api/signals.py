@@ -0,0 +1,61 @@
+# api/signals.py
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .feedback_utils import rebuild_feedback_stats
+from .models import DoctorFeedback, DoctorFeedbackStats, Scan
+from .pdf_cache import delete_reports
+from .renditions import delete_renditions
+
+# DoctorFeedbackStats is updated in place with F() expressions so concurrent
+# inserts never lose a count. Bulk operations (queryset.update, bulk_create)
+# bypass signals; run feedback_utils.rebuild_feedback_stats() after them.
+
+
+def _apply(hospital_name, disease, sign, rating, successful):
+    with transaction.atomic():
+        DoctorFeedbackStats.objects.get_or_create(hospital_name=hospital_name, disease=disease)
+        DoctorFeedbackStats.objects.filter(hospital_name=hospital_name, disease=disease).update(
+            count=F("count") + sign,
+            rating_sum=F("rating_sum") + sign * rating,
+            success_count=F("success_count") + (sign if successful else 0),
+        )
+
+
+@receiver(pre_save, sender=DoctorFeedback)
+def remember_previous_group(sender, instance, raw=False, **kwargs):
+    # Edits are rare; remember where the row was so post_save can rebuild
+    # the old group too if hospital or disease changed.
+    instance._stats_previous = None
+    if instance.pk and not raw:
+        instance._stats_previous = (
+            DoctorFeedback.objects.filter(pk=instance.pk)
+            .values_list("hospital_name", "disease")
+            .first()
+        )
+
+
+@receiver(post_save, sender=DoctorFeedback)
+def feedback_saved(sender, instance, created, raw=False, **kwargs):
+    if created:
+        _apply(instance.hospital_name, instance.disease, 1, instance.rating, instance.successful)
+        return
+
+    groups = {(instance.hospital_name, instance.disease)}
+    if getattr(instance, "_stats_previous", None):
+        groups.add(instance._stats_previous)
+    for hospital_name, disease in groups:
+        rebuild_feedback_stats(hospital_name=hospital_name, disease=disease)
+
+
+@receiver(post_delete, sender=DoctorFeedback)
+def feedback_deleted(sender, instance, **kwargs):
+    _apply(instance.hospital_name, instance.disease, -1, instance.rating, instance.successful)
+
+
+@receiver(post_delete, sender=Scan)
+def scan_deleted(sender, instance, **kwargs):
+    delete_reports(instance)
+    delete_renditions(instance)
@@ -0,0 +1,226 @@
+# api/suitability_model.py
+"""
+Logistic-regression hospital suitability model over the
+`ml_features.extract_features` feature dict. Trained from DoctorFeedback by
+`manage.py train_suitability_model` and stored as a small JSON artifact at
+HOSPITAL_SUITABILITY_MODEL_PATH; predict_suitability_batch uses it when
+present.
+"""
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# distance and feedback_score are deliberately not model features.
+# DoctorFeedback records no distance, so training could only impute a
+# constant; distance enters final_score through SEVERITY_WEIGHTS instead.
+# Feedback is added by hospital_ranking.score (behind
+# HOSPITAL_FEEDBACK_RANKING_ENABLED), and learning it here too would count
+# it twice.
+CATEGORICAL = ("disease", "severity", "hospital_type")
+NUMERIC = ("rating",)
+
+# Neither DoctorFeedback nor the hospital directory records this yet, so
+# training and scoring both use the same constant.
+DEFAULT_HOSPITAL_TYPE = "hospital"
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+
+class SuitabilityModel:
+    """
+    One-hot categorical + standardised numeric features, then a linear
+    layer and a sigmoid. `predict_proba` mirrors scikit-learn's and
+    returns an (n, 2) array.
+    """
+
+    def __init__(self, categories, means, stds, weights, bias, info=None):
+        self.categories = {k: list(v) for k, v in categories.items()}
+        self.means = np.asarray(means, dtype=np.float64)
+        self.stds = np.asarray(stds, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.info = info or {}
+
+    # --- features -------------------------------------------------------
+
+    @staticmethod
+    def vocabulary(rows):
+        return {name: sorted({str(r[name]) for r in rows}) for name in CATEGORICAL}
+
+    def encode_columns(self, n, categorical, numeric):
+        """
+        Feature matrix for n rows. `categorical` maps each CATEGORICAL name
+        to a scalar (shared by all rows) or a sequence of n values;
+        `numeric` maps each NUMERIC name to a scalar or array.
+        """
+        blocks = []
+        for name in CATEGORICAL:
+            vocab = self.categories[name]
+            values = categorical[name]
+            block = np.zeros((n, len(vocab)))
+            if isinstance(values, str) or np.ndim(values) == 0:
+                # Unseen categories encode as all zeros.
+                if str(values) in vocab:
+                    block[:, vocab.index(str(values))] = 1
+            else:
+                lookup = {v: i for i, v in enumerate(vocab)}
+                for row, value in enumerate(values):
+                    col = lookup.get(str(value))
+                    if col is not None:
+                        block[row, col] = 1
+            blocks.append(block)
+
+        nums = np.column_stack([
+            np.broadcast_to(np.asarray(numeric[name], dtype=np.float64), (n,))
+            for name in NUMERIC
+        ])
+        blocks.append((nums - self.means) / self.stds)
+        return np.hstack(blocks)
+
+    def encode(self, rows):
+        """Feature matrix for a list of extract_features() dicts."""
+        return self.encode_columns(
+            len(rows),
+            {name: [r[name] for r in rows] for name in CATEGORICAL},
+            {name: [float(r[name]) for r in rows] for name in NUMERIC},
+        )
+
+    # --- training / inference ------------------------------------------
+
+    @classmethod
+    def fit(cls, rows, labels, *, l2=1e-2, epochs=500, lr=0.5):
+        """Full-batch gradient descent on L2-regularised log loss."""
+        nums = np.array([[float(r[name]) for name in NUMERIC] for r in rows])
+        stds = nums.std(axis=0)
+        stds[stds == 0] = 1.0
+
+        model = cls(cls.vocabulary(rows), nums.mean(axis=0), stds, [], 0.0)
+        X = model.encode(rows)
+        y = np.asarray(labels, dtype=np.float64)
+
+        w = np.zeros(X.shape[1])
+        b = 0.0
+        for _ in range(epochs):
+            error = _sigmoid(X @ w + b) - y
+            w -= lr * (X.T @ error / len(y) + l2 * w)
+            b -= lr * error.mean()
+
+        model.weights, model.bias = w, b
+        return model
+
+    def predict_proba(self, X):
+        p = _sigmoid(X @ self.weights + self.bias)
+        return np.column_stack([1 - p, p])
+
+    # --- persistence ----------------------------------------------------
+
+    def to_dict(self):
+        return {
+            "features": {"categorical": list(CATEGORICAL), "numeric": list(NUMERIC)},
+            "categories": self.categories,
+            "means": self.means.tolist(),
+            "stds": self.stds.tolist(),
+            "weights": self.weights.tolist(),
+            "bias": self.bias,
+            "info": self.info,
+        }
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.info.setdefault("trained_at", datetime.now(timezone.utc).isoformat())
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), indent=2))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        data = json.loads(Path(path).read_text())
+        features = {"categorical": list(CATEGORICAL), "numeric": list(NUMERIC)}
+        if data.get("features") != features:
+            raise ValueError(f"{path} was trained on {data.get('features')}, expected {features}")
+        return cls(
+            data["categories"],
+            data["means"],
+            data["stds"],
+            data["weights"],
+            data["bias"],
+            data.get("info"),
+        )
+
+
+def evaluate(model, rows, labels):
+    """Accuracy, log loss and ROC AUC of `model` on held-out rows."""
+    y = np.asarray(labels, dtype=np.float64)
+    p = model.predict_proba(model.encode(rows))[:, 1]
+    return score_metrics(p, y)
+
+
+def score_metrics(p, y):
+    p = np.clip(np.asarray(p, dtype=np.float64), 1e-7, 1 - 1e-7)
+    y = np.asarray(y, dtype=np.float64)
+    return {
+        "accuracy": float(((p >= 0.5) == (y == 1)).mean()),
+        "log_loss": float(-(y * np.log(p) + (1 - y) * np.log(1 - p)).mean()),
+        "auc": roc_auc(p, y),
+    }
+
+
+def roc_auc(scores, labels):
+    """Mann-Whitney AUC with average ranks for ties; None if one class only."""
+    labels = np.asarray(labels) == 1
+    n_pos, n_neg = labels.sum(), (~labels).sum()
+    if not n_pos or not n_neg:
+        return None
+
+    order = np.argsort(scores, kind="mergesort")
+    sorted_scores = np.asarray(scores)[order]
+    ranks = np.empty(len(scores))
+    i = 0
+    while i < len(scores):
+        j = i
+        while j + 1 < len(scores) and sorted_scores[j + 1] == sorted_scores[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2 + 1
+        i = j + 1
+
+    return float((ranks[labels].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+_model = None
+_model_mtime = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """
+    The trained model, reloaded when the artifact changes on disk, or None
+    when no artifact exists or it was trained on other features (callers
+    fall back to the hand-coded formula).
+    """
+    global _model, _model_mtime
+    path = Path(settings.HOSPITAL_SUITABILITY_MODEL_PATH)
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    if mtime != _model_mtime:
+        with _model_lock:
+            if mtime != _model_mtime:
+                try:
+                    _model = SuitabilityModel.load(path)
+                except ValueError:
+                    logger.warning("Ignoring suitability model; retrain it", exc_info=True)
+                    _model = None
+                _model_mtime = mtime
+    return _model
@@ -1,3 +1,1155 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import requests
+from PIL import Image
+from asgiref.sync import async_to_sync
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from reportlab import rl_config
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from accounts.models import User
+
+from . import doctor_cache, feedback_utils, geocoding, hospital_directory, ml_hospital_predictor, metrics, ml_state, ml_utils, pdf_cache, pdf_jobs, places_cache, prediction_cache, renditions, suitability_model
+from .batching import MicroBatcher
+from .cache_utils import LRUCache
+from .hospital_ranking import Candidates, rank_hospitals
+from .maps_client import MapsClient, set_maps_client
+from .ml_pipeline import PipelineBusy, PredictionPipeline
+from .maps_stub import FakeMapsServer
+from .models import DoctorFeedback, DoctorFeedbackStats, GeocodeCache, Hospital, HospitalCoverage, PdfRenderJob, Scan
+from .pdf import DegradedReport, ReportTemplate, build_scan_pdf
+from .scoring_weights import SEVERITY_WEIGHTS
+from .suitability_model import SuitabilityModel
+from .views import _rank_nearby_hospitals, nearby_hospitals, nearby_hospitals_stream
+
+
+class ModelLoadPolicyTests(SimpleTestCase):
+    def test_test_runner_is_a_management_command(self):
+        # `manage.py test` goes through ManagementUtility like django-admin
+        # and `python -m django` do, so the model is not loaded eagerly.
+        self.assertEqual(ml_state.running_command(), "test")
+        self.assertTrue(ml_state.is_management_command())
+        self.assertFalse(ml_state.should_load_at_startup())
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_expires_after_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=10)
+        with mock.patch("api.cache_utils.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with mock.patch("api.cache_utils.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get_with_age("a"), (1, 5.0))
+        with mock.patch("api.cache_utils.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+@override_settings(ML_PREDICTION_CACHE_ALIAS=None, ML_TTA_ENABLED=False)
+class PredictionCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ml_state, "load")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.set_fingerprint("keras:100:1")
+
+    def set_fingerprint(self, fingerprint):
+        patcher = mock.patch.object(ml_state, "model_fingerprint", fingerprint)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_after_store(self):
+        key, cached = prediction_cache.lookup(io.BytesIO(b"image"))
+        self.assertIsNone(cached)
+        prediction_cache.store(key, {"disease": "Melanoma"})
+
+        self.assertEqual(
+            prediction_cache.lookup(io.BytesIO(b"image")),
+            (key, {"disease": "Melanoma"}),
+        )
+        self.assertIsNone(prediction_cache.lookup(io.BytesIO(b"other"))[1])
+
+    def test_version_follows_loaded_model(self):
+        key, _ = prediction_cache.lookup(io.BytesIO(b"image"))
+        prediction_cache.store(key, {"disease": "Melanoma"})
+        self.assertIn("keras:100:1", key)
+
+        # A new model only takes effect once ml_state has loaded it.
+        self.set_fingerprint("keras:200:2")
+        key, cached = prediction_cache.lookup(io.BytesIO(b"image"))
+        self.assertIn("keras:200:2", key)
+        self.assertIsNone(cached)
+
+
+def _zip(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+    return SimpleUploadedFile("scans.zip", buffer.getvalue(), content_type="application/zip")
+
+
+@override_settings(ML_BATCH_ENDPOINT_MAX_IMAGES=4, ML_BATCH_MAX_ARCHIVE_BYTES=1000)
+class BatchUploadLimitTests(SimpleTestCase):
+    url = "/api/predict/skin-disease/batch/"
+
+    def post_archive(self, entries):
+        with mock.patch.object(zipfile.ZipFile, "read") as read:
+            response = self.client.post(self.url, {"archive": _zip(entries)})
+        return response, read
+
+    def test_too_many_entries_rejected_before_inflating(self):
+        response, read = self.post_archive([(f"{i}.jpg", b"x") for i in range(10)])
+        self.assertEqual(response.status_code, 413)
+        read.assert_not_called()
+
+    def test_uncompressed_size_rejected_before_inflating(self):
+        response, read = self.post_archive([("a.jpg", b"\0" * 600), ("b.jpg", b"\0" * 600)])
+        self.assertEqual(response.status_code, 413)
+        read.assert_not_called()
+
+    def test_non_image_entries_do_not_count(self):
+        entries = [(f"{i}.txt", b"x") for i in range(10)]
+        response, _ = self.post_archive(entries)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "No images provided")
+
+
+@override_settings(ML_TTA_ENABLED=True, ML_TTA_CONFIDENCE_CUTOFF=0.6, ML_PREDICTION_CACHE_ENABLED=False)
+class AsyncTTATests(SimpleTestCase):
+    def predict(self, preds):
+        future = Future()
+        future.set_result((np.zeros((1, 224, 224, 3), dtype=np.float32), np.array(preds)))
+        pipeline = mock.Mock(**{"submit.return_value": future})
+        infer = mock.Mock(side_effect=lambda x: np.tile(preds, (len(x), 1)))
+
+        with mock.patch("api.ml_pipeline.get_pipeline", return_value=pipeline), \
+                mock.patch.object(ml_state, "get_infer_fn", return_value=infer):
+            return async_to_sync(ml_utils.apredict_skin_disease_from_file)(io.BytesIO(b"image"))
+
+    def test_checked_counts_confident_predictions_too(self):
+        checked = metrics.counter("tta.checked").value
+        fired = metrics.counter("tta.fired").value
+
+        confident = [0.9] + [0.1 / 6] * 6
+        unsure = [0.4, 0.3] + [0.3 / 5] * 5
+        self.predict(confident)
+        self.predict(unsure)
+
+        self.assertEqual(metrics.counter("tta.checked").value - checked, 2)
+        self.assertEqual(metrics.counter("tta.fired").value - fired, 1)
+
+
+@override_settings(
+    # The per-call timeout is longer than the deadline, so only the
+    # deadline can cut the slow lookups short.
+    HOSPITAL_DOCTOR_LOOKUP_TIMEOUT=2.5,
+    HOSPITAL_DOCTOR_LOOKUP_DEADLINE=0.5,
+    HOSPITAL_RESULTS_LIMIT=20,
+)
+class NearbyHospitalsDeadlineTests(TestCase):
+    def setUp(self):
+        self.server = FakeMapsServer(
+            hospitals=10,
+            latency={"nearbysearch": 0.01, "textsearch": 0.05},
+            slow_fraction=0.5,
+            slow_latency=3.0,
+        ).start()
+        self.addCleanup(self.server.stop)
+
+        # Retries would re-roll slow_fraction and muddle the slow-call count.
+        previous = set_maps_client(MapsClient(base_url=self.server.base_url, api_key="stub", max_retries=0))
+        self.addCleanup(set_maps_client, previous)
+
+        for module in (doctor_cache, places_cache):
+            patcher = mock.patch.object(module, "_cache", LRUCache(maxsize=100))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def post(self, payload):
+        request = APIRequestFactory().post("/api/nearby-hospitals/", payload, format="json")
+        force_authenticate(request, user=User(email="test@example.com"))
+        return nearby_hospitals(request)
+
+    def test_slow_doctor_lookups_do_not_hold_the_response(self):
+        random.seed(1)
+        started = time.monotonic()
+        response = self.post({"diagnosis": "Melanoma", "severity": "High", "lat": 18.52, "lon": 73.85})
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(elapsed, 1.5)
+
+        hospitals = response.data["hospitals"]
+        without_doctors = [h for h in hospitals if not h["top_doctors"]]
+        self.assertEqual(len(hospitals), 10)
+        self.assertGreater(self.server.slow_calls, 0)
+        self.assertLess(self.server.slow_calls, len(hospitals))
+        self.assertEqual(len(without_doctors), self.server.slow_calls)
+
+
+@override_settings(
+    HOSPITAL_DIRECTORY_ENABLED=False,
+    HOSPITAL_DOCTOR_LOOKUP_TIMEOUT=5,
+    HOSPITAL_DOCTOR_LOOKUP_DEADLINE=0.3,
+)
+class NearbyHospitalsStreamTests(TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+        self.client_mock = mock.Mock()
+        self.client_mock.nearby_search.return_value = {
+            "status": "OK",
+            "results": [
+                _place("Fast A", 18.52, 73.85) | {"rating": 5.0},
+                _place("Slow B", 18.52, 73.85) | {"rating": 4.0},
+                _place("Fast C", 18.52, 73.85) | {"rating": 3.0},
+            ],
+        }
+        self.client_mock.text_search.side_effect = self.text_search
+        previous = set_maps_client(self.client_mock)
+        self.addCleanup(set_maps_client, previous)
+
+        for module in (doctor_cache, places_cache):
+            patcher = mock.patch.object(module, "_cache", LRUCache(maxsize=100))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def text_search(self, *, query, **kwargs):
+        if query.startswith("Slow"):
+            self.release.wait(5)
+        return {"status": "OK", "results": [{"place_id": query, "name": f"Dr. {query}", "rating": 4.5}]}
+
+    def stream(self, payload, sse=False):
+        path = "/api/nearby-hospitals/stream/" + ("?sse=1" if sse else "")
+        request = APIRequestFactory().post(path, payload, format="json")
+        force_authenticate(request, user=User(email="test@example.com"))
+        response = nearby_hospitals_stream(request)
+        self.assertEqual(response.status_code, 200)
+
+        body = b"".join(response.streaming_content).decode()
+        if not sse:
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            return [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = []
+        for frame in body.split("\n\n")[:-1]:
+            name, data = frame.split("\n")
+            event = json.loads(data.removeprefix("data: "))
+            self.assertEqual(name, f"event: {event['event']}")
+            events.append(event)
+        return events
+
+    def test_event_order_and_timed_out(self):
+        for sse in (False, True):
+            doctor_cache._cache.clear()
+            with self.subTest(sse=sse):
+                events = self.stream({"diagnosis": "Melanoma", "lat": 18.52, "lon": 73.85}, sse=sse)
+
+                kinds = [e["event"] for e in events]
+                self.assertEqual(kinds, ["hospitals", "doctors", "doctors", "doctors", "done"])
+
+                names = [h["name"] for h in events[0]["hospitals"]]
+                self.assertEqual(names, ["Fast A", "Slow B", "Fast C"])
+                self.assertTrue(all(h["top_doctors"] == [] for h in events[0]["hospitals"]))
+
+                doctors = {e["name"]: e for e in events[1:-1]}
+                self.assertEqual(sorted(e["index"] for e in doctors.values()), [0, 1, 2])
+                self.assertEqual(doctors["Slow B"]["top_doctors"], [])
+                self.assertEqual(len(doctors["Fast A"]["top_doctors"]), 1)
+                # The lookup that missed the deadline is reported last.
+                self.assertEqual(events[-2]["name"], "Slow B")
+                self.assertEqual(events[-1]["timed_out"], [names.index("Slow B")])
+
+    def test_ranking_error_is_an_event(self):
+        with mock.patch("api.views.rank_hospitals", side_effect=RuntimeError("boom")):
+            events = self.stream({"diagnosis": "Melanoma", "lat": 18.52, "lon": 73.85})
+
+        self.assertEqual(events, [
+            {"event": "error", "error": "Hospital ranking failed"},
+            {"event": "done", "timed_out": []},
+        ])
+
+    def test_invalid_request_is_rejected_before_streaming(self):
+        request = APIRequestFactory().post("/api/nearby-hospitals/stream/", {"lat": 1, "lon": 2}, format="json")
+        force_authenticate(request, user=User(email="test@example.com"))
+        self.assertEqual(nearby_hospitals_stream(request).status_code, 400)
+
+
+class MapsClientRetryTests(SimpleTestCase):
+    def test_read_timeout_is_not_retried(self):
+        with FakeMapsServer(latency={"textsearch": 1.0}) as server:
+            client = MapsClient(base_url=server.base_url, api_key="stub", max_retries=2, backoff=0)
+            started = time.monotonic()
+            with self.assertRaises(requests.Timeout):
+                client.text_search(query="x", lat=0, lon=0, radius=100, timeout=0.2)
+
+            self.assertLess(time.monotonic() - started, 0.6)
+            self.assertEqual(server.calls["textsearch"], 1)
+
+
+@override_settings(GEOCODE_CACHE_TTL_DAYS=30)
+class GeocodeCacheTests(TestCase):
+    def setUp(self):
+        self.client_mock = mock.Mock()
+        self.client_mock.geocode.return_value = {
+            "status": "OK",
+            "results": [{"geometry": {"location": {"lat": 18.5, "lng": 73.8}}}],
+        }
+        previous = set_maps_client(self.client_mock)
+        self.addCleanup(set_maps_client, previous)
+
+        patcher = mock.patch.object(geocoding, "_memory", LRUCache(maxsize=10))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_memory_then_database_hits(self):
+        self.assertEqual(geocoding.geocode_city("  Pune, "), (18.5, 73.8))
+        self.assertEqual(geocoding.geocode_city("pune"), (18.5, 73.8))
+        self.assertEqual(self.client_mock.geocode.call_count, 1)
+
+        geocoding._memory.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(geocoding.geocode_city("PUNE"), (18.5, 73.8))
+        self.assertEqual(self.client_mock.geocode.call_count, 1)
+
+    def test_expired_row_is_refreshed(self):
+        GeocodeCache.objects.create(query="pune", lat=1.0, lon=2.0)
+        GeocodeCache.objects.update(updated_at=timezone.now() - timedelta(days=31))
+
+        self.assertEqual(geocoding.geocode_city("Pune"), (18.5, 73.8))
+        self.assertEqual(GeocodeCache.objects.get(query="pune").lat, 18.5)
+
+    def test_expired_row_served_when_refresh_fails(self):
+        GeocodeCache.objects.create(query="pune", lat=1.0, lon=2.0)
+        GeocodeCache.objects.update(updated_at=timezone.now() - timedelta(days=31))
+        self.client_mock.geocode.side_effect = requests.ConnectionError
+
+        with self.assertLogs("api.geocoding", "WARNING"):
+            self.assertEqual(geocoding.geocode_city("Pune"), (1.0, 2.0))
+
+
+def _place(name, lat, lon):
+    return {"place_id": name, "name": name, "rating": 4.0, "geometry": {"location": {"lat": lat, "lng": lon}}}
+
+
+@override_settings(PLACES_CACHE_GEOHASH_PRECISION=6)
+class PlacesCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.client_mock = mock.Mock()
+        previous = set_maps_client(self.client_mock)
+        self.addCleanup(set_maps_client, previous)
+
+        patcher = mock.patch.object(places_cache, "_cache", LRUCache(maxsize=10))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cell_results_filtered_to_each_users_radius(self):
+        _, (lat_lo, lat_hi), (lon_lo, lon_hi) = places_cache.geohash_bounds(18.52, 73.85, 6)
+        lon = (lon_lo + lon_hi) / 2
+        south, north = lat_lo + 1e-5, lat_hi - 1e-5
+
+        # 4.95 km north of the northern user, over 5 km from the southern one.
+        far_north = north + 4.95 / 111.2
+        self.client_mock.nearby_search.return_value = {
+            "status": "OK",
+            "results": [_place("near", north, lon), _place("far-north", far_north, lon)],
+        }
+        on_fetch = mock.Mock()
+
+        results = places_cache.nearby_hospitals(south, lon, "hospital", radius=5000, on_fetch=on_fetch)
+        self.assertEqual([p["name"] for p in results], ["near"])
+        self.assertEqual(len(on_fetch.call_args.args[0]), 2)
+
+        results = places_cache.nearby_hospitals(north, lon, "hospital", radius=5000, on_fetch=on_fetch)
+        self.assertEqual([p["name"] for p in results], ["near", "far-north"])
+        self.assertEqual(self.client_mock.nearby_search.call_count, 1)
+        self.assertEqual(on_fetch.call_count, 1)
+
+
+@override_settings(HOSPITAL_DIRECTORY_ENABLED=True, HOSPITAL_COVERAGE_TTL=3600, PLACES_CACHE_GEOHASH_PRECISION=6)
+class HospitalCoverageTests(TestCase):
+    def setUp(self):
+        self.client_mock = mock.Mock()
+        previous = set_maps_client(self.client_mock)
+        self.addCleanup(set_maps_client, previous)
+
+        patcher = mock.patch.object(places_cache, "_cache", LRUCache(maxsize=10))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        hospital_directory.invalidate_index()
+        self.addCleanup(hospital_directory.invalidate_index)
+
+        self.cell, (lat_lo, lat_hi), (lon_lo, lon_hi) = places_cache.geohash_bounds(18.52, 73.85, 6)
+        self.lat, self.lon = (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+        # Plenty of hospitals around the user, ingested for the cell to the north.
+        north = places_cache.geohash(lat_hi + 0.001, self.lon, 6)
+        for i in range(8):
+            Hospital.objects.create(
+                place_id=f"h{i}", name=f"Hospital {i}",
+                lat=self.lat + 0.001 * i, lon=self.lon, rating=4.0, keywords="|hospital|",
+            )
+        hospital_directory.record_coverage(north, "hospital", 5000)
+
+        self.client_mock.nearby_search.return_value = {
+            "status": "OK",
+            "results": [_place("fresh", self.lat, self.lon)],
+        }
+        self.query = {"lat": self.lat, "lon": self.lon, "keyword": "hospital", "severity": "Low", "diagnosis": "mel"}
+
+    def test_partially_covered_area_still_reaches_places(self):
+        ranked, _ = _rank_nearby_hospitals(self.query)
+
+        self.assertEqual(self.client_mock.nearby_search.call_count, 1)
+        self.assertEqual([h["name"] for h in ranked], ["fresh"])
+        self.assertTrue(HospitalCoverage.objects.filter(cell=self.cell, keyword="hospital").exists())
+
+        # The cell is covered now: served from the directory, Places cache or not.
+        places_cache._cache.clear()
+        ranked, _ = _rank_nearby_hospitals(self.query)
+        self.assertEqual(self.client_mock.nearby_search.call_count, 1)
+        self.assertEqual(len(ranked), 9)
+
+    def test_stale_coverage_falls_back_to_places(self):
+        HospitalCoverage.objects.create(
+            cell=self.cell, keyword="hospital", radius_m=5000,
+            fetched_at=timezone.now() - timedelta(hours=2),
+        )
+        self.assertIsNone(hospital_directory.search(self.lat, self.lon, "hospital"))
+
+        HospitalCoverage.objects.filter(cell=self.cell).update(fetched_at=timezone.now())
+        hospital_directory.invalidate_index()
+        self.assertIsNotNone(hospital_directory.search(self.lat, self.lon, "hospital"))
+        self.assertIsNone(hospital_directory.search(self.lat, self.lon, "dermatology"))
+
+
+def _reference_ranking(places, lat, lon, severity):
+    """The per-hospital loop nearby_hospitals used before scoring was vectorized."""
+    weights = SEVERITY_WEIGHTS.get(severity, SEVERITY_WEIGHTS["Low"])
+    ranked = []
+    for p in places:
+        rating = p.get("rating", 0)
+        h_lat = p["geometry"]["location"]["lat"]
+        h_lon = p["geometry"]["location"]["lng"]
+
+        lat1, lon1, lat2, lon2 = map(math.radians, [lat, lon, h_lat, h_lon])
+        a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        distance = round(6371.0088 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a)), 3)
+
+        ml_score = ml_hospital_predictor.predict_suitability(rating=rating, distance=distance, severity=severity)
+        final_score = rating * weights["rating"] + ml_score * weights["ml"] - distance * weights["distance"]
+        ranked.append({"name": p["name"], "distance_km": distance, "ml_score": ml_score, "final_score": round(final_score, 2)})
+
+    ranked.sort(key=lambda x: x["final_score"], reverse=True)
+    return ranked
+
+
+class RankHospitalsTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ml_hospital_predictor, "get_model", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        rng = random.Random(16)
+        self.lat, self.lon = 18.52, 73.85
+        # Few distinct ratings and repeated positions, so plenty of ties.
+        spots = [(self.lat + rng.uniform(-0.04, 0.04), self.lon + rng.uniform(-0.04, 0.04)) for _ in range(12)]
+        self.places = [
+            _place(f"h{i}", *rng.choice(spots)) | {"rating": rng.choice([0, 3.5, 4.0, 4.5])}
+            for i in range(60)
+        ]
+
+    def rank(self, severity, limit):
+        ranked, _ = rank_hospitals(Candidates.from_places(self.places), self.lat, self.lon, severity, limit)
+        return [{key: h[key] for key in ("name", "distance_km", "ml_score", "final_score")} for h in ranked]
+
+    def test_matches_reference_loop(self):
+        for severity in ("Low", "Moderate", "High"):
+            reference = _reference_ranking(self.places, self.lat, self.lon, severity)
+            scores = [h["final_score"] for h in reference]
+            self.assertLess(len(set(scores)), len(scores))
+
+            with self.subTest(severity=severity):
+                self.assertEqual(self.rank(severity, limit=len(self.places)), reference)
+                self.assertEqual(self.rank(severity, limit=200), reference)
+                for k in (1, 5, 17):
+                    self.assertEqual(self.rank(severity, limit=k), reference[:k])
+
+    def test_feedback_only_ranks_when_enabled(self):
+        feedback = {p["name"]: 0.5 for p in self.places} | {self.places[-1]["name"]: 1.0}
+        patcher = mock.patch("api.hospital_ranking.get_feedback_scores", return_value=feedback)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        def rank():
+            ranked, _ = rank_hospitals(Candidates.from_places(self.places), self.lat, self.lon, "High", 100, disease="Melanoma")
+            return {h["name"]: h for h in ranked}
+
+        with self.settings(HOSPITAL_FEEDBACK_RANKING_ENABLED=False):
+            off = rank()
+        with self.settings(HOSPITAL_FEEDBACK_RANKING_ENABLED=True):
+            on = rank()
+
+        last = self.places[-1]["name"]
+        self.assertEqual(off[last]["feedback_score"], 1.0)
+        self.assertEqual([h["final_score"] for h in _reference_ranking(self.places, self.lat, self.lon, "High")],
+                         [h["final_score"] for h in off.values()])
+        self.assertAlmostEqual(on[last]["final_score"] - off[last]["final_score"], 0.5 * SEVERITY_WEIGHTS["High"]["feedback"], places=1)
+
+
+def _suitability_rows(n, seed=19):
+    rng = random.Random(seed)
+    rows, labels = [], []
+    for _ in range(n):
+        rating = rng.uniform(1, 5)
+        rows.append({
+            "disease": rng.choice(["Melanoma", "Eczema"]),
+            "severity": rng.choice(["Low", "High"]),
+            "hospital_type": "hospital",
+            "rating": rating,
+        })
+        labels.append(int(rating > 3))
+    return rows, labels
+
+
+class SuitabilityModelTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = f"{tmp.name}/suitability.json"
+
+        override = override_settings(HOSPITAL_SUITABILITY_MODEL_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        patcher = mock.patch.object(suitability_model, "_model_mtime", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_encode_columns(self):
+        model = SuitabilityModel(
+            {"disease": ["Eczema", "Melanoma"], "severity": ["High", "Low"], "hospital_type": ["hospital"]},
+            means=[3.0], stds=[2.0], weights=[], bias=0.0,
+        )
+        X = model.encode_columns(
+            3,
+            {"disease": ["Melanoma", "Eczema", "Unknown"], "severity": "High", "hospital_type": "clinic"},
+            {"rating": [5.0, 3.0, 1.0], "distance": [9, 9, 9]},
+        )
+        np.testing.assert_array_equal(X, [
+            [0, 1, 1, 0, 0, 1.0],
+            [1, 0, 1, 0, 0, 0.0],
+            [0, 0, 1, 0, 0, -1.0],
+        ])
+
+        rows, _ = _suitability_rows(4)
+        np.testing.assert_array_equal(model.encode(rows), model.encode_columns(
+            4,
+            {name: [r[name] for r in rows] for name in ("disease", "severity", "hospital_type")},
+            {"rating": [r["rating"] for r in rows]},
+        ))
+
+    def test_fit_and_predict_proba(self):
+        rows, labels = _suitability_rows(200)
+        model = SuitabilityModel.fit(rows, labels)
+
+        proba = model.predict_proba(model.encode(rows))
+        self.assertEqual(proba.shape, (200, 2))
+        np.testing.assert_allclose(proba.sum(axis=1), 1)
+        self.assertGreater(suitability_model.evaluate(model, rows, labels)["auc"], 0.95)
+
+    def test_save_load_round_trip(self):
+        rows, labels = _suitability_rows(50)
+        model = SuitabilityModel.fit(rows, labels, epochs=20)
+        model.save(self.path)
+
+        loaded = SuitabilityModel.load(self.path)
+        self.assertEqual(loaded.categories, model.categories)
+        np.testing.assert_array_equal(loaded.predict_proba(loaded.encode(rows)), model.predict_proba(model.encode(rows)))
+
+    def test_prediction_follows_the_artifact_on_disk(self):
+        ratings, distances = np.array([4.5, 2.0]), np.array([1.0, 8.0])
+        handcoded = np.round(ml_hospital_predictor.handcoded_suitability_batch(ratings, distances, "High"), 2)
+
+        def predict():
+            return ml_hospital_predictor.predict_suitability_batch(
+                ratings=ratings, distances=distances, severity="High", disease="Melanoma",
+            )
+
+        np.testing.assert_array_equal(predict(), handcoded)
+
+        rows, labels = _suitability_rows(50)
+        model = SuitabilityModel.fit(rows, labels, epochs=20)
+        model.save(self.path)
+        expected = np.round(model.predict_proba(model.encode_columns(
+            2, {"disease": "Melanoma", "severity": "High", "hospital_type": "hospital"}, {"rating": ratings},
+        ))[:, 1], 2)
+        np.testing.assert_array_equal(predict(), expected)
+
+        # An artifact from before distance/feedback were dropped is ignored.
+        data = model.to_dict()
+        data["features"]["numeric"] = ["rating", "distance", "feedback_score"]
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+        os.utime(self.path, (time.time() + 5, time.time() + 5))
+        with self.assertLogs("api.suitability_model", "WARNING"):
+            np.testing.assert_array_equal(predict(), handcoded)
+
+        os.remove(self.path)
+        np.testing.assert_array_equal(predict(), handcoded)
+
+
+@override_settings(DOCTOR_CACHE_FRESH=60, DOCTOR_CACHE_TTL=600)
+class DoctorCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.client_mock = mock.Mock()
+        self.client_mock.text_search.return_value = {
+            "status": "OK",
+            "results": [{"place_id": "d1", "name": "Dr. One", "rating": 4.5, "types": ["doctor"]}],
+        }
+        previous = set_maps_client(self.client_mock)
+        self.addCleanup(set_maps_client, previous)
+
+        self.pool = mock.Mock()
+        for name, value in (("_cache", LRUCache(maxsize=10, ttl=600)), ("_refresh_pool", self.pool)):
+            patcher = mock.patch.object(doctor_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def at(self, now):
+        return mock.patch("api.cache_utils.time.monotonic", return_value=now)
+
+    def test_fetch_then_fresh_hit(self):
+        with self.at(1000.0):
+            self.assertIsNone(doctor_cache.cached_doctors("City Hospital", 18.5, 73.8))
+            doctors = doctor_cache.get_doctors("City Hospital", 18.5, 73.8)
+        self.assertEqual(doctors, [{"place_id": "d1", "name": "Dr. One", "rating": 4.5}])
+
+        with self.at(1030.0):
+            self.assertEqual(doctor_cache.get_doctors("city hospital ", 18.50001, 73.8), doctors)
+        self.assertEqual(self.client_mock.text_search.call_count, 1)
+        self.pool.submit.assert_not_called()
+
+    def test_stale_entry_served_and_refreshed_once(self):
+        with self.at(1000.0):
+            doctors = doctor_cache.get_doctors("City Hospital", 18.5, 73.8)
+
+        with self.at(1100.0):
+            self.assertEqual(doctor_cache.cached_doctors("City Hospital", 18.5, 73.8), doctors)
+            self.assertEqual(doctor_cache.cached_doctors("City Hospital", 18.5, 73.8), doctors)
+        self.assertEqual(self.pool.submit.call_count, 1)
+
+        # The refresh itself goes to Places and clears the in-flight marker.
+        _refresh, *args = self.pool.submit.call_args.args
+        _refresh(*args)
+        self.assertEqual(self.client_mock.text_search.call_count, 2)
+        self.assertFalse(doctor_cache._refreshing)
+
+    def test_expired_entry_is_a_miss(self):
+        with self.at(1000.0):
+            doctor_cache.get_doctors("City Hospital", 18.5, 73.8)
+        with self.at(1700.0):
+            self.assertIsNone(doctor_cache.cached_doctors("City Hospital", 18.5, 73.8))
+
+
+class FeedbackStatsSignalTests(TestCase):
+    def feedback(self, hospital="City Hospital", disease="Melanoma", rating=4, successful=True):
+        return DoctorFeedback.objects.create(
+            doctor_name="Dr. One", hospital_name=hospital, disease=disease,
+            severity="High", rating=rating, successful=successful,
+        )
+
+    def stats(self):
+        return set(DoctorFeedbackStats.objects.values_list(
+            "hospital_name", "disease", "count", "rating_sum", "success_count",
+        ))
+
+    def assertMatchesRebuild(self):
+        current = self.stats()
+        feedback_utils.rebuild_feedback_stats()
+        # A group whose last row was deleted keeps a zeroed stats row.
+        self.assertEqual({row for row in current if row[2]}, self.stats())
+
+    def test_create_and_delete(self):
+        first = self.feedback(rating=5)
+        self.feedback(rating=3, successful=False)
+        self.assertEqual(self.stats(), {("City Hospital", "Melanoma", 2, 8, 1)})
+        self.assertEqual(
+            feedback_utils.get_feedback_score("City Hospital", "Melanoma"),
+            feedback_utils.score_from_stats(2, 8, 1),
+        )
+
+        first.delete()
+        self.assertEqual(self.stats(), {("City Hospital", "Melanoma", 1, 3, 0)})
+        self.assertMatchesRebuild()
+
+    def test_edit_moves_row_between_groups(self):
+        row = self.feedback(rating=5)
+        self.feedback(hospital="Other Hospital", rating=2)
+
+        row.hospital_name = "Other Hospital"
+        row.rating = 4
+        row.save()
+
+        self.assertEqual(self.stats(), {("Other Hospital", "Melanoma", 2, 6, 2)})
+        self.assertMatchesRebuild()
+
+    def test_unknown_hospitals_get_neutral_score(self):
+        self.feedback()
+        scores = feedback_utils.get_feedback_scores(["City Hospital", "Nowhere"], "Melanoma")
+        self.assertEqual(scores["Nowhere"], feedback_utils.NEUTRAL_SCORE)
+        self.assertNotEqual(scores["City Hospital"], feedback_utils.NEUTRAL_SCORE)
+
+
+class ScanReportTestCase(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+
+        self.user = User.objects.create_user(email="scans@example.com", password="x")
+        self.scan, self.other = (
+            Scan.objects.create(
+                user=self.user, diagnosis="Melanoma", confidence="91.2", severity="High",
+                advice="See a dermatologist.", is_safe=False, image="",
+            )
+            for _ in range(2)
+        )
+
+
+class PdfCacheTests(ScanReportTestCase):
+
+    def files(self, scan):
+        try:
+            return default_storage.listdir(f"reports/{scan.id}")[1]
+        except FileNotFoundError:
+            return []
+
+    def test_rerender_replaces_only_that_scans_report(self):
+        first = pdf_cache.render_report(self.scan)
+        other = pdf_cache.render_report(self.other)
+        self.assertTrue(first.startswith(f"reports/{self.scan.id}/"))
+        self.assertEqual(pdf_cache.cached_report(self.scan), first)
+
+        self.scan.advice = "Updated advice."
+        self.assertIsNone(pdf_cache.cached_report(self.scan))
+        second = pdf_cache.render_report(self.scan)
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.files(self.scan), [second.rsplit("/", 1)[1]])
+        self.assertTrue(default_storage.exists(other))
+
+    def test_deleting_a_scan_removes_its_reports(self):
+        pdf_cache.render_report(self.scan)
+        pdf_cache.render_report(self.other)
+
+        self.scan.delete()
+        self.assertEqual(self.files(self.scan), [])
+        self.assertEqual(len(self.files(self.other)), 1)
+
+    def test_render_without_the_image_is_not_cached(self):
+        self.scan.image = "scans/missing.png"
+        self.scan.save()
+
+        with self.assertLogs("api.pdf_cache", "WARNING"):
+            degraded = pdf_cache.render_report(self.scan)
+        self.assertTrue(degraded.endswith(".degraded.pdf"))
+        self.assertIsNone(pdf_cache.cached_report(self.scan))
+        with default_storage.open(degraded, "rb") as f:
+            self.assertTrue(f.read().startswith(b"%PDF"))
+
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 64), "red").save(buf, format="PNG")
+        default_storage.save("scans/missing.png", ContentFile(buf.getvalue()))
+
+        path = pdf_cache.render_report(self.scan)
+        self.assertEqual(pdf_cache.cached_report(self.scan), path)
+        self.assertEqual(self.files(self.scan), [path.rsplit("/", 1)[1]])
+
+
+class ScanExportTests(ScanReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+        stranger = User.objects.create_user(email="stranger@example.com", password="x")
+        self.foreign = Scan.objects.create(
+            user=stranger, diagnosis="Eczema", confidence="70", severity="Low",
+            advice="Moisturise.", is_safe=True, image="",
+        )
+        for scan, day in ((self.scan, "2026-01-10"), (self.other, "2026-03-05"), (self.foreign, "2026-01-10")):
+            Scan.objects.filter(pk=scan.pk).update(created_at=f"{day}T12:00:00Z")
+
+    def export(self, **params):
+        return self.api.get("/api/scans/export/", params)
+
+    def archive(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_export_is_a_zip_of_the_users_reports(self):
+        zf = self.archive(self.export())
+
+        self.assertEqual(zf.namelist(), [
+            f"scan_{self.scan.id}_2026-01-10.pdf",
+            f"scan_{self.other.id}_2026-03-05.pdf",
+            "manifest.csv",
+        ])
+        for scan in (self.scan, self.other):
+            scan.refresh_from_db()
+            with default_storage.open(pdf_cache.cached_report(scan), "rb") as f:
+                self.assertEqual(zf.read(f"scan_{scan.id}_{scan.created_at:%Y-%m-%d}.pdf"), f.read())
+
+        manifest = zf.read("manifest.csv").decode().splitlines()
+        self.assertEqual(manifest[0], "id,created_at,diagnosis,confidence,severity,file")
+        self.assertEqual([row.split(",")[0] for row in manifest[1:]], [str(self.scan.id), str(self.other.id)])
+
+    def test_date_filters(self):
+        def pdfs(response):
+            return [name for name in self.archive(response).namelist() if name.endswith(".pdf")]
+
+        self.assertEqual(pdfs(self.export(**{"from": "2026-02-01"})), [f"scan_{self.other.id}_2026-03-05.pdf"])
+        self.assertEqual(pdfs(self.export(to="2026-01-10")), [f"scan_{self.scan.id}_2026-01-10.pdf"])
+
+        self.assertEqual(self.export(**{"from": "10/01/2026"}).status_code, 400)
+        self.assertEqual(self.export(to="2026-13-01").status_code, 400)
+        self.assertEqual(self.export(**{"from": "2027-01-01"}).status_code, 404)
+
+
+class ReportTemplateConcurrencyTests(SimpleTestCase):
+    def setUp(self):
+        # Fixed timestamps and document ids, so equal reports are equal bytes.
+        patcher = mock.patch.object(rl_config, "invariant", 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        buf = io.BytesIO()
+        Image.new("RGB", (120, 80), "blue").save(buf, format="JPEG")
+        self.image = buf.getvalue()
+        self.scans = [
+            Scan(
+                id=i, diagnosis=f"Diagnosis {i}", confidence=f"{60 + i}.5", severity=("Low", "High")[i % 2],
+                advice="Line one.\n" * (1 + i * 7), is_safe=bool(i % 2),
+            )
+            for i in range(6)
+        ]
+
+    def test_shared_template_renders_like_a_fresh_one(self):
+        expected = [build_scan_pdf(scan, image=self.image, template=ReportTemplate()) for scan in self.scans]
+
+        shared = ReportTemplate()
+        jobs = [i % len(self.scans) for i in range(48)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda i: build_scan_pdf(self.scans[i], image=self.image, template=shared), jobs,
+            ))
+
+        for i, pdf in zip(jobs, results):
+            self.assertEqual(pdf, expected[i])
+
+
+@override_settings(PDF_IMAGE_DPI=50)
+class RenditionTests(ScanReportTestCase):
+    def setUp(self):
+        super().setUp()
+        buf = io.BytesIO()
+        Image.new("RGB", (2000, 1000), "red").save(buf, format="PNG")
+        self.scan.image = default_storage.save("scans/big.png", ContentFile(buf.getvalue()))
+        self.scan.save()
+
+    def test_rendition_is_a_jpeg_within_the_image_box(self):
+        data = renditions.get_pdf_rendition(self.scan)
+
+        img = Image.open(io.BytesIO(data))
+        self.assertEqual(img.format, "JPEG")
+        # 2 inch box at 50 dpi, aspect ratio kept.
+        self.assertEqual(img.size, (100, 50))
+
+    def test_second_call_reuses_the_stored_rendition(self):
+        with mock.patch.object(renditions, "make_pdf_rendition", wraps=renditions.make_pdf_rendition) as make:
+            first = renditions.get_pdf_rendition(self.scan)
+            second = renditions.get_pdf_rendition(self.scan)
+
+        self.assertEqual(make.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertTrue(default_storage.exists(renditions.rendition_path(self.scan)))
+
+    def test_deleting_a_scan_removes_its_renditions(self):
+        renditions.get_pdf_rendition(self.scan)
+        directory = f"renditions/{self.scan.id}"
+        self.assertEqual(len(default_storage.listdir(directory)[1]), 1)
+
+        self.scan.delete()
+        self.assertEqual(default_storage.listdir(directory)[1], [])
+
+    def test_undecodable_image_degrades_the_report(self):
+        self.scan.image = default_storage.save("scans/broken.png", ContentFile(b"not an image"))
+        with self.assertRaises(DegradedReport) as ctx:
+            build_scan_pdf(self.scan, strict=True)
+        self.assertTrue(ctx.exception.pdf.startswith(b"%PDF"))
+
+    def test_storage_errors_propagate(self):
+        with mock.patch("django.core.files.storage.FileSystemStorage.save", side_effect=PermissionError("read-only")):
+            with self.assertRaises(PermissionError):
+                build_scan_pdf(self.scan)
+
+
+@override_settings(PDF_RENDER_ASYNC=True, PDF_RENDER_INLINE_AFTER=30, PDF_RENDER_MAX_ATTEMPTS=1)
+class PdfDownloadTests(ScanReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.url = f"/api/scans/{self.scan.id}/pdf/"
+
+    def test_queued_report_answers_202_until_rendered(self):
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], PdfRenderJob.PENDING)
+
+        self.assertTrue(pdf_jobs.run(pdf_jobs.claim()))
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+
+    def test_failed_job_is_reported_and_requeued(self):
+        with mock.patch.object(pdf_cache, "build_scan_pdf", side_effect=RuntimeError("boom")):
+            self.assertEqual(self.api.get(self.url).status_code, 202)
+            with self.assertLogs("api.pdf_jobs", "ERROR"):
+                self.assertFalse(pdf_jobs.run(pdf_jobs.claim()))
+            self.assertEqual(PdfRenderJob.objects.get().status, PdfRenderJob.FAILED)
+
+            for _ in range(3):
+                response = self.api.get(self.url)
+                self.assertEqual(response.status_code, 500)
+                self.assertEqual(response.data["details"], "boom")
+
+        job = PdfRenderJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.error), (PdfRenderJob.PENDING, 0, "boom"))
+
+        # Once rendering works again the worker's retry succeeds.
+        self.assertTrue(pdf_jobs.run(pdf_jobs.claim()))
+        self.assertEqual(self.api.get(self.url).status_code, 200)
+
+    def test_finished_jobs_are_pruned(self):
+        old = timezone.now() - timedelta(days=30)
+        for status in (PdfRenderJob.DONE, PdfRenderJob.FAILED, PdfRenderJob.PENDING):
+            PdfRenderJob.objects.create(scan=self.scan, fingerprint="x", status=status, finished_at=old)
+        recent = PdfRenderJob.objects.create(
+            scan=self.scan, fingerprint="x", status=PdfRenderJob.DONE, finished_at=timezone.now(),
+        )
+
+        with self.settings(PDF_RENDER_JOB_RETENTION=24 * 60 * 60):
+            self.assertEqual(pdf_jobs.prune_finished(), 2)
+        self.assertEqual(
+            sorted(PdfRenderJob.objects.values_list("status", flat=True)),
+            [PdfRenderJob.DONE, PdfRenderJob.PENDING],
+        )
+        self.assertTrue(PdfRenderJob.objects.filter(pk=recent.pk).exists())
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def batcher(self, predict_fn, **kwargs):
+        # A fresh metric namespace per test keeps the counters independent.
+        return MicroBatcher(predict_fn, name=f"test-batcher-{self.id()}", **kwargs)
+
+    def test_concurrent_submits_coalesce_up_to_max_batch_size(self):
+        busy, release = threading.Event(), threading.Event()
+        sizes = []
+
+        def predict(x):
+            sizes.append(len(x))
+            busy.set()
+            release.wait(5)
+            return x[:, 0, 0, :1] * 2
+
+        batcher = self.batcher(predict, max_batch_size=4, max_delay_ms=0)
+        first = batcher.submit(np.zeros((224, 224, 3)))
+        busy.wait(5)
+
+        # Queue up ten more while the worker is busy with the first batch.
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            futures = list(pool.map(lambda i: batcher.submit(np.full((224, 224, 3), i)), range(10)))
+        release.set()
+
+        self.assertEqual(first.result(5)[0], 0)
+        self.assertEqual([f.result(5)[0] for f in futures], [i * 2 for i in range(10)])
+        self.assertEqual(sizes, [1, 4, 4, 2])
+
+        snapshot = metrics.snapshot()
+        name = batcher.name
+        self.assertEqual(snapshot[f"{name}.batches"], 4)
+        self.assertEqual(snapshot[f"{name}.batch_size"]["count"], 4)
+        self.assertEqual(snapshot[f"{name}.queue_wait_ms"]["count"], 11)
+        self.assertEqual(snapshot[f"{name}.batch_errors"], 0)
+
+    def test_lone_request_flushed_after_max_delay(self):
+        batcher = self.batcher(lambda x: np.ones((len(x), 1)), max_batch_size=8, max_delay_ms=50)
+
+        started = time.monotonic()
+        batcher.predict(np.zeros((1, 224, 224, 3)), timeout=5)
+        elapsed = time.monotonic() - started
+
+        self.assertGreaterEqual(elapsed, 0.04)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(metrics.snapshot()[f"{batcher.name}.batch_size"]["count"], 1)
+
+    def test_exception_reaches_every_future_in_the_batch(self):
+        busy, release = threading.Event(), threading.Event()
+        calls = []
+
+        def predict(x):
+            calls.append(len(x))
+            if len(calls) == 1:
+                busy.set()
+                release.wait(5)
+                return np.ones((len(x), 1))
+            raise RuntimeError("model exploded")
+
+        batcher = self.batcher(predict, max_batch_size=8, max_delay_ms=0)
+        batcher.submit(np.zeros((224, 224, 3)))
+        busy.wait(5)
+        futures = [batcher.submit(np.zeros((224, 224, 3))) for _ in range(3)]
+        release.set()
+
+        for future in futures:
+            with self.assertRaisesMessage(RuntimeError, "model exploded"):
+                future.result(5)
+        self.assertEqual(calls, [1, 3])
+        self.assertEqual(metrics.snapshot()[f"{batcher.name}.batch_errors"], 1)
+
+
+@override_settings(ML_BATCHING_ENABLED=False, ML_PREDICTION_CACHE_ENABLED=False)
+class PipelineBackpressureTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.infer = mock.Mock(side_effect=self.blocking_infer)
+
+        for target, kwargs in (
+            ("api.ml_utils.preprocess_image_from_file", {"return_value": np.zeros((1, 224, 224, 3))}),
+            ("api.ml_state.get_infer_fn", {"return_value": self.infer}),
+            ("api.ml_state.get_model", {"return_value": object()}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.pipeline = PredictionPipeline(workers=2, max_pending=1, admit_timeout_ms=50)
+        patcher = mock.patch("api.ml_pipeline.get_pipeline", return_value=self.pipeline)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def blocking_infer(self, x):
+        self.release.wait(5)
+        return np.tile([0.9] + [0.1 / 6] * 6, (len(x), 1))
+
+    def assertSlotFree(self):
+        # A leaked slot makes admission fail after the 50 ms admit timeout.
+        self.release.set()
+        self.pipeline.submit(io.BytesIO(b"image")).result(5)
+        self.assertEqual(self.pipeline._count, 0)
+
+    def test_saturated_pipeline_answers_503_after_admit_timeout(self):
+        running = self.pipeline.submit(io.BytesIO(b"image"))
+
+        started = time.monotonic()
+        response = self.client.post(
+            "/api/predict/skin-disease/",
+            {"image": SimpleUploadedFile("scan.jpg", b"image", content_type="image/jpeg")},
+        )
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertGreaterEqual(elapsed, 0.04)
+        with self.assertRaises(PipelineBusy):
+            self.pipeline.submit(io.BytesIO(b"image"), wait=False)
+
+        self.release.set()
+        running.result(5)
+        self.assertSlotFree()
+
+    def test_slot_released_when_decoding_fails(self):
+        with mock.patch("api.ml_utils.preprocess_image_from_file", side_effect=ValueError("bad image")):
+            with self.assertRaises(ValueError):
+                self.pipeline.submit(io.BytesIO(b"image")).result(5)
+        self.assertSlotFree()
+
+    def test_slot_released_when_inference_fails(self):
+        self.infer.side_effect = RuntimeError("model exploded")
+        with self.assertRaises(RuntimeError):
+            self.pipeline.submit(io.BytesIO(b"image")).result(5)
+
+        self.infer.side_effect = self.blocking_infer
+        self.assertSlotFree()
+
+    def test_preprocess_slot_released(self):
+        self.pipeline.preprocess(io.BytesIO(b"image")).result(5)
+        with mock.patch("api.ml_utils.preprocess_image_from_file", side_effect=ValueError("bad image")):
+            with self.assertRaises(ValueError):
+                self.pipeline.preprocess(io.BytesIO(b"image")).result(5)
+        self.assertSlotFree()
+
+
+@override_settings(ML_BATCHING_ENABLED=True, ML_TTA_ENABLED=True, ML_TTA_CONFIDENCE_CUTOFF=0.6)
+class InferenceThroughBatcherTests(SimpleTestCase):
+    def setUp(self):
+        unsure = [0.4, 0.3] + [0.3 / 5] * 5
+        self.batcher = MicroBatcher(
+            lambda x: np.tile(unsure, (len(x), 1)),
+            max_batch_size=4,
+            max_delay_ms=0,
+            name=f"test-batcher-{self.id()}",
+        )
+        for name, kwargs in (
+            ("get_batcher", {"return_value": self.batcher}),
+            ("get_infer_fn", {"side_effect": AssertionError("bypassed the micro-batcher")}),
+        ):
+            patcher = mock.patch.object(ml_state, name, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def batched_rows(self):
+        return metrics.snapshot()[f"{self.batcher.name}.queue_wait_ms"]["count"]
+
+    def test_tta_views_go_through_the_batcher(self):
+        xs = np.zeros((2, 224, 224, 3), dtype=np.float32)
+        preds = ml_utils.apply_tta(xs, ml_utils.infer_rows(xs))
+
+        self.assertEqual(preds.shape, (2, 7))
+        n_views = len(ml_utils.augment_views(xs[0]))
+        self.assertEqual(self.batched_rows(), 2 + 2 * n_views)
@@ -2,9 +2,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     predict_skin_disease,
+    predict_skin_disease_async,
+    predict_skin_disease_batch,
     ScanViewSet,
     download_scan_pdf,
+    export_scans,
     nearby_hospitals,
+    nearby_hospitals_stream,
+    service_metrics,
 )
 
 router = DefaultRouter()
@@ -12,6 +17,11 @@ router.register(r"scans", ScanViewSet, basename="scan")
 
 urlpatterns = [
     path("predict/skin-disease/", predict_skin_disease),
+    path("predict/skin-disease/async/", predict_skin_disease_async),
+    path("predict/skin-disease/batch/", predict_skin_disease_batch),
+
+    # Must come before the router, which would read "export" as a scan pk
+    path("scans/export/", export_scans),
 
     # ✅ REGISTER VIEWSET ROUTES
     path("", include(router.urls)),
@@ -20,5 +30,8 @@ urlpatterns = [
     path("scans/<int:pk>/pdf/", download_scan_pdf),
 
     path("nearby-hospitals/", nearby_hospitals),
+    path("nearby-hospitals/stream/", nearby_hospitals_stream),
+
+    path("metrics/", service_metrics),
 
 ]
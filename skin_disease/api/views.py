@@ -1,8 +1,21 @@
-from math import radians, sin, cos, sqrt, atan2
-from django.http import JsonResponse
+import json
+import posixpath
+import threading
+import time
+import zipfile
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from asgiref.sync import sync_to_async
+from io import BytesIO
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils import timezone
+from django.utils.http import http_date
 from django.views.decorators.csrf import csrf_exempt
-import requests
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -13,11 +26,41 @@ from .models import Scan
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
-from .pdf import generate_scan_pdf
-from . import ml_state, ml_utils
-from .scoring_weights import SEVERITY_WEIGHTS
-from .ml_hospital_predictor import predict_suitability
-from .explanation import generate_hospital_explanation
+from . import exports, pdf_cache, pdf_jobs
+from . import metrics, ml_state, ml_utils
+from .ml_pipeline import PipelineBusy
+from .hospital_ranking import Candidates, rank_hospitals
+from .geocoding import geocode_city
+from . import places_cache, hospital_directory, doctor_cache
+
+
+def _preflight_response():
+    response = JsonResponse({"status": "ok"})
+    response["Access-Control-Allow-Origin"] = "*"
+    response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+    response["Access-Control-Allow-Headers"] = "*"
+    return response
+
+
+def _busy_response(exc):
+    response = JsonResponse({"error": "Server busy", "details": str(exc)}, status=503)
+    response["Retry-After"] = "1"
+    return response
+
+
+def build_prediction_response(result):
+    return {
+        "label": result["predicted_label"],
+        "diagnosis": result["predicted_disease"],
+        "confidence": result["confidence_percent"],
+        "severity": (
+            "High" if result["predicted_label"] in ["mel", "bcc", "scc"]
+            else "Moderate" if result["predicted_label"] == "akiec"
+            else "Low"
+        ),
+        "advice": result["explanation"],
+        "isSafe": result["predicted_label"] not in ["mel", "bcc", "scc"],
+    }
 
 
 @csrf_exempt
@@ -25,11 +68,7 @@ def predict_skin_disease(request):
 
     # ✅ Allow preflight
     if request.method == "OPTIONS":
-        response = JsonResponse({"status": "ok"})
-        response["Access-Control-Allow-Origin"] = "*"
-        response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
-        response["Access-Control-Allow-Headers"] = "*"
-        return response
+        return _preflight_response()
 
     if request.method != "POST":
         return JsonResponse({"error": "Only POST allowed"}, status=405)
@@ -46,29 +85,178 @@ def predict_skin_disease(request):
 
     try:
         model = ml_state.get_model()
+    except ml_state.ModelUnavailable as exc:
+        return JsonResponse({"error": "Model unavailable", "details": str(exc)}, status=503)
     except Exception as exc:
         return JsonResponse({"error": "Failed to load model", "details": str(exc)}, status=500)
 
     try:
         result = ml_utils.predict_skin_disease_from_file(model, image)
+    except PipelineBusy as exc:
+        return _busy_response(exc)
     except Exception as exc:
         return JsonResponse({"error": "Prediction failed", "details": str(exc)}, status=500)
 
+    return JsonResponse(build_prediction_response(result))
 
-    response = {
-        "label": result["predicted_label"],           
-        "diagnosis": result["predicted_disease"],     
-        "confidence": result["confidence_percent"],   
-        "severity": (
-            "High" if result["predicted_label"] in ["mel", "bcc", "scc"]
-            else "Moderate" if result["predicted_label"] == "akiec"
-            else "Low"
-        ),
-        "advice": result["explanation"],
-        "isSafe": result["predicted_label"] not in ["mel", "bcc", "scc"],
-    }
 
-    return JsonResponse(response)
+@csrf_exempt
+async def predict_skin_disease_async(request):
+    """
+    Async version of predict_skin_disease for ASGI deployments. Inference
+    runs on the preprocessing pool and model queue while the event loop
+    awaits the result, so one worker can hold many uploads in flight.
+    Same request and response format as the sync endpoint.
+    """
+    if request.method == "OPTIONS":
+        return _preflight_response()
+
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+
+    image = request.FILES.get("image")
+    if not image:
+        return JsonResponse({
+            "error": "Image not provided",
+            "received_files": list(request.FILES.keys())
+        }, status=400)
+
+    try:
+        await sync_to_async(ml_state.load, thread_sensitive=False)()
+    except ml_state.ModelUnavailable as exc:
+        return JsonResponse({"error": "Model unavailable", "details": str(exc)}, status=503)
+    except Exception as exc:
+        return JsonResponse({"error": "Failed to load model", "details": str(exc)}, status=500)
+
+    try:
+        result = await ml_utils.apredict_skin_disease_from_file(image)
+    except PipelineBusy as exc:
+        return _busy_response(exc)
+    except Exception as exc:
+        return JsonResponse({"error": "Prediction failed", "details": str(exc)}, status=500)
+
+    return JsonResponse(build_prediction_response(result))
+
+
+BATCH_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def _collect_batch_uploads(request):
+    """
+    Return [(filename, file_obj)] from repeated `images` fields and/or a
+    zip file in `archive`. Raises ValueError for unusable archives and
+    BatchTooLarge when the image count or the archive's uncompressed size
+    is over the limit; both are checked from the zip's directory before
+    anything is inflated.
+    """
+    max_images = settings.ML_BATCH_ENDPOINT_MAX_IMAGES
+    uploads = [(f.name, f) for f in request.FILES.getlist("images")]
+
+    archive = request.FILES.get("archive")
+    if archive:
+        try:
+            zf = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile:
+            raise ValueError("archive is not a valid zip file")
+
+        with zf:
+            entries = []
+            total_bytes = 0
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(BATCH_IMAGE_EXTENSIONS):
+                    continue
+                if info.file_size > settings.ML_BATCH_MAX_IMAGE_BYTES:
+                    raise ValueError(f"{info.filename} exceeds {settings.ML_BATCH_MAX_IMAGE_BYTES} bytes")
+
+                entries.append(info)
+                total_bytes += info.file_size
+                if len(uploads) + len(entries) > max_images:
+                    raise BatchTooLarge(f"Too many images (max {max_images})")
+                if total_bytes > settings.ML_BATCH_MAX_ARCHIVE_BYTES:
+                    raise BatchTooLarge(
+                        f"archive images exceed {settings.ML_BATCH_MAX_ARCHIVE_BYTES} bytes uncompressed"
+                    )
+
+            # zipfile stops reading each entry at its declared file_size.
+            uploads.extend((info.filename, BytesIO(zf.read(info))) for info in entries)
+
+    if len(uploads) > max_images:
+        raise BatchTooLarge(f"Too many images: {len(uploads)} (max {max_images})")
+
+    return uploads
+
+
+@csrf_exempt
+def predict_skin_disease_batch(request):
+    """
+    Predict several images in one request. Send repeated `images` fields
+    and/or an `archive` zip. Each entry in `results` has the same shape as
+    the single-image response plus `index` and `filename`; images that fail
+    to decode get an `error` instead. With `?stream=1` the results are
+    emitted as NDJSON lines as soon as each one is known.
+    """
+    if request.method == "OPTIONS":
+        return _preflight_response()
+
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST allowed"}, status=405)
+
+    try:
+        uploads = _collect_batch_uploads(request)
+    except BatchTooLarge as exc:
+        return JsonResponse({"error": str(exc)}, status=413)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    if not uploads:
+        return JsonResponse({
+            "error": "No images provided",
+            "received_files": list(request.FILES.keys())
+        }, status=400)
+
+    try:
+        ml_state.load()
+    except ml_state.ModelUnavailable as exc:
+        return JsonResponse({"error": "Model unavailable", "details": str(exc)}, status=503)
+    except Exception as exc:
+        return JsonResponse({"error": "Failed to load model", "details": str(exc)}, status=500)
+
+    try:
+        predictions = ml_utils.iter_batch_predictions([f for _, f in uploads])
+    except PipelineBusy as exc:
+        return _busy_response(exc)
+
+    def results():
+        try:
+            for i, result, error in predictions:
+                entry = {"index": i, "filename": uploads[i][0]}
+                if error is not None:
+                    entry["error"] = "Could not decode image"
+                else:
+                    entry.update(build_prediction_response(result))
+                yield entry
+        except Exception as exc:
+            yield {"error": "Prediction failed", "details": str(exc)}
+
+    if request.GET.get("stream"):
+        return StreamingHttpResponse(
+            (json.dumps(entry) + "\n" for entry in results()),
+            content_type="application/x-ndjson",
+        )
+
+    entries = sorted(results(), key=lambda e: e.get("index", len(uploads)))
+    if any("index" not in e for e in entries):
+        return JsonResponse(entries[-1], status=500)
+
+    return JsonResponse({
+        "count": len(entries),
+        "failed": sum(1 for e in entries if "error" in e),
+        "results": entries,
+    })
 
 
 class ScanViewSet(viewsets.ModelViewSet):
@@ -80,148 +268,196 @@ class ScanViewSet(viewsets.ModelViewSet):
         return Scan.objects.filter(user=self.request.user).order_by("-created_at")
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        scan = serializer.save(user=self.request.user)
+
+        # Render the PDF report in the background (run_pdf_worker)
+        if settings.PDF_RENDER_ASYNC:
+            transaction.on_commit(lambda: pdf_jobs.enqueue(scan))
 
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def download_scan_pdf(request, pk):
+    """
+    The scan's PDF report, rendered once and then served from storage.
+    Sends ETag / Last-Modified so clients can revalidate with a 304.
+
+    With PDF_RENDER_ASYNC, a report that is not rendered yet is queued for
+    run_pdf_worker and the response is 202 with a URL to poll; jobs still
+    waiting after PDF_RENDER_INLINE_AFTER seconds, and reports whose job
+    has failed before (enqueue puts it back in the queue), are rendered
+    inline, so a render error reaches the client.
+    """
     scan = get_object_or_404(Scan, pk=pk, user=request.user)
-    return generate_scan_pdf(scan)
+
+    path = pdf_cache.cached_report(scan)
+    if path is None and settings.PDF_RENDER_ASYNC:
+        job = pdf_jobs.enqueue(scan)
+        if job is not None and not job.error:
+            waited = (timezone.now() - job.created_at).total_seconds()
+            if waited < settings.PDF_RENDER_INLINE_AFTER:
+                return Response(
+                    {"status": job.status, "poll_url": request.build_absolute_uri()},
+                    status=202,
+                    headers={"Retry-After": "2"},
+                )
+    if path is None:
+        try:
+            path = pdf_cache.render_report(scan)
+        except Exception as exc:
+            return Response({"error": "Failed to render PDF report", "details": str(exc)}, status=500)
+    # The file name is the fingerprint (plus ".degraded" for a render
+    # without the image), so a degraded report never revalidates as the
+    # real one.
+    etag = f'"{posixpath.splitext(posixpath.basename(path))[0]}"'
+    last_modified = int(default_storage.get_modified_time(path).timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = FileResponse(
+            default_storage.open(path, "rb"),
+            as_attachment=True,
+            filename=f"scan_report_{scan.id}.pdf",
+            content_type="application/pdf",
+        )
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_scans(request):
+    """
+    All of the user's scan reports as one streamed zip, oldest first.
+    Optional `from` / `to` query params (YYYY-MM-DD, inclusive) filter by
+    scan date.
+    """
+    scans = Scan.objects.filter(user=request.user).order_by("created_at", "id")
+
+    try:
+        for param, lookup in (("from", "created_at__date__gte"), ("to", "created_at__date__lte")):
+            value = request.GET.get(param)
+            if value:
+                scans = scans.filter(**{lookup: date.fromisoformat(value)})
+    except ValueError:
+        return Response({"error": "from/to must be dates (YYYY-MM-DD)"}, status=400)
+
+    if not scans.exists():
+        return Response({"error": "No scans in this range"}, status=404)
+
+    response = StreamingHttpResponse(
+        exports.iter_scan_reports_zip(scans.iterator(chunk_size=100)),
+        content_type="application/zip",
+    )
+    response["Content-Disposition"] = f'attachment; filename="scan_reports_{date.today():%Y-%m-%d}.zip"'
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def service_metrics(request):
+    """Queue depth, batch-size histograms and other in-process counters."""
+    return Response({**metrics.snapshot(), **pdf_jobs.queue_stats()})
 
 
 # hospital recommandation system
-def calculate_distance_km(lat1, lon1, lat2, lon2):
+def _resolve_hospital_query(data):
     """
-    Accurate straight-line distance using WGS84
+    Validate a nearby-hospitals request body. Returns (query, None) or
+    (None, error_response).
     """
-    R = 6371.0088  # More precise Earth radius (km)
+    diagnosis = data.get("diagnosis")
+    severity = data.get("severity", "Low")
+    lat = data.get("lat")
+    lon = data.get("lon")
+    city = data.get("city")
+
+    lat = float(lat) if lat is not None else None
+    lon = float(lon) if lon is not None else None
+
+    if not diagnosis:
+        return None, Response({"error": "diagnosis required"}, status=400)
+
+    if city and not (lat and lon):
+        coords = geocode_city(city)
+
+        if coords is None:
+            return None, Response({"error": "Invalid city"}, status=400)
 
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
+        lat, lon = coords
 
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
+    return {
+        "diagnosis": diagnosis,
+        "severity": severity,
+        "keyword": get_keyword_from_diagnosis(diagnosis),
+        "lat": float(lat),
+        "lon": float(lon),
+    }, None
 
-    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
 
-    return round(R * c, 3)
+def _rank_nearby_hospitals(query):
+    """Ranked hospitals (without doctors) and their (lat, lon) locations."""
+    lat, lon, keyword = query["lat"], query["lon"], query["keyword"]
 
+    # Local directory first; the Places API only for areas it doesn't
+    # cover yet, and whatever it returns is added to the directory.
+    candidates = hospital_directory.search(lat, lon, keyword, radius_m=5000)
+    if candidates is None:
+        candidates = Candidates.from_places(places_cache.nearby_hospitals(
+            lat, lon, keyword, radius=5000,
+            on_fetch=hospital_directory.ingest_places,
+        ))
+
+    # 🧠 Vectorized scoring; only the top-k get explanations and doctors
+    return rank_hospitals(
+        candidates, lat, lon, query["severity"],
+        limit=settings.HOSPITAL_RESULTS_LIMIT,
+        disease=query["diagnosis"],
+    )
+
+
+def _doctor_lookups(ranked_hospitals, locations):
+    return [
+        (h["name"], h_lat, h_lon)
+        for h, (h_lat, h_lon) in zip(ranked_hospitals, locations)
+    ]
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def nearby_hospitals(request):
+    """
+    Ranked hospitals near the user for a diagnosis, each with its best
+    doctors. Every hospital entry has name, address, rating, distance_km,
+    ml_score, final_score (what the list is sorted by), why_recommended,
+    top_doctors, maps_url and feedback_score: the patient feedback score
+    for this hospital and diagnosis, 0..1 with 0.5 meaning no feedback
+    yet. feedback_score only affects final_score and the order when
+    HOSPITAL_FEEDBACK_RANKING_ENABLED is on.
+    """
     try:
-        diagnosis = request.data.get("diagnosis")
-        severity = request.data.get("severity", "Low")  
-        lat = request.data.get("lat")
-        lon = request.data.get("lon")
-        city = request.data.get("city")
-
-        lat = float(lat) if lat is not None else None
-        lon = float(lon) if lon is not None else None
-
-        if not diagnosis:
-            return Response({"error": "diagnosis required"}, status=400)
-
-        keyword = get_keyword_from_diagnosis(diagnosis)
-        weights = SEVERITY_WEIGHTS.get(severity, SEVERITY_WEIGHTS["Low"])
-
-
-        if city and not (lat and lon):
-            geo_res = requests.get(
-                "https://maps.googleapis.com/maps/api/geocode/json",
-                params={"address": city, "key": settings.GOOGLE_MAPS_API_KEY},
-                timeout=5,
-            ).json()
-
-            if not geo_res.get("results"):
-                return Response({"error": "Invalid city"}, status=400)
-
-            loc = geo_res["results"][0]["geometry"]["location"]
-            lat, lon = loc["lat"], loc["lng"]
-
-
-        places_res = requests.get(
-            "https://maps.googleapis.com/maps/api/place/nearbysearch/json",
-            params={
-                "location": f"{lat},{lon}",
-                "radius": 5000,
-                "keyword": keyword,
-                "type": "hospital",
-                "key": settings.GOOGLE_MAPS_API_KEY,
-            },
-            timeout=5,
-        ).json()
-
-        ranked_hospitals = []
-
-        for p in places_res.get("results", []):
-            name = p.get("name", "")
-            rating = p.get("rating", 0)
-
-            h_lat = p["geometry"]["location"]["lat"]
-            h_lon = p["geometry"]["location"]["lng"]
-            distance = calculate_distance_km(
-                float(lat), float(lon),
-                float(h_lat), float(h_lon)
-            )
-
-            # 🔮 ML-ready suitability score
-            try:
-                ml_score = predict_suitability(
-                    rating=rating,
-                    distance=distance,
-                    severity=severity,
-                )
-            except Exception:
-                ml_score = 0.5  
-
-
-            # 🎯 Final severity-aware score
-            final_score = (
-                rating * weights["rating"]
-                + ml_score * weights["ml"]
-                - distance * weights["distance"]
-            )
-
-            explanation = generate_hospital_explanation(
-                severity=severity,
-                rating=rating,
-                distance=distance,
-                ml_score=ml_score,
-            )
-
-            ranked_hospitals.append({
-                "name": name,
-                "address": p.get("vicinity"),
-                "rating": rating,
-                "distance_km": distance,
-                "ml_score": ml_score,
-                "final_score": round(final_score, 2),
-                "why_recommended": explanation,  
-                "top_doctors": fetch_doctors_for_hospital(
-                    hospital_name=name,
-                    lat=h_lat,
-                    lon=h_lon,
-                    severity=severity
-                ),
-                "maps_url": f"https://www.google.com/maps/dir/?api=1&destination={h_lat},{h_lon}",
-            })
-
-
-        # 🧠 SMART SORT
-        ranked_hospitals.sort(
-            key=lambda x: x["final_score"],
-            reverse=True
+        query, error = _resolve_hospital_query(request.data)
+        if error is not None:
+            return error
+
+        ranked_hospitals, locations = _rank_nearby_hospitals(query)
+
+        # 👩‍⚕️ Doctor lookups run concurrently under one deadline
+        doctors = fetch_doctors_concurrently(
+            _doctor_lookups(ranked_hospitals, locations),
+            severity=query["severity"],
         )
+        for hospital, top_doctors in zip(ranked_hospitals, doctors):
+            hospital["top_doctors"] = top_doctors
 
         return Response({
-            "diagnosis": diagnosis,
-            "severity": severity,
-            "keyword_used": keyword,
+            "diagnosis": query["diagnosis"],
+            "severity": query["severity"],
+            "keyword_used": query["keyword"],
             "hospitals": ranked_hospitals,
         })
 
@@ -232,23 +468,81 @@ def nearby_hospitals(request):
         )
 
 
-def fetch_doctors_for_hospital(hospital_name, lat, lon, severity):
-    query = f"{hospital_name} dermatologist"
-
-    res = requests.get(
-        "https://maps.googleapis.com/maps/api/place/textsearch/json",
-        params={
-            "query": query,
-            "location": f"{lat},{lon}",
-            "radius": 5000,
-            "key": settings.GOOGLE_MAPS_API_KEY,
-        },
-        timeout=5
-    ).json()
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def nearby_hospitals_stream(request):
+    """
+    Streaming variant of nearby_hospitals. Emits one `hospitals` event with
+    the ranked list (empty `top_doctors`) as soon as it is scored, then a
+    `doctors` event per hospital as its lookup finishes, then `done`, whose
+    `timed_out` lists the indexes of hospitals whose lookup failed or
+    missed the deadline. Once the request is validated, failures are
+    reported in-stream as an `error` event followed by `done`.
+    NDJSON by default; `?sse=1` frames the same events as Server-Sent
+    Events.
+    """
+    try:
+        query, error = _resolve_hospital_query(request.data)
+        if error is not None:
+            return error
+    except Exception:
+        return Response(
+            {"error": "Internal server error"},
+            status=500
+        )
 
+    def events():
+        try:
+            ranked_hospitals, locations = _rank_nearby_hospitals(query)
+        except Exception:
+            yield {"event": "error", "error": "Hospital ranking failed"}
+            yield {"event": "done", "timed_out": []}
+            return
+
+        yield {
+            "event": "hospitals",
+            "diagnosis": query["diagnosis"],
+            "severity": query["severity"],
+            "keyword_used": query["keyword"],
+            "hospitals": ranked_hospitals,
+        }
+
+        timed_out = []
+        try:
+            for i, top_doctors, ok in iter_doctors_as_completed(
+                _doctor_lookups(ranked_hospitals, locations),
+                severity=query["severity"],
+            ):
+                if not ok:
+                    timed_out.append(i)
+                yield {
+                    "event": "doctors",
+                    "index": i,
+                    "name": ranked_hospitals[i]["name"],
+                    "top_doctors": top_doctors,
+                }
+        except Exception:
+            yield {"event": "error", "error": "Doctor lookup failed"}
+
+        yield {"event": "done", "timed_out": sorted(timed_out)}
+
+    if request.GET.get("sse"):
+        body = (f"event: {e['event']}\ndata: {json.dumps(e)}\n\n" for e in events())
+        response = StreamingHttpResponse(body, content_type="text/event-stream")
+    else:
+        body = (json.dumps(e) + "\n" for e in events())
+        response = StreamingHttpResponse(body, content_type="application/x-ndjson")
+
+    # Stop proxies (nginx) from buffering the stream.
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def score_doctors(hospital_name, raw_doctors, severity):
     doctors = []
 
-    for p in res.get("results", []):
+    for p in raw_doctors:
         rating = p.get("rating", 4.0)
 
         # Severity-aware scoring (distance not exposed)
@@ -272,3 +566,83 @@ def fetch_doctors_for_hospital(hospital_name, lat, lon, severity):
     doctors.sort(key=lambda x: x["score"], reverse=True)
 
     return doctors[:3]
+
+
+_doctor_pool = None
+_doctor_pool_lock = threading.Lock()
+
+
+def _get_doctor_pool():
+    global _doctor_pool
+    if _doctor_pool is None:
+        with _doctor_pool_lock:
+            if _doctor_pool is None:
+                _doctor_pool = ThreadPoolExecutor(
+                    max_workers=settings.HOSPITAL_DOCTOR_LOOKUP_WORKERS,
+                    thread_name_prefix="doctor-lookup",
+                )
+    return _doctor_pool
+
+
+def iter_doctors_as_completed(hospitals, severity):
+    """
+    Yield (index, top_doctors, ok) for every (name, lat, lon) in
+    `hospitals` as soon as its doctors are known: cached hospitals first,
+    then live lookups in completion order.
+
+    Each lookup has its own HTTP timeout and the whole fan-out shares one
+    deadline; lookups that fail or miss it are yielded with an empty list
+    and ok=False.
+    """
+    pool = _get_doctor_pool()
+    deadline = time.monotonic() + settings.HOSPITAL_DOCTOR_LOOKUP_DEADLINE
+    cached = []
+    futures = {}
+
+    # Start every live lookup before handing anything to the caller.
+    for i, (name, h_lat, h_lon) in enumerate(hospitals):
+        raw_doctors = doctor_cache.cached_doctors(name, h_lat, h_lon)
+        if raw_doctors is not None:
+            cached.append((i, name, raw_doctors))
+            continue
+
+        futures[pool.submit(
+            doctor_cache.fetch_doctors,
+            hospital_name=name,
+            lat=h_lat,
+            lon=h_lon,
+            timeout=settings.HOSPITAL_DOCTOR_LOOKUP_TIMEOUT,
+        )] = (i, name)
+
+    for i, name, raw_doctors in cached:
+        yield i, score_doctors(name, raw_doctors, severity), True
+
+    if not futures:
+        return
+
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+            pending.discard(future)
+            i, name = futures[future]
+            if future.exception() is None:
+                yield i, score_doctors(name, future.result(), severity), True
+            else:
+                yield i, [], False
+    except FuturesTimeout:
+        pass
+
+    for future in pending:
+        future.cancel()
+        yield futures[future][0], [], False
+
+
+def fetch_doctors_concurrently(hospitals, severity):
+    """
+    Doctors for every (name, lat, lon), in order; see
+    iter_doctors_as_completed for the timeout rules.
+    """
+    results = [[] for _ in hospitals]
+    for i, top_doctors, _ in iter_doctors_as_completed(hospitals, severity):
+        results[i] = top_doctors
+    return results
@@ -18,6 +18,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
 
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
+GOOGLE_MAPS_API_BASE = os.getenv("GOOGLE_MAPS_API_BASE", "https://maps.googleapis.com/maps/api")
+# Shared keep-alive session for every Maps call (see api.maps_client).
+GOOGLE_MAPS_POOL_SIZE = int(os.getenv("GOOGLE_MAPS_POOL_SIZE", "20"))
+GOOGLE_MAPS_MAX_RETRIES = int(os.getenv("GOOGLE_MAPS_MAX_RETRIES", "2"))
+GOOGLE_MAPS_RETRY_BACKOFF = float(os.getenv("GOOGLE_MAPS_RETRY_BACKOFF", "0.2"))
+GOOGLE_MAPS_TIMEOUT = float(os.getenv("GOOGLE_MAPS_TIMEOUT", "5"))
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SECRET_KEY = os.getenv("SECRET_KEY")
 
@@ -173,3 +179,120 @@ DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+# Rendered scan PDF reports (api.pdf_cache), relative to the default storage.
+PDF_REPORTS_DIR = "reports"
+
+# Downscaled JPEG of each scan embedded in its PDF report (api.renditions).
+PDF_RENDITIONS_DIR = "renditions"
+PDF_IMAGE_DPI = int(os.getenv("PDF_IMAGE_DPI", "150"))
+PDF_IMAGE_QUALITY = int(os.getenv("PDF_IMAGE_QUALITY", "80"))
+
+# Background PDF rendering (PdfRenderJob queue + `manage.py run_pdf_worker`).
+# Off by default: only enable it where a worker runs. Downloads of reports
+# still queued after PDF_RENDER_INLINE_AFTER seconds are rendered in the
+# request, so a stalled worker only costs latency.
+PDF_RENDER_ASYNC = os.getenv("PDF_RENDER_ASYNC", "0") == "1"
+PDF_RENDER_INLINE_AFTER = float(os.getenv("PDF_RENDER_INLINE_AFTER", "30"))
+PDF_RENDER_MAX_ATTEMPTS = int(os.getenv("PDF_RENDER_MAX_ATTEMPTS", "3"))
+PDF_RENDER_JOB_TIMEOUT = int(os.getenv("PDF_RENDER_JOB_TIMEOUT", "300"))
+# Finished (done / failed) jobs are deleted by the worker after this long.
+PDF_RENDER_JOB_RETENTION = int(os.getenv("PDF_RENDER_JOB_RETENTION", str(7 * 24 * 60 * 60)))
+
+
+# ML inference
+ML_MODEL_PATH = BASE_DIR / "ml_models" / "skin_disease_final.keras"
+
+# "eager": load + warm up the model when a serving process boots (gunicorn,
+#          uvicorn, runserver). Other management commands never load it.
+# "lazy": load on the first prediction request.
+# "disabled": never load; prediction endpoints answer 503.
+ML_MODEL_LOAD_POLICY = os.getenv("ML_MODEL_LOAD_POLICY", "eager")
+
+# "keras" (full TensorFlow), "tflite-fp16" or "tflite-int8". TFLite artifacts
+# are produced next to ML_MODEL_PATH by `manage.py convert_model`.
+ML_INFERENCE_BACKEND = os.getenv("ML_INFERENCE_BACKEND", "keras")
+ML_TFLITE_NUM_THREADS = int(os.getenv("ML_TFLITE_NUM_THREADS", "0")) or None
+
+# Micro-batching: concurrent predict requests are coalesced into one forward
+# pass of up to ML_BATCH_MAX_SIZE images, waiting at most ML_BATCH_MAX_DELAY_MS
+# for the batch to fill.
+ML_BATCHING_ENABLED = os.getenv("ML_BATCHING_ENABLED", "1") == "1"
+ML_BATCH_MAX_SIZE = int(os.getenv("ML_BATCH_MAX_SIZE", "8"))
+ML_BATCH_MAX_DELAY_MS = float(os.getenv("ML_BATCH_MAX_DELAY_MS", "5"))
+
+# /api/predict/skin-disease/batch/ limits and decode parallelism.
+ML_BATCH_ENDPOINT_MAX_IMAGES = int(os.getenv("ML_BATCH_ENDPOINT_MAX_IMAGES", "16"))
+ML_BATCH_MAX_IMAGE_BYTES = int(os.getenv("ML_BATCH_MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+# Total uncompressed size of the images taken from one `archive` zip.
+ML_BATCH_MAX_ARCHIVE_BYTES = int(os.getenv("ML_BATCH_MAX_ARCHIVE_BYTES", str(64 * 1024 * 1024)))
+ML_PREPROCESS_WORKERS = int(os.getenv("ML_PREPROCESS_WORKERS", "4"))
+
+# Backpressure: at most ML_PIPELINE_MAX_PENDING images may be decoding or
+# waiting for the model at once. New requests wait up to
+# ML_PIPELINE_ADMIT_TIMEOUT_MS for a slot, then get a 503.
+ML_PIPELINE_MAX_PENDING = int(os.getenv("ML_PIPELINE_MAX_PENDING", "32"))
+ML_PIPELINE_ADMIT_TIMEOUT_MS = float(os.getenv("ML_PIPELINE_ADMIT_TIMEOUT_MS", "50"))
+
+# Adaptive test-time augmentation: when the top softmax score of the single
+# pass is below the cutoff, flipped/rotated/cropped views are run as one
+# batch and the softmax is averaged.
+ML_TTA_ENABLED = os.getenv("ML_TTA_ENABLED", "0") == "1"
+ML_TTA_CONFIDENCE_CUTOFF = float(os.getenv("ML_TTA_CONFIDENCE_CUTOFF", "0.6"))
+
+# Prediction cache keyed by sha256(upload bytes) + model version. The
+# in-process LRU always runs when enabled; set ML_PREDICTION_CACHE_ALIAS to a
+# CACHES alias to also share results between workers.
+ML_PREDICTION_CACHE_ENABLED = os.getenv("ML_PREDICTION_CACHE_ENABLED", "1") == "1"
+ML_PREDICTION_CACHE_SIZE = int(os.getenv("ML_PREDICTION_CACHE_SIZE", "1024"))
+ML_PREDICTION_CACHE_TTL = int(os.getenv("ML_PREDICTION_CACHE_TTL", str(24 * 60 * 60)))
+ML_PREDICTION_CACHE_ALIAS = os.getenv("ML_PREDICTION_CACHE_ALIAS") or None
+
+
+# Hospital recommendations
+# Per-hospital doctor lookups in nearby_hospitals run on a thread pool; each
+# call has its own timeout and the whole fan-out shares one deadline (seconds).
+HOSPITAL_DOCTOR_LOOKUP_WORKERS = int(os.getenv("HOSPITAL_DOCTOR_LOOKUP_WORKERS", "10"))
+HOSPITAL_DOCTOR_LOOKUP_TIMEOUT = float(os.getenv("HOSPITAL_DOCTOR_LOOKUP_TIMEOUT", "3"))
+HOSPITAL_DOCTOR_LOOKUP_DEADLINE = float(os.getenv("HOSPITAL_DOCTOR_LOOKUP_DEADLINE", "4"))
+
+# Per-hospital doctor cache (seconds). Entries older than DOCTOR_CACHE_FRESH
+# are served while being refreshed in the background; entries older than
+# DOCTOR_CACHE_TTL are looked up again.
+DOCTOR_CACHE_SIZE = int(os.getenv("DOCTOR_CACHE_SIZE", "20000"))
+DOCTOR_CACHE_FRESH = int(os.getenv("DOCTOR_CACHE_FRESH", str(24 * 60 * 60)))
+DOCTOR_CACHE_TTL = int(os.getenv("DOCTOR_CACHE_TTL", str(30 * 24 * 60 * 60)))
+DOCTOR_CACHE_REFRESH_WORKERS = int(os.getenv("DOCTOR_CACHE_REFRESH_WORKERS", "2"))
+
+# City geocoding cache (GeocodeCache table + in-process LRU). Warm it with
+# `manage.py warm_geocode_cache`.
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "2048"))
+GEOCODE_CACHE_TTL_DAYS = int(os.getenv("GEOCODE_CACHE_TTL_DAYS", "90"))
+
+# Places nearby-search cache, bucketed by geohash cell + keyword. Precision 6
+# is a ~1.2 x 0.6 km cell; lower it to share results across a wider area.
+PLACES_CACHE_GEOHASH_PRECISION = int(os.getenv("PLACES_CACHE_GEOHASH_PRECISION", "6"))
+PLACES_CACHE_SIZE = int(os.getenv("PLACES_CACHE_SIZE", "5000"))
+PLACES_CACHE_TTL = int(os.getenv("PLACES_CACHE_TTL", str(6 * 60 * 60)))
+
+# Local hospital directory (Hospital table + in-memory grid index). It only
+# answers for a (Places cache cell, keyword) that Places was searched for in
+# the last HOSPITAL_COVERAGE_TTL seconds; anything else falls back to Places.
+# Rows loaded with `manage.py import_hospitals` are served alongside those.
+HOSPITAL_DIRECTORY_ENABLED = os.getenv("HOSPITAL_DIRECTORY_ENABLED", "1") == "1"
+HOSPITAL_COVERAGE_TTL = int(os.getenv("HOSPITAL_COVERAGE_TTL", str(30 * 24 * 60 * 60)))
+HOSPITAL_INDEX_CELL_KM = float(os.getenv("HOSPITAL_INDEX_CELL_KM", "5"))
+HOSPITAL_INDEX_REFRESH = int(os.getenv("HOSPITAL_INDEX_REFRESH", "300"))
+
+# nearby_hospitals scores every candidate and returns (and looks up doctors
+# for) the best HOSPITAL_RESULTS_LIMIT.
+HOSPITAL_RESULTS_LIMIT = int(os.getenv("HOSPITAL_RESULTS_LIMIT", "20"))
+
+# Let patient feedback (DoctorFeedbackStats) move hospitals up or down the
+# ranking, by SEVERITY_WEIGHTS[...]["feedback"]. Off by default: responses
+# still carry feedback_score, but final_score and the order ignore it.
+HOSPITAL_FEEDBACK_RANKING_ENABLED = os.getenv("HOSPITAL_FEEDBACK_RANKING_ENABLED", "0") == "1"
+
+# Trained suitability model (`manage.py train_suitability_model`). When the
+# file is missing, ranking uses the hand-coded predict_suitability formula.
+HOSPITAL_SUITABILITY_MODEL_PATH = BASE_DIR / "ml_models" / "hospital_suitability.json"